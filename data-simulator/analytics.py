@@ -0,0 +1,204 @@
+"""
+Vectorized collection analytics.
+
+Every metric bundle is computed from the columnar form of a collection
+(``Snapshot.table``) with NumPy: each field involved is read once as an
+array and all sums, counts, rankings and group-bys are array operations.
+Reports and the ``/api/analytics`` endpoint share these functions, so the
+figures in a PDF always match the API.
+
+Field names are checked against ``models.py`` when the module is imported;
+a metric that refers to a field the model does not have fails loudly
+instead of silently adding up zeros.
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from columnar import ColumnarTable, field_kinds
+from models import COLLECTION_MODELS
+
+NUMERIC_KINDS = ("float64", "int64")
+
+# Collection -> fields read by its metric bundle, by kind
+METRIC_FIELDS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "clients": {
+        "numeric": ("monthlyRecurring", "annualRevenue", "annualCosts"),
+        "category": ("industry", "status", "name"),
+    },
+    "licenses": {
+        "numeric": ("totalCost", "costPerLicense", "availableLicenses", "utilizationRate"),
+        "category": ("vendor", "product"),
+    },
+    "leads": {
+        "numeric": ("value", "probability"),
+        "category": ("stage", "source", "companyName"),
+    },
+}
+
+def _check_fields():
+    for collection, groups in METRIC_FIELDS.items():
+        kinds = field_kinds(COLLECTION_MODELS[collection])
+        for group, fields in groups.items():
+            for field in fields:
+                if field not in kinds:
+                    raise KeyError(f"{COLLECTION_MODELS[collection].__name__} has no field {field!r}")
+                if group == "numeric" and kinds[field] not in NUMERIC_KINDS:
+                    raise TypeError(f"{COLLECTION_MODELS[collection].__name__}.{field} is not numeric")
+
+_check_fields()
+
+
+def numeric(table: ColumnarTable, field: str) -> np.ndarray:
+    """A numeric column as float64, validated against the collection's model"""
+    if field not in table.model.model_fields:
+        raise KeyError(f"{table.model.__name__} has no field {field!r}")
+    column = table[field]
+    if column.kind not in NUMERIC_KINDS:
+        raise TypeError(f"{table.model.__name__}.{field} is not numeric")
+    return column.values().astype(np.float64, copy=False)
+
+def category(table: ColumnarTable, field: str) -> np.ndarray:
+    """A string column as an object array, validated against the collection's model"""
+    if field not in table.model.model_fields:
+        raise KeyError(f"{table.model.__name__} has no field {field!r}")
+    return table[field].values()
+
+def value_counts(values: np.ndarray) -> List[Dict[str, Any]]:
+    """``[{name, value}]`` counts per distinct value, most frequent first"""
+    if len(values) == 0:
+        return []
+    labels, counts = np.unique(values, return_counts=True)
+    # Stable sort keeps ties in label order
+    order = np.argsort(-counts, kind="stable")
+    return [{"name": str(labels[i]), "value": int(counts[i])} for i in order]
+
+def top_indices(values: np.ndarray, n: int = 10) -> np.ndarray:
+    """Row indices of the ``n`` largest values, largest first"""
+    if len(values) <= n:
+        return np.argsort(-values, kind="stable")
+    candidates = np.argpartition(-values, n)[:n]
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> float:
+    return float(numerator / denominator * scale) if denominator else 0.0
+
+
+def client_metrics(table: ColumnarTable) -> Dict[str, Any]:
+    """Revenue, margin and risk figures for the clients collection"""
+    mrr = numeric(table, "monthlyRecurring")
+    monthly_profit = (numeric(table, "annualRevenue") - numeric(table, "annualCosts")) / 12
+    monthly_costs = numeric(table, "annualCosts") / 12
+    industries = category(table, "industry")
+
+    total_revenue = float(mrr.sum())
+    total_costs = float(monthly_costs.sum())
+    ranked = np.sort(mrr)[::-1]
+    top_20_count = max(1, len(ranked) // 5) if len(ranked) else 0
+    top = top_indices(mrr)
+
+    return {
+        "count": table.length,
+        "totalRevenue": total_revenue,
+        "totalCosts": total_costs,
+        "netProfit": total_revenue - total_costs,
+        "avgMargin": _ratio(total_revenue - total_costs, total_revenue, 100),
+        "atRisk": int((category(table, "status") == "At Risk").sum()),
+        "industryCount": int(len(np.unique(industries))) if len(industries) else 0,
+        "top20RevenueShare": _ratio(float(ranked[:top_20_count].sum()), total_revenue, 100),
+        "byIndustry": value_counts(industries),
+        "topByRevenue": [
+            {"name": str(category(table, "name")[i]), "value": float(mrr[i]), "monthlyProfit": float(monthly_profit[i])}
+            for i in top
+        ],
+    }
+
+def license_metrics(table: ColumnarTable) -> Dict[str, Any]:
+    """Cost, utilization and waste figures for the licenses collection"""
+    total_cost = numeric(table, "totalCost")
+    utilization = numeric(table, "utilizationRate")
+    unused_cost = numeric(table, "availableLicenses") * numeric(table, "costPerLicense")
+    vendors = category(table, "vendor")
+    products = category(table, "product")
+    top = top_indices(total_cost)
+
+    return {
+        "count": table.length,
+        "totalCost": float(total_cost.sum()),
+        "avgUtilization": float(utilization.mean()) if table.length else 0.0,
+        "underutilized": int((utilization < 50).sum()),
+        "unusedSeats": int(numeric(table, "availableLicenses").sum()),
+        # Monthly cost of seats that are paid for but not assigned
+        "potentialSavings": float(unused_cost.sum()),
+        "vendorCount": int(len(np.unique(vendors))) if len(vendors) else 0,
+        "byVendor": value_counts(vendors),
+        "topByCost": [
+            {
+                "name": f"{vendors[i]} {products[i]}",
+                "value": float(total_cost[i]),
+                "utilization": float(utilization[i])
+            }
+            for i in top
+        ],
+    }
+
+def lead_metrics(table: ColumnarTable) -> Dict[str, Any]:
+    """Value, conversion and funnel figures for the leads collection"""
+    value = numeric(table, "value")
+    probability = numeric(table, "probability")
+    stages = category(table, "stage")
+    total_value = float(value.sum())
+    closed_won = int((stages == "Closed Won").sum())
+    top = top_indices(value)
+
+    return {
+        "count": table.length,
+        "totalValue": total_value,
+        "weightedValue": float((value * probability).sum() / 100),
+        "avgDealSize": _ratio(total_value, table.length),
+        "closedWon": closed_won,
+        "conversionRate": _ratio(closed_won, table.length, 100),
+        "byStage": value_counts(stages),
+        "bySource": value_counts(category(table, "source")),
+        "topByValue": [
+            {"name": str(category(table, "companyName")[i]), "value": float(value[i])}
+            for i in top
+        ],
+    }
+
+def field_summary(table: ColumnarTable) -> Dict[str, Dict[str, float]]:
+    """Sum, mean, min and max of every numeric field"""
+    summary = {}
+    for field, column in table.columns.items():
+        if column.kind not in NUMERIC_KINDS:
+            continue
+        values = column.values()
+        if len(values) == 0:
+            summary[field] = {"sum": 0.0, "mean": 0.0, "min": 0.0, "max": 0.0}
+            continue
+        summary[field] = {
+            "sum": float(values.sum()),
+            "mean": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max())
+        }
+    return summary
+
+
+# Collection -> metric bundle
+METRICS: Dict[str, Callable[[ColumnarTable], Dict[str, Any]]] = {
+    "clients": client_metrics,
+    "licenses": license_metrics,
+    "leads": lead_metrics,
+}
+
+def collection_analytics(table: ColumnarTable) -> Dict[str, Any]:
+    """Metric bundle of a collection (when it has one) plus per-field numeric summaries"""
+    bundle = METRICS.get(table.name)
+    return {
+        "collection": table.name,
+        "count": table.length,
+        "metrics": bundle(table) if bundle else None,
+        "fields": field_summary(table)
+    }
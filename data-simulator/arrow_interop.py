@@ -0,0 +1,113 @@
+"""
+Apache Arrow views of columnar tables.
+
+``ColumnarTable`` buffers already use Arrow's memory layout, so the Arrow
+arrays built here wrap them instead of converting values. Numbers, string
+offsets and data, and list offsets are all shared with the table, including
+tables mapped from the owner's shared state. Booleans are the exception:
+Arrow packs them into bits, so those columns are packed once (an eighth of
+the column's size). No Python object is created per row.
+
+Requires the optional ``pyarrow`` package; ``main`` imports this module on
+first use, since pyarrow takes a while to import.
+"""
+
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from columnar import Column, ColumnarTable
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional; Arrow responses and exports are unavailable without it
+    pa = None
+
+ARROW_TYPES = {
+    "float64": lambda: pa.float64(),
+    "int64": lambda: pa.int64(),
+    "bool": lambda: pa.bool_(),
+    "str": lambda: pa.string(),
+    "list_str": lambda: pa.list_(pa.string()),
+}
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def schema(table: ColumnarTable) -> "pa.Schema":
+    return pa.schema([
+        pa.field(field, ARROW_TYPES[column.kind](), nullable=False)
+        for field, column in table.columns.items()
+    ])
+
+
+def to_array(column: Column) -> "pa.Array":
+    """Arrow array over the column's buffers"""
+    length = len(column)
+    if column.kind in ("float64", "int64"):
+        return pa.Array.from_buffers(ARROW_TYPES[column.kind](), length, [None, pa.py_buffer(column.buffers[0])])
+    if column.kind == "bool":
+        bits = np.packbits(column.buffers[0], bitorder="little")
+        return pa.Array.from_buffers(pa.bool_(), length, [None, pa.py_buffer(bits)])
+    if column.kind == "str":
+        offsets, data = column.buffers
+        return pa.Array.from_buffers(pa.string(), length, [None, pa.py_buffer(offsets), pa.py_buffer(data)])
+
+    list_offsets, offsets, data = column.buffers
+    items = pa.Array.from_buffers(pa.string(), len(offsets) - 1, [None, pa.py_buffer(offsets), pa.py_buffer(data)])
+    return pa.Array.from_buffers(
+        pa.list_(pa.string()), length, [None, pa.py_buffer(list_offsets)], children=[items]
+    )
+
+
+def to_record_batch(table: ColumnarTable) -> "pa.RecordBatch":
+    """The whole table as one record batch"""
+    return pa.RecordBatch.from_arrays([to_array(column) for column in table.columns.values()], schema=schema(table))
+
+
+def to_arrow_table(table: ColumnarTable) -> "pa.Table":
+    return pa.Table.from_batches([to_record_batch(table)])
+
+
+class _Chunks:
+    """Write target that collects what the IPC writer emits"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def ipc_stream(table: ColumnarTable, batch_rows: int = 65536, compression: Optional[str] = None) -> Iterator[bytes]:
+    """Arrow IPC stream of the table: the schema, then record batches of ``batch_rows`` rows
+
+    Batches are zero-copy slices of one record batch over the table's
+    buffers; each chunk yielded is one IPC message, ready to be sent.
+    """
+    batch = to_record_batch(table)
+    sink = _Chunks()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_stream(sink, batch.schema, options=options) as writer:
+        yield sink.take()
+        for start in range(0, batch.num_rows, batch_rows):
+            writer.write_batch(batch.slice(start, batch_rows))
+            yield sink.take()
+    # End-of-stream marker
+    yield sink.take()
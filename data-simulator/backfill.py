@@ -0,0 +1,658 @@
+"""
+Simulated history before the first tick.
+
+Metric history normally starts when the simulator boots, so a new
+environment has empty dashboards and flat report trends. A backfill walks
+every ticking collection back in time from a snapshot, ``days`` into the
+past at one point per ``step_seconds``, and writes the result to the
+time-series store and/or Parquet.
+
+The walk is ``DataGenerator.update_data_realtime`` run in reverse. At each
+step a random 5-15% of the entities changed: client revenue by a factor of
+0.98-1.05 with costs at 60-80% of it, license seats by -2..+5 and billable
+hours by -5..+10 within their totals, leads up one stage (one time in ten)
+with probability +5..15 and value within 5%, department spend by 0.5-2% of
+the budget. Undoing those changes step by step from the snapshot means the
+history ends exactly at the current data. Each step is a handful of NumPy
+operations over all entities, so two years at hourly resolution are ~17,500
+steps rather than two years of ticks.
+
+A collection's entities are split into shards that walk independently (the
+share of entities changed per step is common to all of them), so shards run
+in parallel on a process pool. Random draws come from one stream per block
+of ``BLOCK_ENTITIES`` entities and shards are made of whole blocks, so a
+seeded walk is the same however many shards it runs in. Each shard returns per-step sums for the
+aggregate series and, for the per-entity series, only the raw points and
+rollup buckets the time-series store keeps. Aggregates that the walk does
+not change (counts, industries, ...) are held at their current value;
+``top20RevenueShare`` needs a ranking across all shards per step and is
+left to live recording.
+
+With a Parquet directory, each shard also writes the walk as the full state
+at the first step plus files of changed rows, in the same base + changes
+form as ``parquet_export`` under ``<dir>/<collection>/date=.../``. Replaying
+them in manifest order by ``id`` ends at the snapshot.
+
+    python backfill.py --days 730 --step 3600 --scale 500 --workers 8 --output exports/_backfill
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analytics import numeric
+from columnar import ColumnarTable, field_kinds
+from store import Snapshot
+from timeseries import ENTITY_METRICS, ROLLUPS, TimeSeriesStore, aggregate_metrics, bucket_stats
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+TARGETS = ("timeseries", "parquet")
+
+# Lead stages in the order ticks advance them; other stages never change
+STAGES = ("Prospecting", "Qualification", "Proposal", "Negotiation", "Closed Won")
+
+# Collection -> fields the walk changes, and fields it reads but leaves alone
+WALK_FIELDS = {
+    "clients": ("annualRevenue", "annualCosts", "monthlyRecurring"),
+    "licenses": ("usedLicenses", "availableLicenses", "utilizationRate"),
+    "leads": ("value", "probability", "stage"),
+    "technicians": ("billableHours", "utilization"),
+    "departments": ("spent", "remaining"),
+}
+STATIC_FIELDS = {
+    "licenses": ("totalLicenses", "costPerLicense"),
+    "technicians": ("totalHours",),
+    "departments": ("budget",),
+}
+
+# Aggregates that cannot be built from per-shard sums
+NOT_BACKFILLED = {"clients": ("top20RevenueShare",)}
+
+# Cells (steps x entities) per field held at once by an unsharded walk
+CHUNK_CELLS = 4_000_000
+# Entities per random stream; shards are whole blocks
+BLOCK_ENTITIES = 2000
+
+State = Dict[str, np.ndarray]
+
+
+def _scatter(mask: np.ndarray, values: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """Matrix shaped like ``mask`` holding ``values`` where it is set and ``fill`` elsewhere"""
+    out = np.full(mask.shape, fill)
+    out[mask] = values
+    return out
+
+def _draw_clients(rng: np.random.Generator, mask: np.ndarray, static: State) -> State:
+    changed = int(mask.sum())
+    return {
+        "factor": _scatter(mask, rng.uniform(0.98, 1.05, changed), 1.0),
+        "costRatio": _scatter(mask, rng.uniform(0.6, 0.8, changed))
+    }
+
+def _back_clients(state: State, static: State, mask: np.ndarray, draws: State):
+    revenue = state["annualRevenue"]
+    revenue /= draws["factor"]
+    np.multiply(revenue, draws["costRatio"], out=state["annualCosts"], where=mask)
+    np.divide(revenue, 12, out=state["monthlyRecurring"], where=mask)
+
+def _draw_licenses(rng: np.random.Generator, mask: np.ndarray, static: State) -> State:
+    return {"seats": _scatter(mask, rng.integers(-2, 6, int(mask.sum())))}
+
+def _back_licenses(state: State, static: State, mask: np.ndarray, draws: State):
+    used, total = state["usedLicenses"], static["totalLicenses"]
+    used -= draws["seats"]
+    np.clip(used, 0, total, out=used)
+    np.subtract(total, used, out=state["availableLicenses"])
+    np.multiply(used, 100 / total, out=state["utilizationRate"])
+
+def _draw_leads(rng: np.random.Generator, mask: np.ndarray, static: State) -> State:
+    # A changed lead progressed one time in ten; only those move back a stage
+    progressed = mask.copy()
+    progressed[mask] = rng.random(int(mask.sum())) < 0.1
+    moved = int(progressed.sum())
+    return {
+        "progressed": progressed,
+        "probability": _scatter(progressed, rng.integers(5, 16, moved)),
+        "factor": _scatter(progressed, rng.uniform(0.95, 1.05, moved), 1.0)
+    }
+
+def _back_leads(state: State, static: State, mask: np.ndarray, draws: State):
+    moved = draws["progressed"] & (state["stage"] > 0)
+    state["stage"] -= moved
+    probability = state["probability"]
+    np.subtract(probability, draws["probability"], out=probability, where=moved)
+    np.maximum(probability, 0, out=probability)
+    np.divide(state["value"], draws["factor"], out=state["value"], where=moved)
+
+def _draw_technicians(rng: np.random.Generator, mask: np.ndarray, static: State) -> State:
+    return {"hours": _scatter(mask, rng.integers(-5, 11, int(mask.sum())))}
+
+def _back_technicians(state: State, static: State, mask: np.ndarray, draws: State):
+    billable, total = state["billableHours"], static["totalHours"]
+    billable -= draws["hours"]
+    np.clip(billable, 0, total, out=billable)
+    np.multiply(billable, 100 / total, out=state["utilization"])
+
+def _draw_departments(rng: np.random.Generator, mask: np.ndarray, static: State) -> State:
+    rows = np.nonzero(mask)[1]
+    return {"spend": _scatter(mask, static["budget"][rows] * rng.uniform(0.005, 0.02, len(rows)))}
+
+def _back_departments(state: State, static: State, mask: np.ndarray, draws: State):
+    spent = state["spent"]
+    spent -= draws["spend"]
+    np.maximum(spent, 0, out=spent)
+    np.subtract(static["budget"], spent, out=state["remaining"])
+
+# Collection -> (random draws for a chunk of steps, given which entities changed at each step,
+#                one step back in time in place, given one row of the mask and of the draws)
+WALKS: Dict[str, Tuple[Callable[[np.random.Generator, np.ndarray, State], State], Callable[[State, State, np.ndarray, State], None]]] = {
+    "clients": (_draw_clients, _back_clients),
+    "licenses": (_draw_licenses, _back_licenses),
+    "leads": (_draw_leads, _back_leads),
+    "technicians": (_draw_technicians, _back_technicians),
+    "departments": (_draw_departments, _back_departments),
+}
+
+
+def _client_sums(fields: State, static: State) -> State:
+    return {
+        "monthlyRecurring": fields["monthlyRecurring"].sum(axis=1),
+        "annualCosts": fields["annualCosts"].sum(axis=1)
+    }
+
+def _license_sums(fields: State, static: State) -> State:
+    return {
+        "utilizationRate": fields["utilizationRate"].sum(axis=1),
+        "underutilized": (fields["utilizationRate"] < 50).sum(axis=1).astype(np.float64),
+        "availableLicenses": fields["availableLicenses"].sum(axis=1),
+        "unusedCost": fields["availableLicenses"] @ static["costPerLicense"]
+    }
+
+def _lead_sums(fields: State, static: State) -> State:
+    return {
+        "value": fields["value"].sum(axis=1),
+        "weightedValue": (fields["value"] * fields["probability"]).sum(axis=1) / 100,
+        "closedWon": (fields["stage"] == len(STAGES) - 1).sum(axis=1).astype(np.float64)
+    }
+
+def _field_sums(collection: str) -> Callable[[State, State], State]:
+    return lambda fields, static: {field: fields[field].sum(axis=1) for field in ENTITY_METRICS[collection]}
+
+# Collection -> per-step sums over a shard's entities; shards add up
+SUMS: Dict[str, Callable[[State, State], State]] = {
+    "clients": _client_sums,
+    "licenses": _license_sums,
+    "leads": _lead_sums,
+    "technicians": _field_sums("technicians"),
+    "departments": _field_sums("departments"),
+}
+
+
+def _share(numerator: np.ndarray, denominator, scale: float = 1.0) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, numerator / denominator * scale, 0.0)
+
+def aggregates_from_sums(collection: str, sums: State, count: int) -> State:
+    """The ``aggregate_metrics`` figures the walk changes, per step, from the sums of every shard"""
+    if collection == "clients":
+        revenue, costs = sums["monthlyRecurring"], sums["annualCosts"] / 12
+        return {
+            "totalRevenue": revenue,
+            "totalCosts": costs,
+            "netProfit": revenue - costs,
+            "avgMargin": _share(revenue - costs, revenue, 100)
+        }
+    if collection == "licenses":
+        return {
+            "avgUtilization": _share(sums["utilizationRate"], count),
+            "underutilized": sums["underutilized"],
+            "unusedSeats": sums["availableLicenses"],
+            "potentialSavings": sums["unusedCost"]
+        }
+    if collection == "leads":
+        return {
+            "totalValue": sums["value"],
+            "weightedValue": sums["weightedValue"],
+            "avgDealSize": _share(sums["value"], count),
+            "closedWon": sums["closedWon"],
+            "conversionRate": _share(sums["closedWon"], count, 100)
+        }
+    aggregates = {}
+    for field, total in sums.items():
+        suffix = field[0].upper() + field[1:]
+        aggregates[f"total{suffix}"] = total
+        aggregates[f"avg{suffix}"] = _share(total, count)
+    return aggregates
+
+
+class ShardTask(NamedTuple):
+    """One shard of a collection to walk back, self-contained so it can be sent to a pool worker"""
+    collection: str
+    shard: int
+    table: ColumnarTable
+    end: float
+    step_seconds: float
+    # Share of entities changed at each step, the same for every shard of the collection
+    fractions: np.ndarray
+    # One seed per block of the shard's entities, and steps per chunk for the whole collection
+    seeds: List[np.random.SeedSequence]
+    chunk_rows: int
+    # Entity retention of the time-series store: raw points and buckets per rollup (0 / {} for none)
+    raw_points: int
+    rollup_points: Dict[str, int]
+    parquet_dir: Optional[str]
+    compression: str
+
+
+class ShardResult(NamedTuple):
+    collection: str
+    shard: int
+    ids: List[str]
+    sums: State
+    # Entity field -> {"raw": {"t", "value"}, "rollups": {name: buckets}}
+    history: Dict[str, Dict[str, Any]]
+    files: Dict[str, List[Dict[str, Any]]]
+
+
+class _History:
+    """Newest raw points and rollup buckets of one field, fed chunk by chunk from newest to oldest"""
+
+    def __init__(self, raw_points: int, rollup_points: Dict[str, int]):
+        self.raw_points = raw_points
+        self.rollup_points = rollup_points
+        self.raw: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.raw_rows = 0
+        self.buckets: Dict[str, List[Dict[str, np.ndarray]]] = {name: [] for name in rollup_points}
+        self.bucket_count = dict.fromkeys(rollup_points, 0)
+
+    def add(self, times: np.ndarray, values: np.ndarray):
+        if not len(times):
+            return
+        if self.raw_rows < self.raw_points:
+            needed = self.raw_points - self.raw_rows
+            self.raw.insert(0, (times[-needed:].copy(), values[-needed:].copy()))
+            self.raw_rows += min(needed, len(times))
+        for name, capacity in self.rollup_points.items():
+            # One bucket beyond the capacity: the oldest one collected may be missing older points
+            if self.bucket_count[name] > capacity:
+                continue
+            # Only the newest buckets still missing are computed
+            starts = np.floor(times / ROLLUPS[name])
+            missing = capacity + 1 - self.bucket_count[name]
+            first_row = np.searchsorted(starts, np.unique(starts)[-missing:][0])
+            stats = bucket_stats(times[first_row:], values[first_row:], ROLLUPS[name])
+            collected = self.buckets[name]
+            if collected and collected[0]["t"][0] == stats["t"][-1]:
+                # A bucket straddling two chunks: fold this chunk's part into the newer one
+                newer = collected[0]
+                newer["count"][0] += stats["count"][-1]
+                newer["sum"][0] += stats["sum"][-1]
+                np.minimum(newer["min"][0], stats["min"][-1], out=newer["min"][0])
+                np.maximum(newer["max"][0], stats["max"][-1], out=newer["max"][0])
+                newer["first"][0] = stats["first"][-1]
+                stats = {key: array[:-1] for key, array in stats.items()}
+            if len(stats["t"]):
+                collected.insert(0, {key: array[-(capacity + 1):].copy() for key, array in stats.items()})
+                self.bucket_count[name] += len(collected[0]["t"])
+
+    def result(self) -> Dict[str, Any]:
+        raw = {
+            "t": np.concatenate([times for times, _ in self.raw])[-self.raw_points:],
+            "value": np.concatenate([values for _, values in self.raw])[-self.raw_points:]
+        }
+        rollups = {
+            name: {
+                key: np.concatenate([buckets[key] for buckets in self.buckets[name]])[-capacity:]
+                for key in self.buckets[name][0]
+            }
+            for name, capacity in self.rollup_points.items()
+        }
+        return {"raw": raw, "rollups": rollups}
+
+
+class _ChangeWriter:
+    """Writes a shard's walk to Parquet: the first step in full, then the changed rows of each chunk"""
+
+    def __init__(self, task: ShardTask):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        import arrow_interop
+        from parquet_export import write_atomic
+
+        self.pa, self.pq, self.write_atomic = pa, pq, write_atomic
+        self.task = task
+        self.kinds = field_kinds(task.table.model)
+        self.base = pa.Table.from_batches([arrow_interop.to_record_batch(task.table)])
+        # Index -1 (a stage outside the progression) picks the placeholder, replaced by the original text
+        self.stages = np.array([*STAGES, ""], dtype=object)
+        self.original_stages = task.table["stage"].values() if "stage" in self.kinds else None
+        self.files: Dict[str, List[Dict[str, Any]]] = {"base": [], "changes": []}
+
+    def _column(self, field: str, values: np.ndarray, entities: np.ndarray):
+        if field == "stage":
+            labels = self.stages[values.astype(np.int64)]
+            return self.pa.array(np.where(values >= 0, labels, self.original_stages[entities]), type=self.pa.string())
+        if self.kinds[field] == "int64":
+            return self.pa.array(np.rint(values).astype(np.int64))
+        return self.pa.array(np.round(values, 2))
+
+    def write(self, start: int, times: np.ndarray, fields: State, changed: np.ndarray):
+        """Write one chunk of steps; ``start`` is its first step, ``changed`` marks rows that differ from the step before"""
+        if start == 0:
+            entities = np.arange(changed.shape[1])
+            self._write("full", 0, times, fields, np.zeros(len(entities), dtype=np.int64), entities)
+        rows, entities = np.nonzero(changed)
+        if len(rows):
+            self._write("changes", start, times, fields, rows, entities)
+
+    def _write(self, kind: str, start: int, times: np.ndarray, fields: State, rows: np.ndarray, entities: np.ndarray):
+        task = self.task
+        table = self.base.take(self.pa.array(entities))
+        for field, values in fields.items():
+            table = table.set_column(
+                table.schema.get_field_index(field), field, self._column(field, values[rows, entities], entities)
+            )
+        stamps = np.array([datetime.fromtimestamp(t).isoformat() for t in times], dtype=object)
+        table = table.set_column(table.schema.get_field_index("lastUpdated"), "lastUpdated", self.pa.array(stamps[rows]))
+        table = table.replace_schema_metadata({
+            "prism.collection": task.collection,
+            "prism.kind": kind,
+            "prism.backfill_step": str(start),
+        })
+
+        first = datetime.fromtimestamp(times[rows[0]])
+        relative = os.path.join(
+            task.collection, f"date={first:%Y-%m-%d}",
+            f"{task.collection}-s{task.shard:02d}-{start:08d}-{'full' if kind == 'full' else 'changes'}.parquet"
+        )
+        size = self.write_atomic(os.path.join(task.parquet_dir, relative), lambda path: self.pq.write_table(
+            table, path, compression=task.compression
+        ))
+        self.files["base" if kind == "full" else "changes"].append({
+            "path": relative, "step": start, "start": first.isoformat(), "rows": len(rows), "bytes": size
+        })
+
+
+def _walk_state(collection: str, table: ColumnarTable) -> State:
+    """The walked fields of a table as float arrays; lead stages as their index in ``STAGES`` (-1 for others)"""
+    state = {}
+    for field in WALK_FIELDS[collection]:
+        if field == "stage":
+            position = {stage: float(i) for i, stage in enumerate(STAGES)}
+            state[field] = np.array([position.get(stage, -1.0) for stage in table["stage"].values()])
+        else:
+            state[field] = numeric(table, field).copy()
+    return state
+
+
+def simulate_shard(task: ShardTask) -> ShardResult:
+    """Walk one shard back from the snapshot over every step (runs on a pool worker)"""
+    rngs = [np.random.default_rng(seed) for seed in task.seeds]
+    steps = len(task.fractions)
+    count = task.table.length
+    times = task.end - task.step_seconds * np.arange(steps - 1, -1, -1)
+    state = _walk_state(task.collection, task.table)
+    static = {field: numeric(task.table, field) for field in STATIC_FIELDS.get(task.collection, ())}
+    draw, back = WALKS[task.collection]
+    sums: State = {}
+    history = {
+        field: _History(task.raw_points, task.rollup_points)
+        for field in ENTITY_METRICS[task.collection] if task.raw_points
+    }
+    writer = _ChangeWriter(task) if task.parquet_dir else None
+
+    blocks = [slice(low, min(low + BLOCK_ENTITIES, count)) for low in range(0, count, BLOCK_ENTITIES)]
+    for stop in range(steps, 0, -task.chunk_rows):
+        start = max(0, stop - task.chunk_rows)
+        fields = {field: np.empty((stop - start, count)) for field in state}
+        # Row r marks the entities that changed from step r - 1 to step r
+        changed = np.hstack([
+            rng.random((stop - start, block.stop - block.start))
+            for rng, block in zip(rngs, blocks)
+        ]) < task.fractions[start:stop, None]
+        if start == 0:
+            changed[0] = False
+        parts = [
+            draw(rng, changed[:, block], {field: values[block] for field, values in static.items()})
+            for rng, block in zip(rngs, blocks)
+        ]
+        draws = {name: np.hstack([part[name] for part in parts]) for name in parts[0]}
+        for row in range(stop - 1 - start, -1, -1):
+            for field, values in fields.items():
+                values[row] = state[field]
+            if row or start:
+                back(state, static, changed[row], {name: values[row] for name, values in draws.items()})
+
+        for name, values in SUMS[task.collection](fields, static).items():
+            sums.setdefault(name, np.empty(steps))[start:stop] = values
+        # The last step is the snapshot itself, which the store records live
+        recorded = min(stop, steps - 1) - start
+        for field, accumulator in history.items():
+            accumulator.add(times[start:start + recorded], fields[field][:recorded])
+        if writer is not None:
+            # Entities picked at a step do not always move (a lead that did not progress, a
+            # zero seat change), so change files take the rows whose values actually differ
+            moved = np.zeros_like(changed)
+            for field, values in fields.items():
+                moved[1:] |= values[1:] != values[:-1]
+                if start:
+                    # ``state`` has been walked back to the step before the chunk
+                    moved[0] |= values[0] != state[field]
+            writer.write(start, times[start:stop], fields, moved)
+
+    return ShardResult(
+        task.collection,
+        task.shard,
+        task.table["id"].to_pylist(),
+        sums,
+        {field: accumulator.result() for field, accumulator in history.items()},
+        writer.files if writer is not None else {"base": [], "changes": []}
+    )
+
+
+def plan(
+    snapshot: Snapshot,
+    days: float,
+    step_seconds: float = 3600,
+    seed: Optional[int] = None,
+    shards: int = 1,
+    entity_retention: Optional[Tuple[int, Dict[str, int]]] = None,
+    parquet_dir: Optional[str] = None,
+    compression: str = "zstd"
+) -> List[ShardTask]:
+    """Split the walk of every ticking collection of a snapshot into shard tasks
+
+    ``entity_retention`` is the time-series store's per-entity raw points
+    and rollup buckets, or None to skip per-entity history.
+    """
+    steps = int(days * 86400 // step_seconds) + 1
+    if steps < 2:
+        raise ValueError("Backfill needs at least one step: days * 86400 must be at least step_seconds")
+    end = datetime.fromisoformat(snapshot.created_at).timestamp()
+    raw_points, rollup_points = entity_retention or (0, {})
+    collections = [name for name in WALKS if name in snapshot.keys() and snapshot.counts()[name]]
+
+    tasks = []
+    for collection, sequence in zip(collections, np.random.SeedSequence(seed).spawn(len(collections))):
+        table = snapshot.table(collection)
+        fractions = np.random.default_rng(sequence).uniform(0.05, 0.15, steps)
+        blocks = -(-table.length // BLOCK_ENTITIES)
+        block_seeds = sequence.spawn(blocks)
+        # Chunk boundaries follow the collection, so every shard consumes its streams alike
+        chunk_rows = max(1, CHUNK_CELLS // table.length)
+        parts = max(1, min(shards, blocks))
+        for shard, shard_blocks in enumerate(np.array_split(np.arange(blocks), parts)):
+            low = int(shard_blocks[0]) * BLOCK_ENTITIES
+            high = min(table.length, (int(shard_blocks[-1]) + 1) * BLOCK_ENTITIES)
+            tasks.append(ShardTask(
+                collection,
+                shard,
+                table if parts == 1 else table.take(np.arange(low, high)),
+                end,
+                step_seconds,
+                fractions,
+                [block_seeds[block] for block in shard_blocks],
+                chunk_rows,
+                raw_points,
+                dict(rollup_points),
+                parquet_dir,
+                compression
+            ))
+    return tasks
+
+
+def finish(
+    snapshot: Snapshot,
+    tasks: Sequence[ShardTask],
+    results: Sequence[ShardResult],
+    timeseries: Optional[TimeSeriesStore] = None,
+    parquet_dir: Optional[str] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Combine shard results: load the time-series store, write the Parquet manifest, return a summary"""
+    task = tasks[0]
+    steps = len(task.fractions)
+    times = task.end - task.step_seconds * np.arange(steps - 1, -1, -1)
+    by_collection: Dict[str, List[ShardResult]] = {}
+    for result in sorted(results, key=lambda result: result.shard):
+        by_collection.setdefault(result.collection, []).append(result)
+
+    summary = {}
+    manifest = {}
+    for collection, shards in by_collection.items():
+        table = snapshot.table(collection)
+        sums = {name: sum(shard.sums[name] for shard in shards)[:-1] for name in shards[0].sums}
+        walked = aggregates_from_sums(collection, sums, table.length)
+        aggregates = {
+            name: walked[name] if name in walked else np.full(steps - 1, value)
+            for name, value in aggregate_metrics(collection, table).items()
+            if name not in NOT_BACKFILLED.get(collection, ())
+        }
+        if timeseries is not None:
+            entities = {}
+            for field in shards[0].history:
+                parts = [shard.history[field] for shard in shards]
+                rollups = parts[0]["rollups"]
+                entities[field] = {
+                    "keys": [key for shard in shards for key in shard.ids],
+                    "raw": {"t": parts[0]["raw"]["t"], "value": np.hstack([part["raw"]["value"] for part in parts])},
+                    "rollups": {
+                        name: {
+                            key: rollups[name][key] if key == "t" else np.hstack([part["rollups"][name][key] for part in parts])
+                            for key in rollups[name]
+                        }
+                        for name in rollups
+                    }
+                }
+            timeseries.load_history(collection, times[:-1], aggregates, entities, task.end)
+        files = {
+            kind: sorted((file for shard in shards for file in shard.files[kind]), key=lambda file: (file["step"], file["path"]))
+            for kind in ("base", "changes")
+        }
+        if parquet_dir:
+            manifest[collection] = {"rows": table.length, **files}
+        summary[collection] = {
+            "entities": table.length,
+            "shards": len(shards),
+            "metrics": len(aggregates),
+            "changedRows": sum(file["rows"] for file in files["changes"])
+        }
+
+    result = {
+        "version": snapshot.version,
+        "start": datetime.fromtimestamp(times[0]).isoformat(),
+        "end": datetime.fromtimestamp(times[-1]).isoformat(),
+        "stepSeconds": task.step_seconds,
+        "steps": steps,
+        "seed": seed,
+        "collections": summary
+    }
+    if parquet_dir:
+        from parquet_export import write_atomic
+
+        encoded = json.dumps({**result, "collections": manifest}, indent=2).encode()
+
+        def write_manifest(path: str):
+            with open(path, "wb") as f:
+                f.write(encoded)
+
+        write_atomic(os.path.join(parquet_dir, MANIFEST), write_manifest)
+    return result
+
+
+def backfill(
+    snapshot: Snapshot,
+    days: float,
+    step_seconds: float = 3600,
+    seed: Optional[int] = None,
+    timeseries: Optional[TimeSeriesStore] = None,
+    parquet_dir: Optional[str] = None,
+    compression: str = "zstd",
+    executor: Optional[ProcessPoolExecutor] = None,
+    shards: int = 1
+) -> Dict[str, Any]:
+    """Backfill ``days`` of history ending at ``snapshot`` (blocking); shards run on ``executor`` if given"""
+    start = time.perf_counter()
+    retention = None
+    if timeseries is not None and timeseries.entity_history:
+        retention = (timeseries.entity_raw_points, timeseries.entity_rollup_points)
+    tasks = plan(snapshot, days, step_seconds, seed, shards, retention, parquet_dir, compression)
+    results = list(executor.map(simulate_shard, tasks)) if executor else [simulate_shard(task) for task in tasks]
+    summary = finish(snapshot, tasks, results, timeseries, parquet_dir, seed)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def _generate(scale: int) -> Snapshot:
+    from data_generator import generator
+    from store import store
+
+    return store.publish({
+        "clients": generator.generate_clients(20 * scale),
+        "licenses": generator.generate_licenses(30 * scale),
+        "leads": generator.generate_leads(25 * scale),
+        "technicians": generator.generate_technicians(15 * scale),
+        "departments": generator.generate_departments(6 * scale),
+    })
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Simulate past ticks and write them as Parquet and/or metric history")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--step", type=float, default=3600, help="seconds between simulated points")
+    parser.add_argument("--scale", type=int, default=1, help="multiplies the default collection sizes")
+    parser.add_argument("--seed", type=int, help="seed for a repeatable walk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="simulation processes")
+    parser.add_argument("--output", default=os.path.join("exports", "_backfill"), help="Parquet directory ('' for none)")
+    parser.add_argument("--timeseries", action="store_true", help="also load an in-memory time-series store")
+    parser.add_argument("--entity-history", action="store_true", help="with --timeseries, keep per-entity series too")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    snapshot = _generate(args.scale)
+    logger.info(f"Generated {snapshot.counts()} in {time.perf_counter() - started:.1f}s")
+
+    timeseries = TimeSeriesStore(entity_history=args.entity_history) if args.timeseries else None
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        summary = backfill(
+            snapshot, args.days, args.step, args.seed, timeseries, args.output or None,
+            executor=executor, shards=args.workers
+        )
+    if timeseries is not None:
+        timeseries.record(snapshot, datetime.fromisoformat(snapshot.created_at).timestamp())
+        summary["timeseriesBytes"] = timeseries.describe()["memoryBytes"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Batch report generation.
+
+Produces many reports from one snapshot in a single pass: any set of report
+types, optionally with the client profitability report split into one
+report per client or per industry. Each collection's columnar table is
+built once and every payload is computed from it exactly once in the
+calling process; only the rendering
+fans out to a process pool. The PDFs are packed into a zip archive or
+written to a directory, both with a ``manifest.json`` describing them.
+
+Command line (reads the owner's shared state file when one exists,
+otherwise generates a fresh data set)::
+
+    python batch_reports.py --types all --group-by client --output month-end.zip
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from report_payloads import REPORT_TYPES, render_payload_bytes
+from store import Snapshot, store
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY = ("client", "industry")
+BATCH_FORMATS = ("zip", "manifest")
+MANIFEST_NAME = "manifest.json"
+
+# Report type that can be split per client or per industry
+GROUPED_REPORT_TYPE = "client-profitability"
+
+
+class BatchEntry(NamedTuple):
+    """One report of a batch, ready to render"""
+    filename: str
+    report_type: str
+    label: str
+    payload: Dict[str, Any]
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-").lower() or "unnamed"
+
+def resolve_report_types(report_types: Optional[Iterable[str]]) -> List[str]:
+    """Validate requested report types; ``None``, empty or ``all`` selects every type"""
+    requested = list(report_types or [])
+    if not requested or requested == ["all"]:
+        return list(REPORT_TYPES)
+    unknown = [report_type for report_type in requested if report_type not in REPORT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown report types: {unknown}")
+    return list(dict.fromkeys(requested))
+
+def plan_batch(
+    snapshot: Snapshot,
+    report_types: Optional[Iterable[str]] = None,
+    group_by: Optional[str] = None,
+    report_data: Optional[Dict[str, Any]] = None,
+    trends: Optional[Dict[str, Dict[str, float]]] = None
+) -> List[BatchEntry]:
+    """Build the payload of every report in the batch
+
+    With ``group_by`` the client profitability report is produced once per
+    client or per industry instead of once for the whole portfolio.
+    ``trends`` holds the trend figures of each collection; they describe the
+    whole collection, so per-group reports are built without them.
+    """
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f"Unknown grouping: {group_by}")
+    report_data = report_data or {}
+    entries = []
+
+    for report_type in resolve_report_types(report_types):
+        collection, build_payload, _ = REPORT_TYPES[report_type]
+        table = snapshot.table(collection)
+
+        if group_by is None or report_type != GROUPED_REPORT_TYPE:
+            payload = build_payload(table, report_data, (trends or {}).get(collection))
+            entries.append(BatchEntry(f"{report_type}.pdf", report_type, "All", payload))
+            continue
+
+        if group_by == "client":
+            names, ids = table["name"].values(), table["id"].values()
+            groups = [(names[i], f"{_slug(names[i])}-{ids[i]}", [i]) for i in range(table.length)]
+        else:
+            industries, members = np.unique(table["industry"].values(), return_inverse=True)
+            groups = [
+                (industry, _slug(industry), np.flatnonzero(members == group))
+                for group, industry in enumerate(industries)
+            ]
+
+        for label, stem, indices in groups:
+            payload = build_payload(table.take(indices), report_data)
+            payload["title"] = f"Client Profitability Report: {label}"
+            entries.append(BatchEntry(f"{report_type}/{stem}.pdf", report_type, label, payload))
+
+    return entries
+
+def _manifest(entries: Sequence[BatchEntry], contents: Sequence[bytes], source: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **source,
+        "generatedAt": datetime.now().isoformat(),
+        "reports": [
+            {
+                "file": entry.filename,
+                "reportType": entry.report_type,
+                "label": entry.label,
+                "bytes": len(content),
+                "sha256": hashlib.sha256(content).hexdigest()
+            }
+            for entry, content in zip(entries, contents)
+        ]
+    }
+
+def write_batch(
+    entries: Sequence[BatchEntry],
+    contents: Sequence[bytes],
+    output: str,
+    batch_format: str = "zip",
+    source: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Write rendered reports as a zip archive or a directory; returns the manifest
+
+    Output appears atomically: it is assembled under a temporary name and
+    renamed into place.
+    """
+    if batch_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format: {batch_format}")
+    manifest = _manifest(entries, contents, source or {})
+    manifest_bytes = json.dumps(manifest, indent=2).encode("utf-8")
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+
+    if batch_format == "zip":
+        # PDF streams are already compressed; storing them keeps packing cheap
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for entry, content in zip(entries, contents):
+                archive.writestr(entry.filename, content)
+            archive.writestr(MANIFEST_NAME, manifest_bytes, compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, output)
+        return manifest
+
+    for entry, content in zip(entries, contents):
+        path = os.path.join(tmp_path, entry.filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    with open(os.path.join(tmp_path, MANIFEST_NAME), "wb") as f:
+        f.write(manifest_bytes)
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.replace(tmp_path, output)
+    return manifest
+
+def prune_batches(directory: str, max_age_seconds: float) -> int:
+    """Delete batch outputs older than ``max_age_seconds``; returns how many were removed"""
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Could not prune batch output {name}: {e}")
+    return removed
+
+def render_entries(entries: Sequence[BatchEntry], executor: ProcessPoolExecutor) -> List[bytes]:
+    """Render every entry on the executor, preserving order"""
+    return list(executor.map(
+        render_payload_bytes,
+        [entry.report_type for entry in entries],
+        [entry.payload for entry in entries]
+    ))
+
+
+def _load_snapshot(state_path: Optional[str]) -> Tuple[Snapshot, Dict[str, Any]]:
+    """Live data from the shared state file if available, else a freshly generated data set"""
+    from shared_store import SharedStoreReader, default_state_path
+
+    path = state_path or default_state_path()
+    if os.path.exists(path):
+        reader = SharedStoreReader(path)
+        reader.refresh()
+        snapshot = reader.snapshot()
+        return snapshot, {"version": snapshot.version, "createdAt": snapshot.created_at, "source": path}
+
+    from data_generator import generate_all_data
+    snapshot = store.publish(generate_all_data())
+    return snapshot, {"version": snapshot.version, "createdAt": snapshot.created_at, "source": "generated"}
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate many Prism reports in one pass")
+    parser.add_argument("--types", default="all", help="comma-separated report types, or 'all'")
+    parser.add_argument("--group-by", choices=GROUP_BY, help="split the client profitability report")
+    parser.add_argument("--format", choices=BATCH_FORMATS, default="zip", dest="batch_format")
+    parser.add_argument("--output", help="zip file or directory (default: reports/batch_<timestamp>)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="rendering processes")
+    parser.add_argument("--state", help="shared state file to read (default: the simulator's)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    snapshot, source = _load_snapshot(args.state)
+    entries = plan_batch(snapshot, args.types.split(","), args.group_by)
+
+    output = args.output or os.path.join(
+        "reports", f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}" + (".zip" if args.batch_format == "zip" else "")
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        contents = render_entries(entries, executor)
+    write_batch(entries, contents, output, args.batch_format, source)
+    logger.info(f"Rendered {len(entries)} reports to {output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks for the simulator; run with ``python -m benchmarks.run``."""
@@ -0,0 +1,219 @@
+"""
+Benchmark harness for ``DynamoDBClient``.
+
+Measures ``batch_write_items``, ``scan_table``, ``update_item`` and
+``clear_table`` for every combination of item count, item size, batch size
+and concurrency, against the in-memory DynamoDB stand-in with injected
+latency and throttling. Each configuration reports throughput, how many
+requests were sent per item, what the stand-in throttled or returned as
+unprocessed, and the retries the AWS SDK performed, so batch size and
+write concurrency (``DYNAMODB_BATCH_SIZE``, ``DYNAMODB_WRITE_CONCURRENCY``)
+can be tuned without touching real tables.
+
+    python -m benchmarks.dynamodb --latency-ms 8 --write-capacity 2000
+    python -m benchmarks.dynamodb --items 5000 --batch-sizes 25 --concurrency 1,2,4,8,16 --throttle-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, List
+
+from benchmarks.fake_dynamodb import Faults, FakeDynamoDBProcess
+from benchmarks.run import summarize
+
+TABLE = "benchmark"
+
+
+def make_items(count: int, item_bytes: int) -> List[Dict[str, Any]]:
+    """Items shaped like the simulator's: an id, a few floats, a nested map and padding to the target size"""
+    items = []
+    for i in range(count):
+        item = {
+            "id": f"item-{i:07d}",
+            "value": i * 1.5,
+            "ratio": (i % 100) / 100,
+            "tags": ["benchmark", f"group-{i % 10}"],
+            "detail": {"score": i * 0.25, "rank": i},
+        }
+        padding = item_bytes - len(json.dumps(item))
+        item["payload"] = "x" * max(0, padding)
+        items.append(item)
+    return items
+
+
+def _delta(after: Dict[str, Any], before: Dict[str, Any], key: str, operation: str) -> int:
+    return after[key].get(operation, 0) - before[key].get(operation, 0)
+
+
+def bench_config(
+    db_client, fake: FakeDynamoDBProcess, count: int, item_bytes: int, batch_size: int, concurrency: int, updates: int
+) -> Dict[str, Any]:
+    from metrics import RETRIES
+
+    fake.reset()
+    items = make_items(count, item_bytes)
+    result: Dict[str, Any] = {"items": count, "itemBytes": item_bytes, "batchSize": batch_size, "concurrency": concurrency}
+
+    retries = RETRIES.value(operation="BatchWriteItem")
+    start = time.perf_counter()
+    try:
+        db_client.batch_write_items(TABLE, items, batch_size=batch_size, concurrency=concurrency)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    stats = fake.stats()
+    requests = stats["requests"].get("BatchWriteItem", 0)
+    written = stats["tables"].get(f"{db_client.table_prefix}{TABLE}", 0)
+    result["write"] = {
+        "seconds": round(elapsed, 4),
+        "itemsPerSecond": round(written / elapsed, 1) if elapsed else 0.0,
+        "written": written,
+        "requests": requests,
+        "requestsPerItem": round(requests / count, 3) if count else 0.0,
+        "throttled": stats["throttled"].get("BatchWriteItem", 0),
+        "unprocessedItems": stats["unprocessedItems"],
+        "sdkRetries": int(RETRIES.value(operation="BatchWriteItem") - retries),
+        "error": error
+    }
+
+    before = stats
+    start = time.perf_counter()
+    scanned = len(db_client.scan_table(TABLE))
+    elapsed = time.perf_counter() - start
+    after = fake.stats()
+    result["scan"] = {
+        "seconds": round(elapsed, 4),
+        "itemsPerSecond": round(scanned / elapsed, 1) if elapsed else 0.0,
+        "items": scanned,
+        "pages": _delta(after, before, "requests", "Scan")
+    }
+
+    # update_item is one request per call; spread the calls over the same number of threads
+    targets = items[:min(updates, count)]
+    latencies: List[float] = []
+
+    def update(item):
+        start = time.perf_counter()
+        try:
+            db_client.update_item(TABLE, {"id": item["id"]}, {"status": "updated", "rank": 1})
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            pass
+
+    before = after
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(update, targets))
+    elapsed = time.perf_counter() - start
+    after = fake.stats()
+    result["update"] = summarize(
+        latencies,
+        callsPerSecond=round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        throttled=_delta(after, before, "throttled", "UpdateItem"),
+        failed=len(targets) - len(latencies)
+    )
+
+    before = after
+    start = time.perf_counter()
+    try:
+        db_client.clear_table(TABLE)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    after = fake.stats()
+    remaining = after["tables"].get(f"{db_client.table_prefix}{TABLE}", 0)
+    result["clear"] = {
+        "seconds": round(elapsed, 4),
+        "itemsPerSecond": round((written - remaining) / elapsed, 1) if elapsed else 0.0,
+        "remaining": remaining,
+        "requests": _delta(after, before, "requests", "BatchWriteItem") + _delta(after, before, "requests", "Scan"),
+        "throttled": _delta(after, before, "throttled", "BatchWriteItem"),
+        "error": error
+    }
+    return result
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+def _print_results(results: List[Dict[str, Any]]):
+    print(f"{'items':>7} {'bytes':>6} {'batch':>5} {'conc':>4} | {'write/s':>9} {'req/item':>8} {'thr':>5} {'unproc':>6} {'retry':>5}"
+          f" | {'scan/s':>9} | {'upd p50':>8} {'upd p99':>8} | {'clear/s':>9}")
+    for r in results:
+        w, u = r["write"], r["update"]
+        print(
+            f"{r['items']:>7} {r['itemBytes']:>6} {r['batchSize']:>5} {r['concurrency']:>4} | "
+            f"{w['itemsPerSecond']:>9.0f} {w['requestsPerItem']:>8.3f} {w['throttled']:>5} {w['unprocessedItems']:>6} {w['sdkRetries']:>5} | "
+            f"{r['scan']['itemsPerSecond']:>9.0f} | {u.get('p50', 0):>8.2f} {u.get('p99', 0):>8.2f} | {r['clear']['itemsPerSecond']:>9.0f}"
+            + (f"  write failed: {w['error']}" if w["error"] else "")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DynamoDBClient against an in-memory DynamoDB with injected faults")
+    parser.add_argument("--items", default="1000", help="Comma separated item counts")
+    parser.add_argument("--item-bytes", default="256,4096", help="Comma separated approximate item sizes")
+    parser.add_argument("--batch-sizes", default="10,25", help="Comma separated items per BatchWriteItem (at most 25)")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma separated writer thread counts")
+    parser.add_argument("--updates", type=int, default=100, help="update_item calls per configuration")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latency added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=2.0, help="Random extra latency per request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of throttling any request")
+    parser.add_argument("--write-capacity", type=float, default=0.0, help="Write units per second; 0 is unlimited")
+    parser.add_argument("--retry-mode", choices=("legacy", "standard", "adaptive"), help="AWS SDK retry mode")
+    parser.add_argument("--max-attempts", type=int, help="AWS SDK attempts per request, including the first")
+    parser.add_argument("--output", default="dynamodb-benchmark.json")
+    args = parser.parse_args()
+
+    faults = Faults(args.latency_ms / 1000, args.jitter_ms / 1000, args.throttle_rate, args.write_capacity)
+    with FakeDynamoDBProcess(faults) as fake:
+        # Set before dynamodb_client is imported: its client is created at import
+        os.environ["AWS_ENDPOINT_URL"] = fake.endpoint_url
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+        if args.retry_mode:
+            os.environ["AWS_RETRY_MODE"] = args.retry_mode
+        if args.max_attempts:
+            os.environ["AWS_MAX_ATTEMPTS"] = str(args.max_attempts)
+        os.environ["DYNAMODB_WRITE_CONCURRENCY"] = str(max(_ints(args.concurrency)))
+        from dynamodb_client import db_client
+
+        results = []
+        for count, item_bytes, batch_size, concurrency in product(
+            _ints(args.items), _ints(args.item_bytes), _ints(args.batch_sizes), _ints(args.concurrency)
+        ):
+            results.append(bench_config(db_client, fake, count, item_bytes, batch_size, concurrency, args.updates))
+            print(f"done: {count} items x {item_bytes} B, batch {batch_size}, concurrency {concurrency}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "faults": {
+                "latencyMs": args.latency_ms,
+                "jitterMs": args.jitter_ms,
+                "throttleRate": args.throttle_rate,
+                "writeCapacity": args.write_capacity
+            },
+            "retryMode": args.retry_mode or os.environ.get("AWS_RETRY_MODE", "legacy"),
+            "maxAttempts": args.max_attempts
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_results(results)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+In-memory stand-in for DynamoDB, for benchmarks.
+
+Speaks enough of the DynamoDB JSON protocol for ``DynamoDBClient``:
+BatchWriteItem (puts and deletes), Scan with pagination, UpdateItem with
+``SET`` expressions, and PutItem/GetItem/DeleteItem. Items are kept in
+wire format, keyed by their ``id`` attribute (``metricType`` and
+``timestamp`` in ``prism-metrics``). Point the AWS SDK at it with
+``AWS_ENDPOINT_URL``.
+
+Faults can be injected to tune clients against: a fixed latency plus
+random jitter per request, a probability of throttling any request, and a
+write capacity in write units per second (one unit per started KB of
+item, as in DynamoDB). Beyond the capacity, BatchWriteItem returns the
+writes it could not afford as ``UnprocessedItems``, and requests of which
+nothing fits are throttled.
+
+``GET /_stats`` returns item counts per table, request counts per
+operation, throttled requests and unprocessed items; ``POST /_reset``
+empties every table and the counters; ``POST /_config`` changes the
+faults at runtime (JSON with any of the ``Faults`` fields).
+
+Run standalone with ``python -m benchmarks.fake_dynamodb --port 8765``, or
+from a benchmark with ``FakeDynamoDBProcess``.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.request import Request, urlopen
+
+CONTENT_TYPE = "application/x-amz-json-1.0"
+# Scan pages are cut at this many items, standing in for DynamoDB's 1 MB page limit
+SCAN_PAGE_ITEMS = 1000
+# Key attributes of tables not keyed by ``id``
+KEY_ATTRIBUTES = {"prism-metrics": ("metricType", "timestamp")}
+
+_SET_CLAUSE = re.compile(r"\s*(#?\w+)\s*=\s*(:\w+)\s*")
+
+
+class DynamoDBError(Exception):
+    def __init__(self, code: str, message: str, status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    # Write units per second shared by all tables; 0 is unlimited
+    write_capacity: float = 0.0
+
+
+class FakeDynamoDB:
+    """Tables of wire-format items plus the request handlers operating on them"""
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.requests: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self.unprocessed = 0
+        self.lock = threading.Lock()
+        self.faults = faults or Faults()
+        self._tokens = self.faults.write_capacity
+        self._refilled = time.monotonic()
+
+    def configure(self, **changes: Any):
+        names = {field.name for field in fields(Faults)}
+        unknown = set(changes) - names
+        if unknown:
+            raise ValueError(f"Unknown faults: {', '.join(sorted(unknown))}")
+        with self.lock:
+            self.faults = Faults(**{**asdict(self.faults), **{k: float(v) for k, v in changes.items()}})
+            self._tokens = self.faults.write_capacity
+            self._refilled = time.monotonic()
+
+    @staticmethod
+    def _write_units(item: Dict[str, Any]) -> int:
+        return max(1, math.ceil(len(json.dumps(item)) / 1024))
+
+    def _take_units(self, units: int) -> bool:
+        """Spend write capacity; False when the bucket cannot cover ``units`` right now"""
+        capacity = self.faults.write_capacity
+        if capacity <= 0:
+            return True
+        now = time.monotonic()
+        # Bursts are capped at one second of capacity
+        self._tokens = min(capacity, self._tokens + (now - self._refilled) * capacity)
+        self._refilled = now
+        if self._tokens < units:
+            return False
+        self._tokens -= units
+        return True
+
+    def _throttle(self, operation: str):
+        self.throttled[operation] += 1
+        raise DynamoDBError(
+            "ProvisionedThroughputExceededException",
+            "The level of configured provisioned throughput for the table was exceeded"
+        )
+
+    @staticmethod
+    def _key(table_name: str, key: Dict[str, Any]) -> str:
+        attributes = KEY_ATTRIBUTES.get(table_name, ("id",))
+        missing = [attribute for attribute in attributes if attribute not in key]
+        if missing:
+            raise DynamoDBError("ValidationException", f"Items must have a {' and '.join(missing)} attribute")
+        return json.dumps([key[attribute] for attribute in attributes], sort_keys=True)
+
+    def handle(self, operation: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = getattr(self, f"op_{operation}", None)
+        if handler is None:
+            raise DynamoDBError("UnknownOperationException", f"Unsupported operation: {operation}")
+        faults = self.faults
+        # Sleep outside the lock so concurrent requests wait in parallel, as they would on the network
+        delay = faults.latency + random.uniform(0, faults.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self.requests[operation] += 1
+            if faults.throttle_rate and random.random() < faults.throttle_rate:
+                self._throttle(operation)
+            return handler(request)
+
+    def op_BatchWriteItem(self, request):
+        unprocessed: Dict[str, list] = {}
+        processed = 0
+        for table_name, writes in request["RequestItems"].items():
+            table = self.tables[table_name]
+            for write in writes:
+                item = write["PutRequest"]["Item"] if "PutRequest" in write else write["DeleteRequest"]["Key"]
+                if not self._take_units(self._write_units(item)):
+                    unprocessed.setdefault(table_name, []).append(write)
+                    continue
+                processed += 1
+                if "PutRequest" in write:
+                    table[self._key(table_name, item)] = item
+                else:
+                    table.pop(self._key(table_name, item), None)
+        if unprocessed and not processed:
+            self._throttle("BatchWriteItem")
+        self.unprocessed += sum(len(writes) for writes in unprocessed.values())
+        return {"UnprocessedItems": unprocessed}
+
+    def op_PutItem(self, request):
+        if not self._take_units(self._write_units(request["Item"])):
+            self._throttle("PutItem")
+        self.tables[request["TableName"]][self._key(request["TableName"], request["Item"])] = request["Item"]
+        return {}
+
+    def op_GetItem(self, request):
+        item = self.tables[request["TableName"]].get(self._key(request["TableName"], request["Key"]))
+        return {"Item": item} if item is not None else {}
+
+    def op_DeleteItem(self, request):
+        if not self._take_units(1):
+            self._throttle("DeleteItem")
+        self.tables[request["TableName"]].pop(self._key(request["TableName"], request["Key"]), None)
+        return {}
+
+    def op_UpdateItem(self, request):
+        table = self.tables[request["TableName"]]
+        key = self._key(request["TableName"], request["Key"])
+        item = dict(table.get(key) or request["Key"])
+        expression = request.get("UpdateExpression", "")
+        if not expression.upper().startswith("SET "):
+            raise DynamoDBError("ValidationException", "Only SET update expressions are supported")
+        names = request.get("ExpressionAttributeNames", {})
+        values = request.get("ExpressionAttributeValues", {})
+        for clause in expression[4:].split(","):
+            match = _SET_CLAUSE.fullmatch(clause)
+            if match is None:
+                raise DynamoDBError("ValidationException", f"Unsupported update clause: {clause.strip()}")
+            name, value = match.groups()
+            item[names.get(name, name)] = values[value]
+        if not self._take_units(self._write_units(item)):
+            self._throttle("UpdateItem")
+        table[key] = item
+        return {}
+
+    def op_Scan(self, request):
+        table = self.tables[request["TableName"]]
+        keys = sorted(table)
+        start = 0
+        if "ExclusiveStartKey" in request:
+            # Keys are visited in sorted order, so resume after the last key returned
+            last = self._key(request["TableName"], request["ExclusiveStartKey"])
+            start = next((i for i, key in enumerate(keys) if key > last), len(keys))
+        limit = min(request.get("Limit", SCAN_PAGE_ITEMS), SCAN_PAGE_ITEMS)
+        page = [table[key] for key in keys[start:start + limit]]
+        response = {"Items": page, "Count": len(page), "ScannedCount": len(page)}
+        if start + limit < len(keys):
+            attributes = KEY_ATTRIBUTES.get(request["TableName"], ("id",))
+            response["LastEvaluatedKey"] = {attribute: page[-1][attribute] for attribute in attributes}
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "tables": {name: len(items) for name, items in self.tables.items()},
+                "requests": dict(self.requests),
+                "throttled": dict(self.throttled),
+                "unprocessedItems": self.unprocessed,
+                "faults": asdict(self.faults)
+            }
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.requests.clear()
+            self.throttled.clear()
+            self.unprocessed = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, every response waits for a delayed ACK
+    disable_nagle_algorithm = True
+    server: "FakeDynamoDBServer"
+
+    def _send(self, status: int, body: Dict[str, Any], content_type: str = CONTENT_TYPE):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            self._send(200, self.server.db.stats(), "application/json")
+        else:
+            self._send(404, {"message": "Not found"}, "application/json")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/_reset":
+            self.server.db.reset()
+            self._send(200, {}, "application/json")
+            return
+        if self.path == "/_config":
+            try:
+                self.server.db.configure(**json.loads(body or b"{}"))
+            except (TypeError, ValueError) as e:
+                self._send(400, {"message": str(e)}, "application/json")
+                return
+            self._send(200, self.server.db.stats()["faults"], "application/json")
+            return
+        operation = (self.headers.get("X-Amz-Target") or "").rpartition(".")[2]
+        try:
+            self._send(200, self.server.db.handle(operation, json.loads(body or b"{}")))
+        except DynamoDBError as e:
+            self._send(e.status, {"__type": f"com.amazonaws.dynamodb.v20120810#{e.code}", "message": str(e)})
+        except (KeyError, ValueError) as e:
+            self._send(400, {"__type": "com.amazon.coral.validate#ValidationException", "message": repr(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDynamoDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, db: Optional[FakeDynamoDB] = None):
+        super().__init__((host, port), _Handler)
+        self.db = db or FakeDynamoDB()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[0], self.server_address[1]
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeDynamoDBServer":
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-dynamodb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeDynamoDBProcess:
+    """The stand-in in a child process, so it does not share the GIL with the code being measured"""
+
+    def __init__(self, faults: Optional[Faults] = None):
+        self.faults = faults or Faults()
+        self.endpoint_url = ""
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 10.0) -> "FakeDynamoDBProcess":
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.endpoint_url = f"http://127.0.0.1:{port}"
+        faults = self.faults
+        self._process = subprocess.Popen(
+            [
+                sys.executable, "-m", "benchmarks.fake_dynamodb", "--port", str(port),
+                "--latency-ms", str(faults.latency * 1000), "--jitter-ms", str(faults.jitter * 1000),
+                "--throttle-rate", str(faults.throttle_rate), "--write-capacity", str(faults.write_capacity)
+            ],
+            cwd=Path(__file__).resolve().parent.parent, stdout=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.stats()
+                return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("Fake DynamoDB did not start")
+                time.sleep(0.05)
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+
+    def __enter__(self) -> "FakeDynamoDBProcess":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _call(self, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        with urlopen(Request(f"{self.endpoint_url}{path}", data=data, method="POST" if data is not None else "GET")) as response:
+            return json.load(response)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._call("/_stats")
+
+    def reset(self):
+        self._call("/_reset", {})
+
+    def configure(self, **faults: float) -> Dict[str, Any]:
+        return self._call("/_config", faults)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory DynamoDB stand-in for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this much")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of throttling a request")
+    parser.add_argument("--write-capacity", type=float, default=0.0, help="Write units per second; 0 is unlimited")
+    args = parser.parse_args()
+
+    faults = Faults(args.latency_ms / 1000, args.jitter_ms / 1000, args.throttle_rate, args.write_capacity)
+    server = FakeDynamoDBServer(args.host, args.port, FakeDynamoDB(faults))
+    print(f"Fake DynamoDB listening on {server.endpoint_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Minimal asyncio HTTP/1.1 load client.
+
+Each simulated client holds one keep-alive connection and issues requests
+back to back until the shared request budget is spent, so ``concurrency``
+is the number of requests in flight. Only what the simulator's API needs
+is implemented: GET/POST, ``Content-Length`` and chunked bodies.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class LoadResult:
+    path: str
+    concurrency: int
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    bytes_received: int = 0
+    elapsed: float = 0.0
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    return await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+async def request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    host: str,
+    path: str,
+    method: str = "GET",
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None
+) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one request on an open connection and read the full response"""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    status = int(status_line.split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    return status, response_headers, await _read_body(reader, response_headers)
+
+
+async def run_load(
+    host: str,
+    port: int,
+    path: str,
+    concurrency: int,
+    total_requests: int,
+    method: str = "GET",
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None
+) -> LoadResult:
+    """Issue ``total_requests`` requests to ``path`` from ``concurrency`` clients"""
+    result = LoadResult(path=path, concurrency=concurrency)
+    remaining = [total_requests]
+
+    async def client():
+        reader = writer = None
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                start = time.perf_counter()
+                status, response_headers, content = await request(reader, writer, host, path, method, body, headers)
+                result.latencies.append(time.perf_counter() - start)
+                result.statuses[status] = result.statuses.get(status, 0) + 1
+                result.bytes_received += len(content)
+                if response_headers.get("connection", "").lower() == "close":
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                result.errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
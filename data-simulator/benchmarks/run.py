@@ -0,0 +1,392 @@
+"""
+Benchmark suite for the simulator.
+
+Suites:
+- ``generation``: building every collection at several scale factors
+- ``ticks``: ``update_data_realtime`` per collection at each scale
+- ``serialization``: ``model_dump`` and Decimal conversion for the sync
+- ``sync``: writing every collection through ``DynamoDBClient``
+- ``api``: startup time and each collection endpoint under concurrent
+  clients, against a real uvicorn server
+- ``reports``: rendering each report type
+
+Everything talks to the in-memory DynamoDB stand-in in
+``benchmarks.fake_dynamodb``, started on a free port for the run, so no AWS
+account is touched. Results are written as JSON; pass ``--baseline`` with
+an earlier results file to flag regressions (exit status 1). The
+performance budgets quoted in the README are checked and reported on every
+run; with ``--enforce-budgets`` a result over budget also fails the run.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --baseline results.json --enforce-budgets
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.fake_dynamodb import FakeDynamoDBProcess
+from benchmarks.load import request, run_load
+
+SIMULATOR_DIR = Path(__file__).resolve().parent.parent
+SUITES = ("generation", "ticks", "serialization", "sync", "api", "reports")
+
+# Collection sizes of generate_all_data(); scale factors multiply these
+BASE_COUNTS = {
+    "clients": 20,
+    "licenses": 30,
+    "leads": 25,
+    "technicians": 15,
+    "departments": 6,
+    "vendors": 15,
+    "contracts": 20
+}
+
+API_PATHS = (
+    "/health",
+    "/api/clients",
+    "/api/licenses",
+    "/api/leads",
+    "/api/technicians",
+    "/api/departments",
+    "/api/vendors",
+    "/api/contracts",
+    "/api/stats"
+)
+
+# README performance figures: result name pattern -> (statistic, limit in ms)
+BUDGETS = {
+    "generation.all.x1": ("p50", 1000.0),
+    "api.startup": ("max", 2000.0),
+    "api.ready": ("max", 2000.0),
+    "api./api/*": ("p95", 100.0),
+    "report.*": ("p50", 3000.0),
+}
+
+
+def summarize(samples: Sequence[float], **extra: Any) -> Dict[str, Any]:
+    """Latency statistics in milliseconds for samples in seconds"""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    if len(values) == 0:
+        return {"unit": "ms", "samples": 0, **extra}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "unit": "ms",
+        "samples": int(len(values)),
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "min": round(float(values.min()), 4),
+        "max": round(float(values.max()), 4),
+        **extra
+    }
+
+def timed(fn: Callable[[], Any], repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def generate_scaled(scale: int) -> Dict[str, List]:
+    from data_generator import generator
+    return {name: getattr(generator, f"generate_{name}")(count * scale) for name, count in BASE_COUNTS.items()}
+
+
+def bench_generation(scales: Sequence[int], repeats: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for scale in scales:
+        items = sum(BASE_COUNTS.values()) * scale
+        samples = timed(lambda: generate_scaled(scale), max(1, repeats // scale))
+        results[f"generation.all.x{scale}"] = summarize(samples, items=items, itemsPerSecond=round(items / np.median(samples)))
+    return results
+
+def bench_ticks(scales: Sequence[int], repeats: int) -> Dict[str, Dict[str, Any]]:
+    from data_generator import generator
+    results = {}
+    for scale in scales:
+        data = generate_scaled(scale)
+        for name, items in data.items():
+            current = [items]
+
+            def tick():
+                current[0] = generator.update_data_realtime(name, current[0])
+
+            results[f"tick.{name}.x{scale}"] = summarize(timed(tick, repeats), items=len(items))
+    return results
+
+def bench_serialization(scales: Sequence[int], repeats: int) -> Dict[str, Dict[str, Any]]:
+    from dynamodb_client import db_client
+    results = {}
+    for scale in scales:
+        data = generate_scaled(scale)
+        items = sum(len(collection) for collection in data.values())
+        dumped = {name: [item.model_dump() for item in collection] for name, collection in data.items()}
+        runs = max(1, repeats // scale)
+
+        dump_samples = timed(lambda: [[item.model_dump() for item in c] for c in data.values()], runs)
+        results[f"serialize.model_dump.x{scale}"] = summarize(
+            dump_samples, items=items, itemsPerSecond=round(items / np.median(dump_samples))
+        )
+        decimal_samples = timed(
+            lambda: [[db_client.convert_floats_to_decimal(item) for item in c] for c in dumped.values()], runs
+        )
+        results[f"serialize.decimal.x{scale}"] = summarize(
+            decimal_samples, items=items, itemsPerSecond=round(items / np.median(decimal_samples))
+        )
+    return results
+
+def bench_sync(scales: Sequence[int], repeats: int, fake: FakeDynamoDBProcess) -> Dict[str, Dict[str, Any]]:
+    from dynamodb_client import db_client
+    results = {}
+    for scale in scales:
+        data = generate_scaled(scale)
+        items = sum(len(collection) for collection in data.values())
+
+        def sync():
+            for name, collection in data.items():
+                db_client.batch_write_items(name, [item.model_dump() for item in collection])
+
+        samples = timed(sync, max(1, repeats // scale))
+        stored = fake.stats()["tables"]
+        written = sum(stored.get(f"{db_client.table_prefix}{name}", 0) for name in data)
+        if written < items:
+            raise RuntimeError(f"Sync benchmark wrote {written} of {items} items")
+        results[f"sync.all.x{scale}"] = summarize(samples, items=items, itemsPerSecond=round(items / np.median(samples)))
+    return results
+
+
+def bench_reports(repeats: int) -> Dict[str, Dict[str, Any]]:
+    from data_generator import generator
+    from report_payloads import REPORT_TYPES, render_report_timed
+    from store import DataStore
+
+    results = {}
+    store = DataStore()
+    store.publish(generate_scaled(1))
+    for report_type, (collection, _, _) in REPORT_TYPES.items():
+        samples, stages = [], {}
+        for _ in range(repeats):
+            # A tick between runs changes the data, so charts are drawn rather than served from cache
+            snapshot = store.update({collection: lambda items: generator.update_data_realtime(collection, items)})
+            start = time.perf_counter()
+            content, timings = render_report_timed(report_type, snapshot.table(collection), {})
+            samples.append(time.perf_counter() - start)
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds * 1000)
+        results[f"report.{report_type}"] = summarize(
+            samples, bytes=len(content), stagesMeanMs={stage: round(float(np.mean(v)), 3) for stage, v in stages.items()}
+        )
+    return results
+
+
+async def _wait_for(port: int, path: str, timeout: float) -> float:
+    """Seconds until ``path`` answers 200"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                status, _, _ = await request(reader, writer, "127.0.0.1", path)
+            finally:
+                writer.close()
+            if status == 200:
+                return time.perf_counter() - start
+        except OSError:
+            pass
+        await asyncio.sleep(0.02)
+    raise TimeoutError(f"{path} did not answer 200 within {timeout:.0f}s")
+
+async def _wait_started(port: int, timeout: float) -> Dict[str, float]:
+    # Liveness comes first (port open); readiness once the initial data is generated
+    live = await _wait_for(port, "/health", timeout)
+    ready = await _wait_for(port, "/ready", timeout)
+    return {"live": live, "ready": live + ready}
+
+async def _bench_endpoints(port: int, concurrency: int, requests: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for path in API_PATHS:
+        await run_load("127.0.0.1", port, path, concurrency, min(requests, 20))
+        load = await run_load("127.0.0.1", port, path, concurrency, requests)
+        results[f"api.{path}"] = summarize(
+            load.latencies,
+            concurrency=concurrency,
+            requestsPerSecond=round(len(load.latencies) / load.elapsed, 1) if load.elapsed else 0.0,
+            errors=load.errors + sum(count for status, count in load.statuses.items() if status >= 400),
+            bytesPerResponse=round(load.bytes_received / max(1, len(load.latencies)))
+        )
+    return results
+
+def bench_api(concurrency: int, requests: int, endpoint_url: str, verbose: bool) -> Dict[str, Dict[str, Any]]:
+    port = free_port()
+    env = {**os.environ, "AWS_ENDPOINT_URL": endpoint_url, "STORE_ROLE": "standalone", "PORT": str(port)}
+    output = None if verbose else subprocess.DEVNULL
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SIMULATOR_DIR, env=env, stdout=output, stderr=output
+    )
+    try:
+        startup = asyncio.run(_wait_started(port, 60))
+        results = {"api.startup": summarize([startup["live"]]), "api.ready": summarize([startup["ready"]])}
+        results.update(asyncio.run(_bench_endpoints(port, concurrency, requests)))
+        return results
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def check_budgets(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    checks = {}
+    for pattern, (stat, limit) in BUDGETS.items():
+        for name, result in results.items():
+            if fnmatch.fnmatchcase(name, pattern) and stat in result:
+                checks[name] = {"stat": stat, "limitMs": limit, "valueMs": result[stat], "ok": result[stat] <= limit}
+    return checks
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float, min_delta_ms: float) -> Dict[str, Dict[str, Any]]:
+    """p50 of every result against the baseline; slower beyond the tolerance is a regression"""
+    comparison = {}
+    for name, result in results.items():
+        before = baseline.get(name, {}).get("p50")
+        if before is None or "p50" not in result:
+            continue
+        after = result["p50"]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + tolerance and after - before > min_delta_ms:
+            status = "regression"
+        elif ratio < 1 - tolerance and before - after > min_delta_ms:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        comparison[name] = {"baseline": before, "current": after, "ratio": round(ratio, 3), "status": status}
+    return comparison
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SIMULATOR_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _print_report(report: Dict[str, Any]):
+    print(f"{'benchmark':<42} {'p50':>10} {'p95':>10} {'p99':>10}  ms")
+    for name, result in report["results"].items():
+        if "p50" in result:
+            print(f"{name:<42} {result['p50']:>10.3f} {result['p95']:>10.3f} {result['p99']:>10.3f}")
+    for name, check in report["budgets"].items():
+        if not check["ok"]:
+            print(f"over budget: {name} {check['stat']} {check['valueMs']:.1f} ms > {check['limitMs']:.0f} ms")
+    for name, entry in (report.get("comparison") or {}).items():
+        if entry["status"] != "unchanged":
+            print(f"{entry['status']}: {name} p50 {entry['baseline']:.3f} -> {entry['current']:.3f} ms (x{entry['ratio']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulator against an in-memory DynamoDB")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--scales", default="1,10,100", help="Scale factors applied to the default collection sizes")
+    parser.add_argument("--repeats", type=int, default=50, help="Repetitions per micro benchmark (fewer at larger scales)")
+    parser.add_argument("--report-repeats", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent API clients")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per API endpoint")
+    parser.add_argument("--quick", action="store_true", help="Small scales and repeat counts, for a smoke run")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative p50 slowdown that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Ignore p50 changes smaller than this")
+    parser.add_argument("--enforce-budgets", action="store_true", help="Exit with status 1 when a result is over budget")
+    parser.add_argument("--verbose", action="store_true", help="Show the API server's output")
+    args = parser.parse_args()
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    scales = [int(scale) for scale in args.scales.split(",")]
+    if args.quick:
+        scales = [scale for scale in scales if scale <= 10] or [1]
+        args.repeats, args.report_repeats, args.requests = 5, 1, 100
+
+    fake = FakeDynamoDBProcess().start()
+    # Set before the simulator's modules are imported: the DynamoDB client is created at import
+    os.environ["AWS_ENDPOINT_URL"] = fake.endpoint_url
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for suite in suites:
+            start = time.perf_counter()
+            if suite == "generation":
+                results.update(bench_generation(scales, args.repeats))
+            elif suite == "ticks":
+                results.update(bench_ticks(scales, args.repeats))
+            elif suite == "serialization":
+                results.update(bench_serialization(scales, args.repeats))
+            elif suite == "sync":
+                results.update(bench_sync(scales, args.repeats, fake))
+            elif suite == "api":
+                results.update(bench_api(args.concurrency, args.requests, fake.endpoint_url, args.verbose))
+            elif suite == "reports":
+                results.update(bench_reports(args.report_repeats))
+            print(f"{suite}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    finally:
+        fake.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "suites": suites,
+            "scales": scales,
+            "repeats": args.repeats,
+            "concurrency": args.concurrency,
+            "requests": args.requests
+        },
+        "results": results,
+        "budgets": check_budgets(results)
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(results, baseline.get("results", {}), args.tolerance, args.min_delta_ms)
+        regressions = [name for name, entry in report["comparison"].items() if entry["status"] == "regression"]
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_report(report)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    over_budget = [name for name, check in report["budgets"].items() if not check["ok"]]
+    sys.exit(1 if regressions or (args.enforce_budgets and over_budget) else 0)
+
+if __name__ == "__main__":
+    main()
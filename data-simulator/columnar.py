@@ -0,0 +1,184 @@
+"""
+Columnar representation of store collections.
+
+Each field of a collection becomes one column backed by flat NumPy buffers
+laid out like Apache Arrow arrays: numeric values, booleans as bytes, strings
+as int32 offsets plus a UTF-8 data buffer, and lists of strings as an extra
+level of offsets. Because the buffers are plain byte ranges they can be
+written to shared memory and mapped back zero-copy.
+"""
+
+import typing
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+# Column kind -> dtypes of its buffers, in order
+BUFFER_DTYPES = {
+    "float64": ("float64",),
+    "int64": ("int64",),
+    "bool": ("uint8",),
+    "str": ("int32", "uint8"),
+    "list_str": ("int32", "int32", "uint8"),
+}
+
+def field_kinds(model: Type[BaseModel]) -> Dict[str, str]:
+    """Map every field of a model to its column kind"""
+    kinds = {}
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if annotation is float:
+            kinds[name] = "float64"
+        elif annotation is bool:
+            kinds[name] = "bool"
+        elif annotation is int:
+            kinds[name] = "int64"
+        elif annotation is str:
+            kinds[name] = "str"
+        elif typing.get_origin(annotation) in (list, List) and typing.get_args(annotation) == (str,):
+            kinds[name] = "list_str"
+        else:
+            raise TypeError(f"Unsupported field type for {model.__name__}.{name}: {annotation}")
+    return kinds
+
+def _encode_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int32, count=len(encoded)), out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, data
+
+def _decode_strings(offsets: np.ndarray, data: np.ndarray, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    stop = len(offsets) - 1 if stop is None else stop
+    bounds = offsets[start:stop + 1].tolist()
+    blob = data[bounds[0]:bounds[-1]].tobytes() if bounds else b""
+    base = bounds[0] if bounds else 0
+    return [blob[lo - base:hi - base].decode("utf-8") for lo, hi in zip(bounds, bounds[1:])]
+
+
+class Column:
+    """A single immutable column made of Arrow-style buffers"""
+
+    __slots__ = ("name", "kind", "buffers", "_values")
+
+    def __init__(self, name: str, kind: str, buffers: Tuple[np.ndarray, ...]):
+        self.name = name
+        self.kind = kind
+        self.buffers = buffers
+        self._values = None
+
+    @classmethod
+    def from_values(cls, name: str, kind: str, values: Sequence[Any]) -> "Column":
+        if kind == "float64":
+            buffers = (np.fromiter(values, dtype=np.float64, count=len(values)),)
+        elif kind == "int64":
+            buffers = (np.fromiter(values, dtype=np.int64, count=len(values)),)
+        elif kind == "bool":
+            buffers = (np.fromiter(values, dtype=np.uint8, count=len(values)),)
+        elif kind == "str":
+            buffers = _encode_strings(values)
+        elif kind == "list_str":
+            list_offsets = np.zeros(len(values) + 1, dtype=np.int32)
+            np.cumsum(np.fromiter(map(len, values), dtype=np.int32, count=len(values)), out=list_offsets[1:])
+            offsets, data = _encode_strings([item for value in values for item in value])
+            buffers = (list_offsets, offsets, data)
+        else:
+            raise ValueError(f"Unknown column kind: {kind}")
+        return cls(name, kind, buffers)
+
+    def __len__(self) -> int:
+        if self.kind in ("float64", "int64", "bool"):
+            return len(self.buffers[0])
+        return len(self.buffers[0]) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers)
+
+    def values(self) -> np.ndarray:
+        """Values as a NumPy array (zero-copy for numeric kinds)"""
+        if self._values is None:
+            if self.kind in ("float64", "int64"):
+                self._values = self.buffers[0]
+            elif self.kind == "bool":
+                self._values = self.buffers[0].view(np.bool_)
+            elif self.kind == "str":
+                self._values = np.array(self.to_pylist(), dtype=object)
+            else:
+                # Filled element by element: np.array would turn equal-length lists into a 2-D array
+                self._values = np.empty(len(self), dtype=object)
+                for i, items in enumerate(self.to_pylist()):
+                    self._values[i] = items
+        return self._values
+
+    def take(self, indices: np.ndarray) -> "Column":
+        """New column holding the rows at ``indices``, in that order"""
+        if self.kind in ("float64", "int64", "bool"):
+            return Column(self.name, self.kind, (self.buffers[0][indices],))
+        return Column.from_values(self.name, self.kind, self.values()[indices].tolist())
+
+    def to_pylist(self, start: int = 0, stop: Optional[int] = None) -> List[Any]:
+        """Decode a range of the column into Python objects"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if self.kind in ("float64", "int64"):
+            return self.buffers[0][start:stop].tolist()
+        if self.kind == "bool":
+            return self.buffers[0][start:stop].astype(bool).tolist()
+        if self.kind == "str":
+            return _decode_strings(self.buffers[0], self.buffers[1], start, stop)
+
+        list_offsets, offsets, data = self.buffers
+        bounds = list_offsets[start:stop + 1].tolist()
+        if not bounds:
+            return []
+        items = _decode_strings(offsets, data, bounds[0], bounds[-1])
+        base = bounds[0]
+        return [items[lo - base:hi - base] for lo, hi in zip(bounds, bounds[1:])]
+
+
+class ColumnarTable:
+    """Immutable column-oriented copy of one collection"""
+
+    def __init__(self, name: str, model: Type[BaseModel], length: int, columns: Dict[str, Column]):
+        self.name = name
+        self.model = model
+        self.length = length
+        self.columns = columns
+
+    @classmethod
+    def from_models(cls, name: str, model: Type[BaseModel], items: Sequence[BaseModel]) -> "ColumnarTable":
+        columns = {
+            field: Column.from_values(field, kind, [getattr(item, field) for item in items])
+            for field, kind in field_kinds(model).items()
+        }
+        return cls(name, model, len(items), columns)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, field: str) -> Column:
+        return self.columns[field]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def take(self, indices: Sequence[int]) -> "ColumnarTable":
+        """New table holding the rows at ``indices``, in that order"""
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {field: column.take(indices) for field, column in self.columns.items()}
+        return ColumnarTable(self.name, self.model, len(indices), columns)
+
+    def iter_rows(self, chunk_size: int = 1024) -> Iterator[Dict[str, Any]]:
+        """Yield rows as dicts, decoding ``chunk_size`` rows at a time"""
+        fields = list(self.columns)
+        for start in range(0, self.length, chunk_size):
+            stop = min(start + chunk_size, self.length)
+            chunk = [self.columns[field].to_pylist(start, stop) for field in fields]
+            for values in zip(*chunk):
+                yield dict(zip(fields, values))
+
+    def to_models(self) -> List[BaseModel]:
+        """Materialize the rows as model instances without re-validation"""
+        return [self.model.model_construct(**row) for row in self.iter_rows()]
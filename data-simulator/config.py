@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     aws_region: str = "us-east-2"
@@ -7,8 +7,91 @@ class Settings(BaseSettings):
     aws_secret_access_key: str = ""
     aws_session_token: Optional[str] = None
     dynamodb_table_prefix: str = "prism-"
+    # Items per BatchWriteItem request (at most 25) and threads writing batches in parallel
+    dynamodb_batch_size: int = 25
+    dynamodb_write_concurrency: int = 1
     update_interval_seconds: int = 30
+    # Per-entity cadence overrides in seconds, e.g. TICK_INTERVALS='{"licenses": 5, "departments": 300}'
+    tick_intervals: Dict[str, float] = {}
+    # skip | catch_up: what to do with slots missed when a tick overruns
+    tick_overrun_policy: str = "skip"
+    tick_max_catch_up: int = 3
+    # Append every published change to this tick log (empty disables recording)
+    tick_record_path: str = ""
+    # Drive the store from a recorded tick log instead of simulating (owner/standalone)
+    tick_replay_path: str = ""
+    # Multiple of the recorded pace: 1 is real time, 100 is 100x, 0 is as fast as possible
+    tick_replay_speed: float = 1.0
+    # Start the log over from its first frame when it ends
+    tick_replay_loop: bool = False
+    # standalone | owner | reader | auto (first process to start owns the simulation)
+    store_role: str = "standalone"
+    shared_store_path: str = ""
+    shared_store_poll_seconds: float = 0.5
     port: int = 8000
+    # Background jobs: process pool size, running jobs per type, extra queued jobs per type
+    job_workers: int = 2
+    job_concurrency: Dict[str, int] = {"regenerate": 1, "report": 2, "batch": 1, "backfill": 1}
+    job_queue_limits: Dict[str, int] = {"regenerate": 1, "report": 8, "batch": 2, "backfill": 0}
+    job_history_size: int = 200
+    # Batch report archives and directories, deleted once older than the retention period
+    batch_output_dir: str = "reports/batches"
+    batch_retention_hours: float = 24
+    # Rendered reports, evicted least recently used beyond these limits. Empty keeps
+    # them in memory (next to the shared state file when several workers serve the API)
+    report_cache_dir: str = ""
+    report_cache_max_entries: int = 50
+    report_cache_max_bytes: int = 200 * 1024 * 1024
+    # Report charts: png or svg (vector, needs svglib), raster resolution, render cache budget
+    chart_format: str = "png"
+    chart_dpi: int = 150
+    chart_cache_max_bytes: int = 32 * 1024 * 1024
+    # Load the report stack and AWS SDK (and warm up job workers) in the background after startup
+    prewarm_enabled: bool = True
+    prewarm_delay_seconds: float = 1.0
+    # Event loop watchdog: the loop thread's stack is captured when it is blocked past the threshold
+    loop_monitor_enabled: bool = True
+    loop_lag_threshold_seconds: float = 0.25
+    loop_monitor_interval_seconds: float = 0.05
+    # /debug endpoints are off unless enabled; when a token is set, requests must send it
+    debug_endpoints_enabled: bool = False
+    debug_token: str = ""
+    # /debug/profile: longest sampling window accepted and the interval between stack samples
+    profile_max_seconds: float = 60.0
+    profile_interval_seconds: float = 0.005
+    # Collection responses: smallest body worth compressing, and the gzip / brotli levels
+    response_compression_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 5
+    # Rows per record batch of Arrow IPC collection responses
+    arrow_batch_rows: int = 65536
+    # Rows per flushed chunk of ?format=ndjson collection responses
+    ndjson_chunk_rows: int = 1000
+    # Background Parquet export (needs pyarrow): directory, cadence, codec, and a full export every N runs
+    parquet_export_enabled: bool = False
+    parquet_export_dir: str = "exports"
+    parquet_export_interval_seconds: float = 300.0
+    parquet_export_compression: str = "zstd"
+    parquet_export_full_every: int = 12
+    # Metric history: points kept at raw resolution and per 1m/1h/1d rollup, for aggregates and per entity
+    timeseries_enabled: bool = True
+    timeseries_raw_points: int = 720
+    timeseries_rollup_points: Dict[str, int] = {"1m": 1440, "1h": 720, "1d": 365}
+    # Per-entity history is opt-in: every entity field gets its own float32 rings
+    timeseries_entity_history: bool = False
+    timeseries_entity_raw_points: int = 120
+    timeseries_entity_rollup_points: Dict[str, int] = {"1m": 60, "1h": 48, "1d": 30}
+    # Also write aggregate points to the prism-metrics table, expiring after this many days
+    timeseries_dynamodb_enabled: bool = False
+    timeseries_dynamodb_ttl_days: float = 30
+    # Simulated history written at startup: days back (0 is off), seconds between points, targets
+    # (timeseries and/or parquet, under PARQUET_EXPORT_DIR/_backfill) and a seed for a repeatable walk
+    backfill_days: float = 0
+    backfill_step_seconds: float = 3600
+    backfill_targets: List[str] = ["timeseries"]
+    backfill_seed: Optional[int] = None
+    # Report trend percentages compare current figures with this far back
+    report_trend_window_seconds: float = 86400
     
     class Config:
         env_file = ".env"
@@ -1,7 +1,7 @@
 import random
 from datetime import datetime, timedelta
 from faker import Faker
-from typing import List
+from typing import Dict, List, Sequence
 from models import Client, License, Lead, Technician, Department, Vendor, Contract
 
 fake = Faker()
@@ -183,37 +183,48 @@ class DataGenerator:
             ))
         return contracts
     
-    def update_data_realtime(self, data_type: str, existing_data: List):
-        """Simulate realistic real-time changes to existing data"""
-        if not existing_data:
-            return existing_data
+    def update_data_realtime(self, data_type: str, existing_data: Sequence) -> List:
+        """Simulate realistic real-time changes to existing data
+
+        Copy-on-write: returns a new list in which only the changed entities
+        are replaced by updated copies; everything else is shared with
+        ``existing_data``, which is left untouched.
+        """
+        updated_data = list(existing_data)
+        if not updated_data:
+            return updated_data
         
         # Update fewer items (5-15% of data for realistic changes)
-        update_count = max(1, int(len(existing_data) * random.uniform(0.05, 0.15)))
-        items_to_update = random.sample(existing_data, update_count)
+        update_count = max(1, int(len(updated_data) * random.uniform(0.05, 0.15)))
+        indices_to_update = random.sample(range(len(updated_data)), update_count)
         
-        for item in items_to_update:
+        for index in indices_to_update:
+            item = updated_data[index]
+            changes = {}
+            
             if data_type == "clients":
                 # Small, realistic revenue/cost fluctuations (±2-5%)
                 revenue_change = random.uniform(0.98, 1.05)
-                item.annualRevenue = round(item.annualRevenue * revenue_change, 2)
+                annual_revenue = round(item.annualRevenue * revenue_change, 2)
                 # Costs should stay proportional to revenue (60-80%)
                 cost_ratio = random.uniform(0.6, 0.8)
-                item.annualCosts = round(item.annualRevenue * cost_ratio, 2)
-                item.monthlyRecurring = round(item.annualRevenue / 12, 2)
+                changes["annualRevenue"] = annual_revenue
+                changes["annualCosts"] = round(annual_revenue * cost_ratio, 2)
+                changes["monthlyRecurring"] = round(annual_revenue / 12, 2)
                 
                 # Rare status changes (5% chance)
                 if random.random() < 0.05:
                     # Maintain mostly active clients
-                    item.status = random.choice(["Active", "Active", "Active", "Active", "At Risk"])
-                    item.churnRisk = random.choice(["Low", "Low", "Low", "Medium", "High"])
+                    changes["status"] = random.choice(["Active", "Active", "Active", "Active", "At Risk"])
+                    changes["churnRisk"] = random.choice(["Low", "Low", "Low", "Medium", "High"])
                     
             elif data_type == "licenses":
                 # Small license usage changes (±1-5 licenses)
                 change = random.randint(-2, 5)
-                item.usedLicenses = max(0, min(item.totalLicenses, item.usedLicenses + change))
-                item.availableLicenses = item.totalLicenses - item.usedLicenses
-                item.utilizationRate = round((item.usedLicenses / item.totalLicenses) * 100, 2)
+                used = max(0, min(item.totalLicenses, item.usedLicenses + change))
+                changes["usedLicenses"] = used
+                changes["availableLicenses"] = item.totalLicenses - used
+                changes["utilizationRate"] = round((used / item.totalLicenses) * 100, 2)
                 
             elif data_type == "leads":
                 # Occasional lead progression (10% chance)
@@ -221,26 +232,41 @@ class DataGenerator:
                     stages = ["Prospecting", "Qualification", "Proposal", "Negotiation", "Closed Won"]
                     current_idx = stages.index(item.stage) if item.stage in stages else 0
                     if current_idx < len(stages) - 1:
-                        item.stage = stages[current_idx + 1]
+                        changes["stage"] = stages[current_idx + 1]
                         # Realistic probability increases (5-15%)
-                        item.probability = min(100, item.probability + random.randint(5, 15))
+                        changes["probability"] = min(100, item.probability + random.randint(5, 15))
                         # Small value adjustments (±5%)
-                        item.value = round(item.value * random.uniform(0.95, 1.05), 2)
+                        changes["value"] = round(item.value * random.uniform(0.95, 1.05), 2)
                         
             elif data_type == "technicians":
                 # Small utilization changes (±5-10 hours)
                 change = random.randint(-5, 10)
-                item.billableHours = max(0, min(item.totalHours, item.billableHours + change))
-                item.utilization = round((item.billableHours / item.totalHours) * 100, 2)
+                billable = max(0, min(item.totalHours, item.billableHours + change))
+                changes["billableHours"] = billable
+                changes["utilization"] = round((billable / item.totalHours) * 100, 2)
                 
             elif data_type == "departments":
                 # Small spending increases (0.5-2% of budget)
                 spend_increase = item.budget * random.uniform(0.005, 0.02)
-                item.spent = round(min(item.budget, item.spent + spend_increase), 2)
-                item.remaining = round(item.budget - item.spent, 2)
+                spent = round(min(item.budget, item.spent + spend_increase), 2)
+                changes["spent"] = spent
+                changes["remaining"] = round(item.budget - spent, 2)
                 
-            item.lastUpdated = datetime.now().isoformat()
+            changes["lastUpdated"] = datetime.now().isoformat()
+            updated_data[index] = item.model_copy(update=changes)
         
-        return existing_data
+        return updated_data
 
 generator = DataGenerator()
+
+def generate_all_data() -> Dict[str, List]:
+    """Generate a fresh data set for every collection"""
+    return {
+        "clients": generator.generate_clients(20),
+        "licenses": generator.generate_licenses(30),
+        "leads": generator.generate_leads(25),
+        "technicians": generator.generate_technicians(15),
+        "departments": generator.generate_departments(6),
+        "vendors": generator.generate_vendors(15),
+        "contracts": generator.generate_contracts(20)
+    }
@@ -1,7 +1,16 @@
 import boto3
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from decimal import Decimal
+from boto3.dynamodb.table import BatchWriter
+from botocore.config import Config
 from config import settings
+from metrics import BYTES_WRITTEN, ITEMS_WRITTEN, RETRIES, SERIALIZATION_DURATION, THROTTLES, UNPROCESSED_ITEMS
+
+THROTTLING_ERRORS = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded")
+# BatchWriteItem accepts at most 25 put or delete requests
+MAX_BATCH_SIZE = 25
 
 class DynamoDBClient:
     def __init__(self):
@@ -13,9 +22,53 @@ class DynamoDBClient:
         if settings.aws_session_token:
             credentials['aws_session_token'] = settings.aws_session_token
             
-        self.client = boto3.client('dynamodb', **credentials)
-        self.dynamodb = boto3.resource('dynamodb', **credentials)
+        # One pooled connection per concurrent writer thread
+        config = Config(max_pool_connections=max(10, settings.dynamodb_write_concurrency))
+        self.client = boto3.client('dynamodb', config=config, **credentials)
+        self.dynamodb = boto3.resource('dynamodb', config=config, **credentials)
         self.table_prefix = settings.dynamodb_table_prefix
+        # Table resources send their requests through the resource's own client
+        for client in (self.client, self.dynamodb.meta.client):
+            self._instrument(client)
+    
+    def _instrument(self, client):
+        """Count written items, bytes, retries and throttles through botocore events"""
+        events = client.meta.events
+        events.register('before-parameter-build.dynamodb.BatchWriteItem', self._count_batch_items)
+        events.register('before-call.dynamodb.BatchWriteItem', self._count_batch_bytes)
+        events.register('after-call.dynamodb', self._count_retries)
+        events.register('needs-retry.dynamodb', self._count_throttles)
+    
+    def _table_name(self, full_table_name: str) -> str:
+        return full_table_name[len(self.table_prefix):] if full_table_name.startswith(self.table_prefix) else full_table_name
+    
+    def _count_batch_items(self, params, context, **kwargs):
+        counts = {self._table_name(name): len(requests) for name, requests in params.get('RequestItems', {}).items()}
+        context['prism_item_counts'] = counts
+        for table, count in counts.items():
+            ITEMS_WRITTEN.inc(count, table=table)
+    
+    def _count_batch_bytes(self, params, context, **kwargs):
+        counts = context.get('prism_item_counts') or {}
+        total = sum(counts.values())
+        body = params.get('body') or b''
+        for table, count in counts.items():
+            # The batch writer sends one table per request; split proportionally otherwise
+            BYTES_WRITTEN.inc(len(body) * count / total if total else 0, table=table)
+    
+    def _count_retries(self, parsed, model, **kwargs):
+        attempts = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        if attempts:
+            RETRIES.inc(attempts, operation=model.name)
+        for name, requests in (parsed.get('UnprocessedItems') or {}).items():
+            UNPROCESSED_ITEMS.inc(len(requests), table=self._table_name(name))
+    
+    def _count_throttles(self, response, operation, **kwargs):
+        # Observes every failed attempt; returning None leaves the retry decision to botocore
+        if response is not None:
+            code = response[1].get('Error', {}).get('Code')
+            if code in THROTTLING_ERRORS:
+                THROTTLES.inc(operation=operation.name)
     
     def get_table(self, table_name: str):
         """Get DynamoDB table resource"""
@@ -32,20 +85,36 @@ class DynamoDBClient:
             return [self.convert_floats_to_decimal(item) for item in obj]
         return obj
     
-    def batch_write_items(self, table_name: str, items: List[Dict[str, Any]]):
-        """Write items to DynamoDB in batches"""
-        table = self.get_table(table_name)
+    def batch_write_items(self, table_name: str, items: List[Dict[str, Any]], batch_size: Optional[int] = None, concurrency: Optional[int] = None):
+        """Write items to DynamoDB in batches
+
+        Items are split into requests of ``batch_size`` items, sent by up to
+        ``concurrency`` threads; both default to the settings. Unprocessed
+        items are resent by the batch writer.
+        """
+        batch_size = max(1, min(batch_size or settings.dynamodb_batch_size, MAX_BATCH_SIZE))
+        concurrency = max(1, concurrency or settings.dynamodb_write_concurrency)
+        full_table_name = f"{self.table_prefix}{table_name}"
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
         
-        # DynamoDB batch write limit is 25 items
-        batch_size = 25
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
+        def write(batch: List[Dict[str, Any]]):
+            # Convert floats to Decimal
+            start = time.perf_counter()
+            converted = [self.convert_floats_to_decimal(item) for item in batch]
+            SERIALIZATION_DURATION.observe(time.perf_counter() - start, table=table_name, stage="decimal")
             
-            with table.batch_writer() as writer:
-                for item in batch:
-                    # Convert floats to Decimal
-                    converted_item = self.convert_floats_to_decimal(item)
+            # Low-level clients are thread-safe, so every batch gets its own writer on the shared client
+            with BatchWriter(full_table_name, self.dynamodb.meta.client, flush_amount=batch_size) as writer:
+                for converted_item in converted:
                     writer.put_item(Item=converted_item)
+        
+        if concurrency == 1 or len(batches) <= 1:
+            for batch in batches:
+                write(batch)
+            return
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+            # list() re-raises the first failed batch
+            list(pool.map(write, batches))
     
     def update_item(self, table_name: str, key: Dict[str, Any], updates: Dict[str, Any]):
         """Update a single item in DynamoDB"""
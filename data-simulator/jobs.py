@@ -0,0 +1,244 @@
+"""
+Background job subsystem for CPU-heavy work.
+
+Jobs run on a shared process pool so Faker generation, chart rendering and
+PDF layout never execute on the event loop. Each job type has its own
+concurrency limit and queue limit: at most ``concurrency`` jobs of a type
+run at once, at most ``queue_limit`` more wait, and anything beyond that is
+rejected so one burst of report requests cannot starve the rest of the API.
+
+Job records can optionally be mirrored to a directory so that any worker
+process can answer status polls for a job started by another one.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobRejected(Exception):
+    """Raised when a job type is at its admission limit"""
+
+
+class Job:
+    """Status record of one background job"""
+
+    def __init__(self, job_id: str, job_type: str, params: Optional[Dict[str, Any]] = None):
+        self.id = job_id
+        self.type = job_type
+        self.params = params or {}
+        self.status = QUEUED
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "type": self.type,
+            "status": self.status,
+            "params": self.params,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        job = cls(data["jobId"], data["type"], data.get("params"))
+        job.status = data["status"]
+        job.created_at = data["createdAt"]
+        job.started_at = data.get("startedAt")
+        job.finished_at = data.get("finishedAt")
+        job.result = data.get("result")
+        job.error = data.get("error")
+        return job
+
+
+class JobManager:
+    """Runs jobs on a process pool with per-type admission control"""
+
+    def __init__(
+        self,
+        max_workers: int,
+        concurrency: Dict[str, int],
+        queue_limits: Dict[str, int],
+        history_size: int = 200,
+        state_dir: Optional[str] = None
+    ):
+        self.max_workers = max_workers
+        self.concurrency = concurrency
+        self.queue_limits = queue_limits
+        self.history_size = history_size
+        self.state_dir = state_dir
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self._tasks = set()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first use; spawn keeps children free of the parent's threads and event loop
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(
+        self,
+        job_type: str,
+        fn: Callable,
+        *args,
+        params: Optional[Dict[str, Any]] = None,
+        on_complete: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        job_id: Optional[str] = None
+    ) -> Job:
+        """Queue ``fn(*args)`` on the pool and return its job record
+
+        A coroutine function is awaited on the event loop instead, so one job
+        can spread its work over the pool with ``run_in_pool``.
+
+        ``on_complete`` runs on the event loop with the pool result and its
+        return value becomes the job result. Raises ``JobRejected`` when the
+        job type already has as many running and queued jobs as it allows.
+        """
+        limit = self.concurrency.get(job_type, 1) + self.queue_limits.get(job_type, 0)
+        if self._active.get(job_type, 0) >= limit:
+            raise JobRejected(f"Too many {job_type} jobs in progress")
+
+        job = self.create(job_type, params=params, job_id=job_id)
+        self._active[job_type] = self._active.get(job_type, 0) + 1
+        task = asyncio.create_task(self._run(job, fn, args, on_complete))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def create(self, job_type: str, params: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None) -> Job:
+        """Register a queued job record without running anything (e.g. for forwarded work)"""
+        job = Job(job_id or uuid.uuid4().hex, job_type, params)
+        self._remember(job)
+        return job
+
+    def fail(self, job_type: str, job_id: Optional[str], error: str) -> Job:
+        """Record a job that could not be started"""
+        job = Job(job_id or uuid.uuid4().hex, job_type)
+        job.status = FAILED
+        job.error = error
+        job.finished_at = datetime.now().isoformat()
+        self._remember(job)
+        return job
+
+    async def _run(self, job: Job, fn: Callable, args: tuple, on_complete):
+        semaphore = self._semaphores.setdefault(job.type, asyncio.Semaphore(self.concurrency.get(job.type, 1)))
+        try:
+            async with semaphore:
+                job.status = RUNNING
+                job.started_at = datetime.now().isoformat()
+                self._persist(job)
+
+                if asyncio.iscoroutinefunction(fn):
+                    # Coordinating job: runs on the loop and fans work out with run_in_pool
+                    result = await fn(*args)
+                else:
+                    result = await self.run_in_pool(fn, *args)
+                if on_complete is not None:
+                    result = await on_complete(result)
+
+                job.result = result
+                job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.type}) failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            self._active[job.type] -= 1
+            self._persist(job)
+
+    async def run_in_pool(self, fn: Callable, *args) -> Any:
+        """Run ``fn(*args)`` on the process pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, fn, *args)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        if self.state_dir:
+            # The shared record is authoritative: another process may be running the job
+            try:
+                with open(self._record_path(job_id), "r") as f:
+                    return Job.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError):
+                pass
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            job_type: {
+                "active": self._active.get(job_type, 0),
+                "concurrency": self.concurrency.get(job_type, 1),
+                "queueLimit": self.queue_limits.get(job_type, 0)
+            }
+            for job_type in sorted(set(self.concurrency) | set(self._active))
+        }
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history_size:
+            _, old = self._jobs.popitem(last=False)
+            if self.state_dir and old.done:
+                try:
+                    os.remove(self._record_path(old.id))
+                except OSError:
+                    pass
+        self._persist(job)
+
+    def _record_path(self, job_id: str) -> str:
+        # Job ids are hex; refuse anything that could escape the directory
+        if not job_id.isalnum():
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _persist(self, job: Job):
+        if not self.state_dir:
+            return
+        path = self._record_path(job.id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(job.to_dict(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Could not persist job {job.id}: {e}")
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,80 @@
+"""
+Deferred loading of heavy subsystems, and import timing.
+
+The report stack (ReportLab, matplotlib) and the AWS SDK (boto3, plus the
+client built when ``dynamodb_client`` is imported) make up most of the
+import time of ``main``, yet only report requests and DynamoDB syncs use
+them. A ``LazyModule`` imports its module the first time one of its
+attributes is used; ``aload()`` does the import on a worker thread so the
+event loop keeps serving meanwhile.
+
+``import_timer`` and ``LazyModule`` record how long each import took in
+``IMPORT_TIMES``, which the server logs at startup.
+"""
+
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Label -> seconds spent importing, in the order the imports happened
+IMPORT_TIMES: "OrderedDict[str, float]" = OrderedDict()
+
+@contextmanager
+def import_timer(label: str) -> Iterator[None]:
+    """Record the time spent on the imports in the ``with`` block under ``label``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMPORT_TIMES[label] = IMPORT_TIMES.get(label, 0.0) + time.perf_counter() - start
+
+def format_import_times() -> str:
+    return ", ".join(f"{label} {seconds * 1000:.0f} ms" for label, seconds in IMPORT_TIMES.items())
+
+def preload(name: str) -> float:
+    """Import a module and return the seconds it took; used to warm up pool workers"""
+    start = time.perf_counter()
+    importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name: str, label: Optional[str] = None):
+        self.name = name
+        self.label = label or name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    with import_timer(self.label):
+                        self._module = importlib.import_module(self.name)
+                    logger.info(f"Loaded {self.label} in {IMPORT_TIMES[self.label] * 1000:.0f} ms")
+                module = self._module
+        return module
+
+    async def aload(self) -> ModuleType:
+        """The module, imported on a worker thread if it is not loaded yet"""
+        if self._module is not None:
+            return self._module
+        return await asyncio.to_thread(self.load)
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
@@ -0,0 +1,154 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A heartbeat task sleeps for a short interval on the event loop and records
+how late it wakes up: that delay is the loop lag every other coroutine
+sees at the same moment. A watchdog thread checks the heartbeat; when it
+has not beaten for longer than the threshold, the loop is stuck in
+synchronous code, so the thread captures the loop thread's current stack
+with ``sys._current_frames``. When the loop comes back, the stall's total
+duration is attached to the captured stack.
+
+Recent lag percentiles, the latest stalls and the stacks that stalled the
+loop most often are served at ``/debug/loop``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = registry.histogram(
+    "prism_event_loop_lag_seconds", "Delay of the event loop heartbeat beyond its interval",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_STALLS = registry.counter(
+    "prism_event_loop_stalls_total", "Times the event loop was blocked for longer than the stall threshold"
+)
+
+MAX_STACK_DEPTH = 40
+
+
+class LoopMonitor:
+    """Measures event loop lag and captures the stack of whatever blocks it"""
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05, history: int = 2000, max_offenders: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_offenders = max_offenders
+        self._lags = deque(maxlen=history)
+        self._recent = deque(maxlen=20)
+        # stack signature -> aggregated stall record
+        self._offenders: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop_thread: Optional[int] = None
+        self._beat = time.monotonic()
+        self._captured_beat: Optional[float] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stalls = 0
+
+    def start(self):
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._lags.append(lag)
+            LOOP_LAG.observe(lag)
+            if self._pending is not None:
+                self._finish_stall(lag)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold or beat == self._captured_beat:
+                continue
+            # Blocked past the threshold: record where the loop thread is right now
+            self._captured_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = traceback.format_stack(frame, limit=MAX_STACK_DEPTH) if frame is not None else []
+            self._pending = {
+                "detectedAt": datetime.now().isoformat(),
+                "blockedFor": blocked,
+                "stack": [line.rstrip() for line in stack]
+            }
+
+    def _finish_stall(self, lag: float):
+        stall, self._pending = self._pending, None
+        stall["duration"] = round(max(lag, stall.pop("blockedFor")), 6)
+        signature = hashlib.sha1("".join(stall["stack"]).encode("utf-8")).hexdigest()[:12]
+        stall["signature"] = signature
+        self.stalls += 1
+        LOOP_STALLS.inc()
+        location = stall["stack"][-1].strip().splitlines()[0] if stall["stack"] else "unknown"
+        logger.warning(f"Event loop blocked for {stall['duration']:.3f}s at {location}")
+
+        with self._lock:
+            self._recent.appendleft(stall)
+            offender = self._offenders.get(signature)
+            if offender is None:
+                if len(self._offenders) >= self.max_offenders:
+                    # Make room by forgetting the known offender that has stalled the loop least often
+                    least = min(self._offenders.values(), key=lambda item: item["count"])
+                    del self._offenders[least["signature"]]
+                offender = self._offenders[signature] = {
+                    "signature": signature, "count": 0, "totalSeconds": 0.0, "maxSeconds": 0.0, "stack": stall["stack"]
+                }
+            offender["count"] += 1
+            offender["totalSeconds"] = round(offender["totalSeconds"] + stall["duration"], 6)
+            offender["maxSeconds"] = max(offender["maxSeconds"], stall["duration"])
+            offender["lastSeen"] = stall["detectedAt"]
+
+    def stats(self) -> Dict[str, Any]:
+        lags = np.fromiter(self._lags, dtype=np.float64)
+        percentiles = (
+            dict(zip(("p50", "p90", "p99"), np.percentile(lags, [50, 90, 99]).round(6).tolist()))
+            if len(lags) else {"p50": 0.0, "p90": 0.0, "p99": 0.0}
+        )
+        with self._lock:
+            recent = list(self._recent)
+            offenders = sorted(self._offenders.values(), key=lambda item: item["totalSeconds"], reverse=True)
+        return {
+            "thresholdSeconds": self.threshold,
+            "intervalSeconds": self.interval,
+            "samples": len(lags),
+            "lag": {**percentiles, "max": round(float(lags.max()), 6) if len(lags) else 0.0},
+            "stalls": self.stalls,
+            "recent": recent,
+            "topOffenders": offenders[:10]
+        }
@@ -1,128 +1,612 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+import time
+_import_start = time.perf_counter()
+
+from lazy_imports import LazyModule, format_import_times, import_timer, preload
+
+with import_timer("fastapi"):
+    from fastapi import FastAPI, BackgroundTasks, Depends, Header, HTTPException, Response
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
 import asyncio
-from typing import Dict, List
+import hmac
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
+import json
 import logging
 import os
+import uuid
 
-from config import settings
-from data_generator import generator
-from dynamodb_client import db_client
-from models import Client, License, Lead, Technician, Department, Vendor, Contract
-from report_generator import (
-    generate_client_profitability_report,
-    generate_software_license_report,
-    generate_sales_pipeline_report
-)
+with import_timer("simulation"):
+    from config import settings
+    from data_generator import generate_all_data, generator
+    from models import Client, License, Lead, Technician, Department, Vendor, Contract
+    from store import COLLECTIONS, Snapshot, store
+    from scheduler import TickScheduler
+    from ticklog import Frame, TickRecorder, TickReplayer, apply_frame
+    from shared_store import SharedStorePublisher, SharedStoreReader, default_state_path, elect_role
+with import_timer("services"):
+    from jobs import JobManager, JobRejected, SUCCEEDED
+    from report_cache import ReportCache
+    from analytics import collection_analytics
+    from metrics import (
+        CONTENT_TYPE, REPORT_RENDER_DURATION, SERIALIZATION_DURATION, SYNC_DURATION, TABLE_WRITE_DURATION,
+        TICK_DURATION, RequestMetricsMiddleware, registry
+    )
+    from loop_monitor import LoopMonitor
+    from profiler import PROFILE_FORMATS, PROFILE_MODES, SamplingProfiler
+    from readiness import DONE, Readiness
+    from responses import ALTERNATE_FORMATS, CollectionEncoder
+    from timeseries import REPORT_ANALYTICS, RESOLUTIONS, TimeSeriesStore
+    import backfill
+
+if TYPE_CHECKING:
+    from batch_reports import BatchEntry
+
+# Heavy subsystems load on first use: the report stack on the first report
+# request, the AWS SDK on the first sync (or in the background, see prewarm)
+reports = LazyModule("report_payloads", "report stack")
+batches = LazyModule("batch_reports", "batch reports")
+dynamodb = LazyModule("dynamodb_client", "AWS SDK")
+parquet = LazyModule("parquet_export", "Parquet export")
+_import_seconds = time.perf_counter() - _import_start
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# In-memory data store
-data_store: Dict[str, List] = {
-    "clients": [],
-    "licenses": [],
-    "leads": [],
-    "technicians": [],
-    "departments": [],
-    "vendors": [],
-    "contracts": []
-}
-
 # Background task control
 update_task = None
+command_task = None
+scheduler: Optional[TickScheduler] = None
 is_running = False
 
+# Tick log: record every published change, or drive the store from a recording instead of simulating
+recorder: Optional[TickRecorder] = None
+replayer: Optional[TickReplayer] = None
+
+# Multi-process serving: one owner runs the simulation, readers serve its shared state
+role = "standalone"
+role_lock = None
+shared_reader: Optional[SharedStoreReader] = None
+shared_publisher: Optional[SharedStorePublisher] = None
+
+# CPU-heavy endpoints run as background jobs on a process pool
+jobs: Optional[JobManager] = None
+report_cache: Optional[ReportCache] = None
+
+# Periodic Parquet export of the store (owner/standalone); one export at a time
+exporter = None
+export_task = None
+export_lock = asyncio.Lock()
+
+# Startup work that runs after the server is already accepting requests
+warmup_task = None
+prewarm_task = None
+readiness = Readiness()
+
+# Watchdog for synchronous code blocking the event loop
+loop_monitor: Optional[LoopMonitor] = None
+# Held while a /debug/profile window is sampling; one profile at a time
+profile_lock = asyncio.Lock()
+
+# Collection endpoints serve pre-encoded, cached JSON (or msgpack / Arrow) instead of re-validating models
+collection_encoder = CollectionEncoder(
+    min_compress_bytes=settings.response_compression_min_bytes,
+    gzip_level=settings.response_gzip_level,
+    brotli_quality=settings.response_brotli_quality,
+    arrow_batch_rows=settings.arrow_batch_rows,
+    ndjson_chunk_rows=settings.ndjson_chunk_rows
+)
+
+# History of entity and aggregate metrics, recorded from every new snapshot
+timeseries = TimeSeriesStore(
+    raw_points=settings.timeseries_raw_points,
+    rollup_points=settings.timeseries_rollup_points,
+    entity_raw_points=settings.timeseries_entity_raw_points,
+    entity_rollup_points=settings.timeseries_entity_rollup_points,
+    entity_history=settings.timeseries_entity_history,
+    pending_limit=10000 if settings.timeseries_dynamodb_enabled else 0
+)
+
+def current_snapshot() -> Snapshot:
+    """Latest snapshot, from the local store or the owner's shared state"""
+    if shared_reader is not None:
+        return shared_reader.snapshot()
+    return store.snapshot()
+
+def timed_update(data_type: str, items):
+    with TICK_DURATION.time(data_type=data_type):
+        return generator.update_data_realtime(data_type, items)
+
+def record_report_timings(report_type: str, timings: Dict[str, float]):
+    for stage, seconds in timings.items():
+        REPORT_RENDER_DURATION.observe(seconds, report_type=report_type, stage=stage)
+
+async def tick_data_types(data_types: List[str]):
+    """Advance the given data types by one tick and sync them"""
+    try:
+        # Build the next version of the due data types and publish it atomically
+        snapshot = store.update({
+            data_type: (lambda items, data_type=data_type: timed_update(data_type, items))
+            for data_type in data_types
+        })
+        
+        await sync_changes(snapshot, data_types)
+        
+        logger.info(f"Data updated at {datetime.now().isoformat()}: {', '.join(data_types)}")
+        
+    except Exception as e:
+        logger.error(f"Error updating data: {e}")
+
+async def sync_changes(snapshot: Snapshot, data_types: List[str]):
+    """Sync the data types a tick changed to DynamoDB, with the metric points it recorded"""
+    await sync_to_dynamodb(snapshot, data_types)
+    if settings.timeseries_dynamodb_enabled:
+        await write_metric_points()
+
 async def update_data_periodically():
-    """Background task to update data periodically"""
-    global data_store, is_running
+    """Background task to update each data type at its own cadence"""
+    global scheduler
     
     logger.info("Starting periodic data updates...")
     
+    unknown = set(settings.tick_intervals) - set(COLLECTIONS)
+    if unknown:
+        logger.warning(f"Ignoring tick intervals for unknown data types: {sorted(unknown)}")
+    
+    scheduler = TickScheduler(
+        {
+            data_type: settings.tick_intervals.get(data_type, settings.update_interval_seconds)
+            for data_type in COLLECTIONS
+        },
+        tick_data_types,
+        overrun_policy=settings.tick_overrun_policy,
+        max_catch_up=settings.tick_max_catch_up
+    )
+    await scheduler.run()
+
+async def replay_frame(frame: Frame):
+    """Publish one frame of the tick log on the store and sync it like a simulated tick"""
+    snapshot = apply_frame(store, frame)
+    if readiness.steps["generate"]["status"] != DONE:
+        # The log's first frame holds the initial data
+        readiness.finish("generate", counts=snapshot.counts(), replay=settings.tick_replay_path)
+        await initial_data_published(snapshot)
+        return
+    await sync_changes(snapshot, frame.data_types)
+
+async def replay_tick_log():
+    """Drive the store from a recorded tick log instead of the simulation"""
+    global replayer
+    
+    logger.info(f"Replaying {settings.tick_replay_path} at "
+                f"{f'{settings.tick_replay_speed:g}x' if settings.tick_replay_speed else 'full speed'}")
+    replayer = TickReplayer(
+        settings.tick_replay_path,
+        replay_frame,
+        speed=settings.tick_replay_speed,
+        loop=settings.tick_replay_loop
+    )
+    try:
+        await replayer.run()
+    except Exception as e:
+        logger.error(f"Tick log replay failed: {e}")
+        if readiness.steps["generate"]["status"] != DONE:
+            readiness.fail("generate", str(e))
+
+async def follow_shared_store():
+    """Reader workers: pick up snapshots published by the simulation owner"""
+    backfilled = False
     while is_running:
         try:
-            # Update each data type
-            for data_type in data_store.keys():
-                data_store[data_type] = generator.update_data_realtime(
-                    data_type, 
-                    data_store[data_type]
-                )
-            
-            # Sync to DynamoDB
-            await sync_to_dynamodb()
-            
-            logger.info(f"Data updated at {datetime.now().isoformat()}")
-            
+            if shared_reader.refresh() and settings.timeseries_enabled:
+                timeseries.submit(shared_reader.snapshot())
+                # Each worker keeps its own history, so it backfills from the first version it maps
+                if settings.backfill_days > 0 and not backfilled:
+                    backfilled = True
+                    submit_backfill_job(shared_reader.snapshot())
+            if shared_reader.version and readiness.steps["shared_state"]["status"] != DONE:
+                readiness.finish("shared_state", version=shared_reader.version)
         except Exception as e:
-            logger.error(f"Error updating data: {e}")
-        
-        # Wait for next update
-        await asyncio.sleep(settings.update_interval_seconds)
+            logger.error(f"Error reading shared store: {e}")
+        await asyncio.sleep(settings.shared_store_poll_seconds)
+
+async def process_forwarded_commands():
+    """Simulation owner: execute mutating requests forwarded by reader workers"""
+    while is_running:
+        try:
+            for command in shared_publisher.drain_commands():
+                if command.get("command") == "regenerate":
+                    if replayer is not None:
+                        jobs.fail("regenerate", command.get("jobId"), "Regenerate is disabled while replaying a tick log")
+                        continue
+                    try:
+                        submit_regenerate_job(command.get("jobId"))
+                    except JobRejected as e:
+                        jobs.fail("regenerate", command.get("jobId"), str(e))
+                elif command.get("command") == "sync":
+                    await sync_to_dynamodb()
+                elif command.get("command") == "export":
+                    await export_parquet()
+                else:
+                    logger.warning(f"Ignoring unknown forwarded command: {command}")
+        except Exception as e:
+            logger.error(f"Error processing forwarded commands: {e}")
+        await asyncio.sleep(settings.shared_store_poll_seconds)
+
+async def publish_regenerated_data(data: Dict[str, List]) -> Dict:
+    """Publish data generated by a regenerate job and sync it"""
+    snapshot = store.publish(data)
+    await sync_to_dynamodb(snapshot)
+    return {"version": snapshot.version, "counts": snapshot.counts()}
+
+def submit_regenerate_job(job_id: Optional[str] = None):
+    """Generate a fresh data set on the job pool and publish it when done"""
+    return jobs.submit(
+        "regenerate",
+        generate_all_data,
+        on_complete=publish_regenerated_data,
+        job_id=job_id
+    )
+
+def backfill_outputs() -> Tuple[bool, Optional[str]]:
+    """Whether a backfill loads this process's history, and the Parquet directory it writes (owner only)"""
+    load_timeseries = "timeseries" in settings.backfill_targets and settings.timeseries_enabled
+    parquet_dir = None
+    if "parquet" in settings.backfill_targets and role != "reader":
+        parquet_dir = os.path.join(settings.parquet_export_dir, "_backfill")
+    return load_timeseries, parquet_dir
+
+async def run_backfill(snapshot: Snapshot) -> Dict:
+    """Simulate BACKFILL_DAYS of history ending at the snapshot, its shards spread over the job pool"""
+    with readiness.step("backfill"):
+        load_timeseries, parquet_dir = backfill_outputs()
+        retention = None
+        if load_timeseries and timeseries.entity_history:
+            retention = (timeseries.entity_raw_points, timeseries.entity_rollup_points)
+        start = time.perf_counter()
+        tasks = backfill.plan(
+            snapshot,
+            settings.backfill_days,
+            settings.backfill_step_seconds,
+            settings.backfill_seed,
+            settings.job_workers,
+            retention,
+            parquet_dir,
+            settings.parquet_export_compression
+        )
+        results = await asyncio.gather(*(jobs.run_in_pool(backfill.simulate_shard, task) for task in tasks))
+        summary = await asyncio.to_thread(
+            backfill.finish, snapshot, tasks, results, timeseries if load_timeseries else None, parquet_dir,
+            settings.backfill_seed
+        )
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        readiness.finish("backfill", steps=summary["steps"], start=summary["start"])
+    logger.info(f"Backfilled {summary['steps']} steps since {summary['start']} in {summary['seconds']:.1f}s")
+    return summary
 
-async def sync_to_dynamodb():
-    """Sync in-memory data to DynamoDB"""
+def submit_backfill_job(snapshot: Snapshot):
+    """Backfill history in the background; progress shows on /ready and the job record"""
+    unknown = set(settings.backfill_targets) - set(backfill.TARGETS)
+    if unknown:
+        logger.warning(f"Ignoring unknown backfill targets: {sorted(unknown)}")
+    if backfill_outputs() == (False, None):
+        readiness.fail("backfill", "Nothing to backfill: no target enabled for this process")
+        return None
     try:
-        table_mapping = {
-            "clients": "clients",
-            "licenses": "licenses",
-            "leads": "leads",
-            "technicians": "technicians",
-            "departments": "departments",
-            "vendors": "vendors",
-            "contracts": "contracts"
-        }
-        
-        for data_type, table_name in table_mapping.items():
-            items = [item.model_dump() for item in data_store[data_type]]
-            if items:
+        return jobs.submit(
+            "backfill",
+            run_backfill,
+            snapshot,
+            params={
+                "days": settings.backfill_days,
+                "stepSeconds": settings.backfill_step_seconds,
+                "targets": settings.backfill_targets,
+                "version": snapshot.version
+            }
+        )
+    except JobRejected as e:
+        readiness.fail("backfill", str(e))
+        return None
+
+REPORT_CHUNK_SIZE = 64 * 1024
+
+def _iter_chunks(content: bytes) -> Iterator[bytes]:
+    view = memoryview(content)
+    for start in range(0, len(view), REPORT_CHUNK_SIZE):
+        yield view[start:start + REPORT_CHUNK_SIZE]
+
+def report_response(content: Union[str, bytes], report_type: str):
+    """Download response for a cached report: streamed from memory, or the cached file"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{report_type}_report_{timestamp}.pdf"
+    if isinstance(content, bytes):
+        return StreamingResponse(
+            _iter_chunks(content),
+            media_type='application/pdf',
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Content-Length": str(len(content))
+            }
+        )
+    return FileResponse(path=content, media_type='application/pdf', filename=filename)
+
+async def render_batch(job_id: str, entries: List["BatchEntry"], batch_format: str, source: Dict) -> Dict:
+    """Render a batch across the job pool and write it out; the job result describes the output"""
+    rendered = await asyncio.gather(*(
+        jobs.run_in_pool(reports.render_payload_timed, entry.report_type, entry.payload) for entry in entries
+    ))
+    contents = []
+    for entry, (content, timings) in zip(entries, rendered):
+        record_report_timings(entry.report_type, timings)
+        contents.append(content)
+    name = f"{job_id}.zip" if batch_format == "zip" else job_id
+    output = os.path.join(settings.batch_output_dir, name)
+    manifest = await asyncio.to_thread(batches.write_batch, entries, contents, output, batch_format, source)
+    return {
+        "format": batch_format,
+        "output": name,
+        "reports": len(entries),
+        "bytes": sum(report["bytes"] for report in manifest["reports"])
+    }
+
+async def prewarm(modules: List[LazyModule]):
+    """Load deferred subsystems in the background once the server is up, pool workers included"""
+    await asyncio.sleep(settings.prewarm_delay_seconds)
+    try:
+        with readiness.step("prewarm"):
+            for module in modules:
+                await module.aload()
+            # Workers import the report stack on their first job; one call per worker gets that done now
+            seconds = await asyncio.gather(*(
+                jobs.run_in_pool(preload, "report_payloads") for _ in range(settings.job_workers)
+            ))
+        logger.info(f"Prewarmed {', '.join(module.label for module in modules)} and {len(seconds)} job workers "
+                    f"(slowest worker {max(seconds, default=0) * 1000:.0f} ms)")
+    except Exception as e:
+        logger.warning(f"Prewarm failed: {e}")
+
+async def warm_up():
+    """Generate the initial data, run the first sync and then start the tick loop, off the startup path"""
+    global update_task
+    if settings.tick_replay_path:
+        # The replay publishes the initial data from the log, then every recorded tick
+        readiness.start("generate")
+        update_task = asyncio.create_task(replay_tick_log())
+        return
+    
+    try:
+        with readiness.step("generate"):
+            snapshot = store.publish(await asyncio.to_thread(generate_all_data))
+            readiness.finish("generate", counts=snapshot.counts())
+        logger.info("Initial data generated")
+    except Exception as e:
+        logger.error(f"Initial data generation failed: {e}")
+        return
+    
+    await initial_data_published(snapshot)
+    # Only now: a tick syncs right away, and must not write the same tables as the initial full sync
+    update_task = asyncio.create_task(update_data_periodically())
+
+async def initial_data_published(snapshot: Snapshot):
+    """Start the backfill and run the first full sync once the initial data is in the store"""
+    # History before the first tick; ticks that land meanwhile are kept when it is loaded
+    if settings.backfill_days > 0:
+        submit_backfill_job(snapshot)
+    
+    # The first full-table write is progress, not a readiness condition
+    with readiness.step("sync"):
+        if not await sync_to_dynamodb(snapshot):
+            readiness.fail("sync", "Initial sync failed; see the server log")
+
+async def cancel_tasks(*tasks):
+    for task in tasks:
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+def batch_path(name: str) -> str:
+    """Resolve a path inside the batch output directory, refusing anything outside it"""
+    root = os.path.realpath(settings.batch_output_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Batch output not found")
+    return path
+
+def require_debug_access(x_debug_token: Optional[str] = Header(default=None), token: Optional[str] = None):
+    """Gate for /debug endpoints: hidden unless enabled, token checked when configured"""
+    if not settings.debug_endpoints_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.debug_token:
+        supplied = x_debug_token or token or ""
+        if not hmac.compare_digest(supplied.encode("utf-8"), settings.debug_token.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="Invalid debug token")
+
+def job_accepted(job) -> JSONResponse:
+    """202 response pointing the client at the job's status"""
+    return JSONResponse(
+        status_code=202,
+        content={**job.to_dict(), "statusUrl": f"/api/jobs/{job.id}"}
+    )
+
+def write_snapshot(db_client, snapshot: Snapshot, data_types: Optional[List[str]] = None):
+    """Write the given data types of a snapshot to their tables (blocking)"""
+    table_mapping = {
+        "clients": "clients",
+        "licenses": "licenses",
+        "leads": "leads",
+        "technicians": "technicians",
+        "departments": "departments",
+        "vendors": "vendors",
+        "contracts": "contracts"
+    }
+    
+    for data_type, table_name in table_mapping.items():
+        if data_types is not None and data_type not in data_types:
+            continue
+        with SERIALIZATION_DURATION.time(table=table_name, stage="model_dump"):
+            items = [item.model_dump() for item in snapshot[data_type]]
+        if items:
+            with TABLE_WRITE_DURATION.time(table=table_name):
                 db_client.batch_write_items(table_name, items)
-        
+
+async def sync_to_dynamodb(snapshot: Optional[Snapshot] = None, data_types: Optional[List[str]] = None) -> bool:
+    """Sync in-memory data to DynamoDB; returns whether it succeeded"""
+    snapshot = snapshot or store.snapshot()
+    start = time.perf_counter()
+    try:
+        db_client = (await dynamodb.aload()).db_client
+        # The AWS SDK blocks on the network, so the writes run on a worker thread
+        await asyncio.to_thread(write_snapshot, db_client, snapshot, data_types)
         logger.info("Data synced to DynamoDB")
+        return True
     except Exception as e:
         logger.error(f"Error syncing to DynamoDB: {e}")
+        return False
+    finally:
+        SYNC_DURATION.observe(time.perf_counter() - start)
+
+async def export_parquet() -> Optional[Dict]:
+    """Export the current snapshot to Parquet; returns the manifest, None if it was already exported"""
+    global exporter
+    async with export_lock:
+        if exporter is None:
+            parquet_export = await parquet.aload()
+            exporter = parquet_export.ParquetExporter(
+                settings.parquet_export_dir,
+                compression=settings.parquet_export_compression,
+                full_every=settings.parquet_export_full_every
+            )
+        snapshot = store.snapshot()
+        if snapshot.version == 0 or snapshot.version == exporter.last_version:
+            return None
+        # Converting and compressing is CPU-bound, but pyarrow releases the GIL for most of it
+        return await asyncio.to_thread(exporter.export, snapshot)
+
+async def export_periodically():
+    """Background task writing the store to Parquet every export interval"""
+    while is_running:
+        await asyncio.sleep(settings.parquet_export_interval_seconds)
+        try:
+            await export_parquet()
+        except Exception as e:
+            logger.error(f"Error exporting to Parquet: {e}")
+
+async def write_metric_points():
+    """Write the aggregate points recorded since the last call to the prism-metrics table"""
+    points = timeseries.drain_pending()
+    if not points:
+        return
+    expires = int(time.time() + settings.timeseries_dynamodb_ttl_days * 86400)
+    try:
+        db_client = (await dynamodb.aload()).db_client
+        await asyncio.to_thread(db_client.batch_write_items, "metrics", [{**point, "ttl": expires} for point in points])
+    except Exception as e:
+        logger.error(f"Error writing metric points to DynamoDB: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    global update_task, is_running, data_store
+    global update_task, command_task, is_running, role, role_lock, shared_reader, shared_publisher, jobs, report_cache
+    global loop_monitor, prewarm_task, warmup_task, readiness, export_task, recorder
     
     # Startup
     logger.info("Initializing data simulator...")
+    logger.info(f"Imports took {_import_seconds * 1000:.0f} ms ({format_import_times()}); "
+                f"report stack and AWS SDK deferred until first use")
+    
+    if settings.loop_monitor_enabled:
+        loop_monitor = LoopMonitor(settings.loop_lag_threshold_seconds, settings.loop_monitor_interval_seconds)
+        loop_monitor.start()
+    
+    state_path = settings.shared_store_path or default_state_path()
+    role, role_lock = elect_role(state_path, settings.store_role)
+    logger.info(f"Running as {role}")
+    
+    # Job records are shared through the state directory when several workers serve the API
+    jobs = JobManager(
+        settings.job_workers,
+        settings.job_concurrency,
+        settings.job_queue_limits,
+        history_size=settings.job_history_size,
+        state_dir=None if role == "standalone" else f"{state_path}.jobs"
+    )
+    report_cache = ReportCache(
+        settings.report_cache_dir or (None if role == "standalone" else f"{state_path}.reports"),
+        max_entries=settings.report_cache_max_entries,
+        max_bytes=settings.report_cache_max_bytes
+    )
     
-    # Generate initial data
-    data_store["clients"] = generator.generate_clients(20)
-    data_store["licenses"] = generator.generate_licenses(30)
-    data_store["leads"] = generator.generate_leads(25)
-    data_store["technicians"] = generator.generate_technicians(15)
-    data_store["departments"] = generator.generate_departments(6)
-    data_store["vendors"] = generator.generate_vendors(15)
-    data_store["contracts"] = generator.generate_contracts(20)
+    optional_steps = ("prewarm",) if settings.prewarm_enabled else ()
+    if settings.backfill_days > 0:
+        optional_steps += ("backfill",)
     
-    logger.info("Initial data generated")
+    if role == "reader":
+        # Serve the owner's shared state; no local simulation or sync. Ready once the owner has published
+        readiness = Readiness(required=("shared_state",), optional=optional_steps)
+        readiness.start("shared_state")
+        shared_reader = SharedStoreReader(state_path)
+        is_running = True
+        update_task = asyncio.create_task(follow_shared_store())
+        if settings.prewarm_enabled:
+            prewarm_task = asyncio.create_task(prewarm([reports, batches]))
+        
+        yield
+        
+        is_running = False
+        await cancel_tasks(update_task, prewarm_task)
+        await asyncio.to_thread(timeseries.close)
+        await jobs.shutdown()
+        if loop_monitor:
+            await loop_monitor.stop()
+        logger.info("Server shutdown")
+        return
     
-    # Sync to DynamoDB
-    await sync_to_dynamodb()
+    if role == "owner":
+        shared_publisher = SharedStorePublisher(state_path)
+        store.subscribe(shared_publisher.publish)
+    if settings.timeseries_enabled:
+        store.subscribe(timeseries.submit)
+    # A replay is already recorded; recording it again would only copy the log
+    if settings.tick_record_path and not settings.tick_replay_path:
+        recorder = TickRecorder(settings.tick_record_path)
+        store.subscribe(recorder.record)
+        logger.info(f"Recording ticks to {settings.tick_record_path}")
     
-    # Start background updates
+    # Initial data, the tick loop and the first sync start in the background; the
+    # port opens right away and /ready turns 200 once the data has been generated
+    readiness = Readiness(required=("generate",), optional=("sync", *optional_steps))
     is_running = True
-    update_task = asyncio.create_task(update_data_periodically())
+    warmup_task = asyncio.create_task(warm_up())
+    if shared_publisher is not None:
+        command_task = asyncio.create_task(process_forwarded_commands())
+    if settings.prewarm_enabled:
+        prewarm_task = asyncio.create_task(prewarm([dynamodb, reports, batches]))
+    if settings.parquet_export_enabled:
+        export_task = asyncio.create_task(export_periodically())
     
     logger.info(f"Server started. Updates every {settings.update_interval_seconds} seconds")
     
     yield
     
-    # Shutdown
+    # Shutdown; warmup first, so it cannot start the tick loop after it was cancelled
     is_running = False
-    if update_task:
-        update_task.cancel()
-        try:
-            await update_task
-        except asyncio.CancelledError:
-            pass
+    await cancel_tasks(warmup_task, prewarm_task)
+    await cancel_tasks(update_task, command_task, export_task)
+    await jobs.shutdown()
+    if loop_monitor:
+        await loop_monitor.stop()
+    if recorder:
+        await asyncio.to_thread(recorder.close)
+    if shared_publisher:
+        await asyncio.to_thread(shared_publisher.close)
+    await asyncio.to_thread(timeseries.close)
+    if role_lock:
+        role_lock.close()
     
     logger.info("Server shutdown")
 
@@ -131,7 +615,8 @@ app = FastAPI(
     title="MSP Data Simulator",
     description="Real-time data simulator for Prism Insights",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -142,6 +627,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 # API Endpoints
 
@@ -156,67 +642,89 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving, whether or not warmup has finished"""
     return {
         "status": "healthy",
+        "ready": readiness.ready,
         "timestamp": datetime.now().isoformat(),
-        "data_counts": {k: len(v) for k, v in data_store.items()}
+        "data_counts": current_snapshot().counts()
     }
 
-@app.get("/api/clients", response_model=List[Client])
-async def get_clients():
+@app.get("/ready")
+async def ready_check():
+    """Readiness: 200 once the initial data is available, 503 before; includes warmup progress"""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.to_dict())
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics of this process"""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/clients", response_model=List[Client], responses=ALTERNATE_FORMATS)
+async def get_clients(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all clients"""
-    return data_store["clients"]
+    return await collection_encoder.response(current_snapshot(), "clients", accept, accept_encoding, format)
 
-@app.get("/api/licenses", response_model=List[License])
-async def get_licenses():
+@app.get("/api/licenses", response_model=List[License], responses=ALTERNATE_FORMATS)
+async def get_licenses(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all licenses"""
-    return data_store["licenses"]
+    return await collection_encoder.response(current_snapshot(), "licenses", accept, accept_encoding, format)
 
-@app.get("/api/leads", response_model=List[Lead])
-async def get_leads():
+@app.get("/api/leads", response_model=List[Lead], responses=ALTERNATE_FORMATS)
+async def get_leads(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all leads"""
-    return data_store["leads"]
+    return await collection_encoder.response(current_snapshot(), "leads", accept, accept_encoding, format)
 
-@app.get("/api/technicians", response_model=List[Technician])
-async def get_technicians():
+@app.get("/api/technicians", response_model=List[Technician], responses=ALTERNATE_FORMATS)
+async def get_technicians(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all technicians"""
-    return data_store["technicians"]
+    return await collection_encoder.response(current_snapshot(), "technicians", accept, accept_encoding, format)
 
-@app.get("/api/departments", response_model=List[Department])
-async def get_departments():
+@app.get("/api/departments", response_model=List[Department], responses=ALTERNATE_FORMATS)
+async def get_departments(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all departments"""
-    return data_store["departments"]
+    return await collection_encoder.response(current_snapshot(), "departments", accept, accept_encoding, format)
 
-@app.get("/api/vendors", response_model=List[Vendor])
-async def get_vendors():
+@app.get("/api/vendors", response_model=List[Vendor], responses=ALTERNATE_FORMATS)
+async def get_vendors(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all vendors"""
-    return data_store["vendors"]
+    return await collection_encoder.response(current_snapshot(), "vendors", accept, accept_encoding, format)
 
-@app.get("/api/contracts", response_model=List[Contract])
-async def get_contracts():
+@app.get("/api/contracts", response_model=List[Contract], responses=ALTERNATE_FORMATS)
+async def get_contracts(
+    format: Optional[str] = None, accept: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)
+):
     """Get all contracts"""
-    return data_store["contracts"]
+    return await collection_encoder.response(current_snapshot(), "contracts", accept, accept_encoding, format)
 
-@app.post("/api/regenerate")
+@app.post("/api/regenerate", status_code=202)
 async def regenerate_data():
-    """Regenerate all data from scratch"""
-    global data_store
-    
+    """Regenerate all data from scratch as a background job"""
+    if replayer is not None:
+        raise HTTPException(status_code=409, detail="Regenerate is disabled while replaying a tick log")
     try:
-        data_store["clients"] = generator.generate_clients(20)
-        data_store["licenses"] = generator.generate_licenses(30)
-        data_store["leads"] = generator.generate_leads(25)
-        data_store["technicians"] = generator.generate_technicians(15)
-        data_store["departments"] = generator.generate_departments(6)
-        data_store["vendors"] = generator.generate_vendors(15)
-        data_store["contracts"] = generator.generate_contracts(20)
-        
-        await sync_to_dynamodb()
+        if shared_reader is not None:
+            # The owner runs the job under this id; the record is shared with every worker
+            job = jobs.create("regenerate")
+            shared_reader.send_command("regenerate", jobId=job.id)
+        else:
+            job = submit_regenerate_job()
         
-        return {
-            "message": "Data regenerated successfully",
-            "timestamp": datetime.now().isoformat()
-        }
+        return job_accepted(job)
+    except JobRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -224,6 +732,13 @@ async def regenerate_data():
 async def manual_sync():
     """Manually trigger sync to DynamoDB"""
     try:
+        if shared_reader is not None:
+            shared_reader.send_command("sync")
+            return {
+                "message": "Sync forwarded to simulation owner",
+                "timestamp": datetime.now().isoformat()
+            }
+        
         await sync_to_dynamodb()
         return {
             "message": "Data synced to DynamoDB",
@@ -232,357 +747,288 @@ async def manual_sync():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/export")
+async def manual_export():
+    """Export the current snapshot to Parquet now"""
+    if shared_reader is not None:
+        shared_reader.send_command("export")
+        return {
+            "message": "Export forwarded to simulation owner",
+            "timestamp": datetime.now().isoformat()
+        }
+    try:
+        manifest = await export_parquet()
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Parquet export needs pyarrow: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if manifest is None:
+        return {
+            "message": "Nothing new to export",
+            "version": store.version,
+            "timestamp": datetime.now().isoformat()
+        }
+    return manifest
+
+@app.get("/api/export")
+async def latest_export():
+    """Manifest of the latest Parquet export"""
+    try:
+        with open(os.path.join(settings.parquet_export_dir, "manifest.json"), "rb") as f:
+            return Response(content=f.read(), media_type="application/json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No Parquet export yet")
+
+@app.get("/api/timeseries")
+async def list_timeseries():
+    """Metrics with recorded history, their retention and memory use"""
+    return timeseries.describe()
+
+@app.get("/api/timeseries/{metric}")
+async def get_timeseries(
+    metric: str,
+    entity: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "auto"
+):
+    """History of an aggregate metric (e.g. clients.totalRevenue) or of one entity's field (e.g. clients.annualRevenue)"""
+    if resolution != "auto" and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be auto or one of: {', '.join(RESOLUTIONS)}")
+    try:
+        return timeseries.query(
+            metric,
+            entity,
+            start.timestamp() if start else None,
+            end.timestamp() if end else None,
+            resolution
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
 @app.get("/api/stats")
 async def get_stats():
     """Get statistics about the data"""
+    snapshot = current_snapshot()
     return {
         "timestamp": datetime.now().isoformat(),
-        "counts": {k: len(v) for k, v in data_store.items()},
+        "counts": snapshot.counts(),
+        "version": snapshot.version,
         "update_interval": settings.update_interval_seconds,
-        "is_running": is_running
+        "is_running": is_running,
+        "role": role,
+        "ticks": scheduler.stats() if scheduler else {},
+        "shared_state": shared_publisher.stats() if shared_publisher else {},
+        "tick_log": recorder.stats() if recorder else {},
+        "replay": replayer.stats() if replayer else {},
+        "jobs": jobs.stats() if jobs else {},
+        "report_cache": report_cache.stats() if report_cache else {}
+    }
+
+@app.get("/api/analytics/{collection}")
+async def get_analytics(collection: str):
+    """Metric bundle and numeric field summaries of a collection, computed on its columnar form"""
+    if collection not in COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    snapshot = current_snapshot()
+    return {
+        "version": snapshot.version,
+        **collection_analytics(snapshot.table(collection))
     }
 
-@app.post("/api/generate-report")
+@app.post("/api/generate-report", status_code=202)
 async def generate_report(report_data: dict):
-    """Generate professional PDF report with AI insights"""
+    """Generate professional PDF report with AI insights as a background job"""
+    report_type = report_data.get('pageType', 'client-profitability')
+    report_payloads = await reports.aload()
     try:
-        report_type = report_data.get('pageType', 'client-profitability')
+        collection = report_payloads.report_collection(report_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Build the whole report from one consistent version of the data
+        snapshot = current_snapshot()
+        trends = timeseries.trends(collection, settings.report_trend_window_seconds)
+        # Keyed on the report's own collection, so ticks of other collections keep it cached
+        key = ReportCache.make_key(report_type, *snapshot.changed[collection], report_data, trends)
         
-        # Create reports directory if it doesn't exist
-        os.makedirs('reports', exist_ok=True)
+        # Identical report already rendered: return it straight away
+        cached = report_cache.get(key)
+        if cached is not None:
+            return report_response(cached, report_type)
         
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = f"reports/{report_type}_report_{timestamp}.pdf"
+        # Identical report being rendered: share that job
+        inflight_job = jobs.get(report_cache.inflight(key) or "")
+        if inflight_job is not None and not inflight_job.done:
+            report_cache.coalesced += 1
+            return job_accepted(inflight_job)
         
-        # Generate report based on type
-        if report_type == 'software-license':
-            # Prepare data for software license report
-            licenses = [license.model_dump() for license in data_store["licenses"]]
-            
-            # Calculate metrics
-            total_licenses = len(licenses)
-            total_cost = sum(l.get('monthlyCost', 0) for l in licenses)
-            avg_utilization = sum(l.get('utilizationRate', 0) for l in licenses) / total_licenses if total_licenses > 0 else 0
-            underutilized = len([l for l in licenses if l.get('utilizationRate', 0) < 50])
-            potential_savings = sum(l.get('monthlyCost', 0) for l in licenses if l.get('utilizationRate', 0) < 50)
-            
-            # Prepare chart data
-            top_licenses = sorted(licenses, key=lambda x: x.get('monthlyCost', 0), reverse=True)[:10]
-            
-            report_payload = {
-                'dateRange': datetime.now().strftime('%B %Y'),
-                'summary': report_data.get('summary',
-                    f"Analysis of {total_licenses} software licenses reveals significant optimization opportunities. "
-                    f"Current average utilization rate of {avg_utilization:.1f}% indicates {underutilized} underutilized licenses "
-                    f"with potential monthly savings of ${potential_savings:,.0f}. Strategic license management and right-sizing "
-                    f"initiatives can substantially reduce software spend while maintaining operational efficiency."),
-                'metrics': [
-                    {'label': 'Total Software Licenses', 'value': str(total_licenses), 'trend': 3.2},
-                    {'label': 'Total Monthly Cost', 'value': f'${total_cost:,.0f}', 'trend': -5.5},
-                    {'label': 'Average Utilization Rate', 'value': f'{avg_utilization:.1f}%', 'trend': 8.3},
-                    {'label': 'Underutilized Licenses', 'value': str(underutilized), 'trend': -12.0},
-                    {'label': 'Potential Monthly Savings', 'value': f'${potential_savings:,.0f}', 'trend': 0},
-                    {'label': 'Compliance Score', 'value': '94%', 'trend': 2.1},
-                ],
-                'charts': [
-                    {
-                        'type': 'bar',
-                        'title': 'Top 10 Licenses by Monthly Cost',
-                        'data': [{'name': f"{l.get('vendor', 'Unknown')} {l.get('product', '')}"[:20], 
-                                 'value': l.get('monthlyCost', 0)} for l in top_licenses]
-                    },
-                    {
-                        'type': 'bar',
-                        'title': 'License Utilization Rates',
-                        'data': [{'name': f"{l.get('vendor', 'Unknown')} {l.get('product', '')}"[:20], 
-                                 'value': l.get('utilizationRate', 0)} for l in top_licenses]
-                    },
-                    {
-                        'type': 'pie',
-                        'title': 'License Distribution by Vendor',
-                        'data': _aggregate_by_field(licenses, 'vendor')[:6]
-                    }
-                ],
-                'insights': report_data.get('insights', {
-                    'keyFindings': [
-                        f"Portfolio consists of {total_licenses} software licenses across {len(set(l.get('vendor') for l in licenses))} vendors",
-                        f"Average utilization rate of {avg_utilization:.1f}% indicates room for optimization",
-                        f"{underutilized} licenses identified as underutilized (< 50% usage)",
-                        f"Potential monthly savings of ${potential_savings:,.0f} through license right-sizing",
-                        "Significant cost variation across vendors presents negotiation opportunities"
-                    ],
-                    'risks': [
-                        {
-                            'level': 'high',
-                            'description': f'{underutilized} underutilized licenses wasting ${potential_savings:,.0f} monthly in unnecessary costs',
-                            'recommendation': 'Immediately audit license usage and reclaim unused seats. Implement automated usage monitoring to prevent future waste.'
-                        },
-                        {
-                            'level': 'medium',
-                            'description': 'License renewals approaching without utilization review',
-                            'recommendation': 'Establish 90-day pre-renewal review process. Analyze usage trends and right-size license counts before renewal.'
-                        },
-                        {
-                            'level': 'low',
-                            'description': 'Potential compliance risks from untracked license deployments',
-                            'recommendation': 'Implement centralized license management system. Conduct quarterly compliance audits to ensure proper licensing.'
-                        }
-                    ],
-                    'recommendations': [
-                        'Implement automated license usage monitoring and alerting system',
-                        'Reclaim unused licenses quarterly to optimize costs',
-                        'Negotiate volume discounts with top 3 vendors representing 60% of spend',
-                        'Consolidate similar tools to reduce vendor count and complexity',
-                        'Establish license approval workflow to prevent unnecessary purchases',
-                        'Create license optimization playbook with clear reclamation procedures',
-                        'Implement chargeback model to increase departmental accountability',
-                        'Evaluate alternative vendors for underperforming or overpriced licenses'
-                    ],
-                    'nextActions': [
-                        'Audit all licenses with utilization below 50% within next 7 days',
-                        'Contact vendors to reclaim unused seats and adjust license counts',
-                        'Schedule vendor negotiation meetings for top 3 software providers',
-                        'Implement automated usage tracking for all critical applications',
-                        'Create license optimization dashboard for ongoing monitoring',
-                        'Develop license request and approval workflow',
-                        'Conduct user training on license compliance and best practices',
-                        'Establish quarterly license review meetings with department heads'
-                    ]
-                })
-            }
-            
-            generate_software_license_report(report_payload, output_file)
-            
-        elif report_type == 'sales-pipeline':
-            # Prepare data for sales pipeline report
-            leads = [lead.model_dump() for lead in data_store["leads"]]
-            
-            # Calculate metrics
-            total_leads = len(leads)
-            total_value = sum(l.get('estimatedValue', 0) for l in leads)
-            avg_deal_size = total_value / total_leads if total_leads > 0 else 0
-            closed_won = len([l for l in leads if l.get('stage') == 'Closed Won'])
-            conversion_rate = (closed_won / total_leads * 100) if total_leads > 0 else 0
-            
-            # Stage distribution
-            stage_counts = {}
-            for lead in leads:
-                stage = lead.get('stage', 'Unknown')
-                stage_counts[stage] = stage_counts.get(stage, 0) + 1
-            
-            report_payload = {
-                'dateRange': datetime.now().strftime('%B %Y'),
-                'summary': report_data.get('summary',
-                    f"Analysis of {total_leads} leads in the sales pipeline reveals a total potential value of ${total_value:,.0f}. "
-                    f"Current conversion rate of {conversion_rate:.1f}% with average deal size of ${avg_deal_size:,.0f} indicates "
-                    f"strong pipeline health. Strategic focus on qualification and proposal stages can accelerate deal velocity "
-                    f"and improve overall conversion rates."),
-                'metrics': [
-                    {'label': 'Total Pipeline Value', 'value': f'${total_value:,.0f}', 'trend': 15.3},
-                    {'label': 'Total Active Leads', 'value': str(total_leads), 'trend': 8.7},
-                    {'label': 'Average Deal Size', 'value': f'${avg_deal_size:,.0f}', 'trend': 5.2},
-                    {'label': 'Conversion Rate', 'value': f'{conversion_rate:.1f}%', 'trend': 3.8},
-                    {'label': 'Closed Won', 'value': str(closed_won), 'trend': 12.5},
-                    {'label': 'Win Rate', 'value': f'{conversion_rate:.1f}%', 'trend': 4.2},
-                ],
-                'charts': [
-                    {
-                        'type': 'bar',
-                        'title': 'Pipeline Distribution by Stage',
-                        'data': [{'name': k, 'value': v} for k, v in sorted(stage_counts.items(), key=lambda x: x[1], reverse=True)]
-                    },
-                    {
-                        'type': 'bar',
-                        'title': 'Top 10 Opportunities by Value',
-                        'data': [{'name': l.get('companyName', 'Unknown')[:20], 
-                                 'value': l.get('estimatedValue', 0)} 
-                                for l in sorted(leads, key=lambda x: x.get('estimatedValue', 0), reverse=True)[:10]]
-                    },
-                    {
-                        'type': 'pie',
-                        'title': 'Lead Distribution by Source',
-                        'data': _aggregate_by_field(leads, 'source')[:6]
-                    }
-                ],
-                'insights': report_data.get('insights', {
-                    'keyFindings': [
-                        f"Pipeline contains {total_leads} active opportunities worth ${total_value:,.0f}",
-                        f"Current conversion rate of {conversion_rate:.1f}% aligns with industry benchmarks",
-                        f"Average deal size of ${avg_deal_size:,.0f} indicates healthy opportunity quality",
-                        f"{closed_won} deals closed won this period, representing strong sales execution",
-                        "Lead source analysis reveals opportunities for channel optimization"
-                    ],
-                    'risks': [
-                        {
-                            'level': 'medium',
-                            'description': 'Leads stalling in qualification and proposal stages',
-                            'recommendation': 'Implement lead scoring system and automated nurture campaigns. Provide sales team with objection handling training.'
-                        },
-                        {
-                            'level': 'medium',
-                            'description': 'Extended sales cycles impacting revenue predictability',
-                            'recommendation': 'Analyze deal velocity by stage. Identify and remove bottlenecks in sales process. Consider sales enablement tools.'
-                        },
-                        {
-                            'level': 'low',
-                            'description': 'Seasonal pipeline fluctuations affecting forecasting accuracy',
-                            'recommendation': 'Develop seasonal pipeline models. Adjust resource allocation and marketing spend based on historical patterns.'
-                        }
-                    ],
-                    'recommendations': [
-                        'Implement AI-powered lead scoring to prioritize high-probability opportunities',
-                        'Develop stage-specific sales playbooks to accelerate deal progression',
-                        'Establish automated follow-up sequences for each pipeline stage',
-                        'Create competitive battle cards to improve win rates',
-                        'Implement sales enablement platform for content management',
-                        'Develop ROI calculator tools to strengthen value propositions',
-                        'Establish weekly pipeline review cadence with sales leadership',
-                        'Invest in sales training focused on consultative selling techniques'
-                    ],
-                    'nextActions': [
-                        'Review all opportunities stalled over 30 days in qualification stage',
-                        'Schedule proposal review sessions for deals in negotiation',
-                        'Implement lead scoring system within next 14 days',
-                        'Create sales playbook for top 3 use cases',
-                        'Develop automated email sequences for each pipeline stage',
-                        'Conduct win/loss analysis on last 20 closed opportunities',
-                        'Schedule sales training on objection handling techniques',
-                        'Establish monthly pipeline health review with executive team'
-                    ]
-                })
-            }
-            
-            generate_sales_pipeline_report(report_payload, output_file)
-            
-        elif report_type == 'client-profitability':
-            # Prepare data for report
-            clients = [client.model_dump() for client in data_store["clients"]]
-            
-            # Calculate metrics
-            total_revenue = sum(c.get('monthlyRecurring', 0) for c in clients)
-            total_costs = sum(c.get('annualCosts', 0) / 12 for c in clients)
-            avg_margin = ((total_revenue - total_costs) / total_revenue * 100) if total_revenue > 0 else 0
-            at_risk = len([c for c in clients if c.get('status') == 'At Risk'])
-            
-            # Prepare chart data
-            top_clients = sorted(clients, key=lambda x: x.get('monthlyRecurring', 0), reverse=True)[:10]
-            
-            report_payload = {
-                'dateRange': datetime.now().strftime('%B %Y'),
-                'summary': report_data.get('summary', 
-                    f"Comprehensive analysis of {len(clients)} active clients reveals strong overall performance "
-                    f"with an average profit margin of {avg_margin:.1f}%. Strategic opportunities identified for "
-                    f"margin optimization and risk mitigation across the client portfolio."),
-                'metrics': [
-                    {'label': 'Total Monthly Recurring Revenue', 'value': f'${total_revenue:,.0f}', 'trend': 8.5},
-                    {'label': 'Average Profit Margin', 'value': f'{avg_margin:.1f}%', 'trend': 2.3},
-                    {'label': 'Active Clients', 'value': str(len(clients)), 'trend': 5.0},
-                    {'label': 'At-Risk Clients', 'value': str(at_risk), 'trend': -15.0},
-                    {'label': 'Total Monthly Costs', 'value': f'${total_costs:,.0f}', 'trend': 3.2},
-                    {'label': 'Net Monthly Profit', 'value': f'${(total_revenue - total_costs):,.0f}', 'trend': 12.5},
-                ],
-                'charts': [
-                    {
-                        'type': 'bar',
-                        'title': 'Top 10 Clients by Monthly Recurring Revenue',
-                        'data': [{'name': c.get('name', 'Unknown'), 'value': c.get('monthlyRecurring', 0)} 
-                                for c in top_clients]
-                    },
-                    {
-                        'type': 'pie',
-                        'title': 'Client Distribution by Industry',
-                        'data': _aggregate_by_field(clients, 'industry')
-                    },
-                    {
-                        'type': 'bar',
-                        'title': 'Client Profitability Analysis',
-                        'data': [{'name': c.get('name', 'Unknown')[:15], 
-                                 'value': (c.get('annualRevenue', 0) - c.get('annualCosts', 0)) / 12} 
-                                for c in top_clients]
-                    }
-                ],
-                'insights': report_data.get('insights', {
-                    'keyFindings': [
-                        f"Portfolio consists of {len(clients)} active clients across {len(set(c.get('industry') for c in clients))} industries",
-                        f"Top 20% of clients generate approximately {_calculate_top_20_percent(clients):.1f}% of total revenue",
-                        f"Average profit margin of {avg_margin:.1f}% indicates healthy business performance",
-                        f"{at_risk} clients identified as at-risk, requiring immediate attention and intervention",
-                        "Significant variation in profitability across client segments presents optimization opportunities"
-                    ],
-                    'risks': [
-                        {
-                            'level': 'high',
-                            'description': f'{at_risk} clients showing declining margins or at-risk status requiring immediate intervention',
-                            'recommendation': 'Conduct comprehensive profitability reviews with at-risk clients within 7 days. Analyze service delivery costs, adjust pricing structures, and implement performance improvement plans.'
-                        },
-                        {
-                            'level': 'medium',
-                            'description': 'Contract renewal dates approaching for key accounts within next 90 days',
-                            'recommendation': 'Initiate proactive renewal discussions 90 days in advance. Prepare value demonstration materials and competitive analysis to support pricing negotiations.'
-                        },
-                        {
-                            'level': 'low',
-                            'description': 'Market conditions and competitive pressures may impact client retention rates',
-                            'recommendation': 'Implement quarterly business reviews with top 20% clients. Strengthen relationships through strategic account management and value-added services.'
-                        }
-                    ],
-                    'recommendations': [
-                        'Implement tiered service delivery model to optimize resource allocation and improve margins across all client segments',
-                        'Develop targeted upsell and cross-sell strategies for high-margin accounts with expansion potential',
-                        'Establish automated profitability monitoring dashboard with real-time alerts for margin degradation',
-                        'Create standardized service packages with clear pricing tiers to improve predictability and scalability',
-                        'Invest in client success programs to reduce churn risk and increase lifetime value',
-                        'Conduct comprehensive cost analysis to identify efficiency opportunities in service delivery',
-                        'Implement value-based pricing strategies for premium services and specialized expertise',
-                        'Develop client segmentation framework to prioritize resources on highest-value relationships'
-                    ],
-                    'nextActions': [
-                        'Schedule profitability review meetings with all at-risk clients within next 7 days',
-                        'Analyze service delivery costs and resource allocation for bottom 20% of clients by profitability',
-                        'Prepare pricing adjustment proposals for clients with margins below 20% threshold',
-                        'Develop client retention playbook with specific interventions for different risk levels',
-                        'Create executive dashboard for real-time profitability monitoring and trend analysis',
-                        'Initiate contract renewal discussions for clients with agreements expiring within 90 days',
-                        'Conduct competitive analysis to ensure pricing remains market-competitive while maintaining margins',
-                        'Implement quarterly business reviews with top 10 clients to strengthen strategic partnerships'
-                    ]
-                })
-            }
-            
-            generate_client_profitability_report(report_payload, output_file)
+        async def cache_rendered_report(rendered) -> str:
+            content, timings = rendered
+            record_report_timings(report_type, timings)
+            report_cache.untrack(key)
+            return await asyncio.to_thread(report_cache.put, key, content)
         
-        # Return file for download
-        return FileResponse(
-            path=output_file,
-            media_type='application/pdf',
-            filename=os.path.basename(output_file)
+        report_cache.untrack(key)
+        job = jobs.submit(
+            "report",
+            report_payloads.render_report_timed,
+            report_type,
+            snapshot.table(collection),
+            report_data,
+            trends,
+            params={"pageType": report_type, "version": snapshot.version},
+            on_complete=cache_rendered_report
         )
+        report_cache.track(key, job.id)
+        return job_accepted(job)
         
+    except JobRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.error(f"Error generating report: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate report: {str(e)}")
 
-def _aggregate_by_field(items: List[dict], field: str) -> List[dict]:
-    """Aggregate items by a specific field"""
-    aggregated = {}
-    for item in items:
-        value = item.get(field, 'Unknown')
-        aggregated[value] = aggregated.get(value, 0) + 1
+@app.post("/api/generate-reports", status_code=202)
+async def generate_reports(batch_request: dict):
+    """Generate many reports in one background job: several report types, or per client/industry
     
-    return [{'name': k, 'value': v} for k, v in sorted(aggregated.items(), key=lambda x: x[1], reverse=True)]
-
-def _calculate_top_20_percent(clients: List[dict]) -> float:
-    """Calculate revenue percentage from top 20% clients"""
-    if not clients:
-        return 0
+    Body: ``reportTypes`` (list or "all"), optional ``groupBy`` ("client" or
+    "industry"), ``format`` ("zip" or "manifest") and the usual ``summary``
+    and ``insights`` overrides.
+    """
+    report_types = batch_request.get('reportTypes', 'all')
+    if isinstance(report_types, str):
+        report_types = [report_types]
+    batch_format = batch_request.get('format', 'zip')
+    batch_reports = await batches.aload()
+    if batch_format not in batch_reports.BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown batch format: {batch_format}")
     
-    sorted_clients = sorted(clients, key=lambda x: x.get('monthlyRecurring', 0), reverse=True)
-    top_20_count = max(1, len(sorted_clients) // 5)
-    top_20_revenue = sum(c.get('monthlyRecurring', 0) for c in sorted_clients[:top_20_count])
-    total_revenue = sum(c.get('monthlyRecurring', 0) for c in sorted_clients)
+    snapshot = current_snapshot()
+    try:
+        # Payloads are built here, once per collection; only rendering goes to the pool
+        start = time.perf_counter()
+        entries = await asyncio.to_thread(
+            batch_reports.plan_batch, snapshot, report_types, batch_request.get('groupBy'), batch_request,
+            {
+                collection: timeseries.trends(collection, settings.report_trend_window_seconds)
+                for collection in REPORT_ANALYTICS
+            }
+        )
+        REPORT_RENDER_DURATION.observe(time.perf_counter() - start, report_type="batch", stage="metrics")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return (top_20_revenue / total_revenue * 100) if total_revenue > 0 else 0
+    try:
+        await asyncio.to_thread(
+            batch_reports.prune_batches, settings.batch_output_dir, settings.batch_retention_hours * 3600
+        )
+        os.makedirs(settings.batch_output_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        source = {"version": snapshot.version, "createdAt": snapshot.created_at}
+        job = jobs.submit(
+            "batch",
+            render_batch,
+            job_id,
+            entries,
+            batch_format,
+            source,
+            params={
+                "reportTypes": sorted({entry.report_type for entry in entries}),
+                "groupBy": batch_request.get('groupBy'),
+                "format": batch_format,
+                "reports": len(entries),
+                "version": snapshot.version
+            },
+            job_id=job_id
+        )
+        return job_accepted(job)
+    except JobRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+@app.get("/debug/loop", dependencies=[Depends(require_debug_access)])
+async def debug_loop():
+    """Event loop lag percentiles, recent stalls and the stacks that blocked the loop"""
+    if loop_monitor is None:
+        raise HTTPException(status_code=404, detail="Loop monitor is disabled")
+    return loop_monitor.stats()
+
+@app.get("/debug/profile", dependencies=[Depends(require_debug_access)])
+async def debug_profile(seconds: float = 10.0, mode: str = "wall", format: str = "collapsed"):
+    """Sample every thread of this process for a window and return collapsed stacks or speedscope JSON"""
+    if not 0 < seconds <= settings.profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {settings.profile_max_seconds:g}]")
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(PROFILE_MODES)}")
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(PROFILE_FORMATS)}")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with profile_lock:
+        try:
+            profiler = SamplingProfiler(mode, settings.profile_interval_seconds)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # The sampler sleeps between samples on its own thread; the loop keeps serving meanwhile
+        await asyncio.to_thread(profiler.run, seconds)
+
+    logger.info(f"Profiled {profiler.samples} samples over {profiler.duration:.1f}s ({mode})")
+    if format == "speedscope":
+        return JSONResponse(
+            profiler.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{mode}.speedscope.json"'}
+        )
+    return PlainTextResponse(profiler.collapsed())
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the result of a finished job; report jobs return the PDF, batch jobs their zip or manifest"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    
+    if job.type == "report":
+        # The job result is the report's cache key
+        content = report_cache.get(job.result)
+        if content is None:
+            raise HTTPException(status_code=410, detail="Report was evicted from the cache; request it again")
+        return report_response(content, job.params.get("pageType", "report"))
+    if job.type == "batch":
+        path = batch_path(job.result["output"])
+        if job.result["format"] == "zip":
+            return FileResponse(path=path, media_type='application/zip', filename=f"prism_reports_{job_id}.zip")
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        for report in manifest["reports"]:
+            report["url"] = f"/api/jobs/{job_id}/files/{report['file']}"
+        return manifest
+    return job.result
+
+@app.get("/api/jobs/{job_id}/files/{file_path:path}")
+async def get_job_file(job_id: str, file_path: str):
+    """Download one report of a finished manifest-format batch job"""
+    job = jobs.get(job_id)
+    if job is None or job.type != "batch" or job.status != SUCCEEDED:
+        raise HTTPException(status_code=404, detail="Batch job not found or not finished")
+    path = batch_path(os.path.join(job.result["output"], file_path))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Batch output not found")
+    return FileResponse(path=path, media_type='application/pdf', filename=os.path.basename(path))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,212 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms with labels, kept deliberately small: recording a
+sample is a dict lookup, a bisect over the bucket bounds and a few
+additions under a per-metric lock, so instrumentation can stay on in
+production. ``registry.render()`` produces the body served at ``/metrics``.
+
+Every process keeps its own series. When several workers serve the API,
+each scrape reflects the worker that answered it.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond serialization up to multi-second report layout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Bucketed distribution of observed values per label set"""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+TICK_DURATION = registry.histogram(
+    "prism_tick_duration_seconds", "Time to build the next version of one data type", ["data_type"]
+)
+SYNC_DURATION = registry.histogram(
+    "prism_sync_duration_seconds", "Duration of one sync_to_dynamodb call"
+)
+TABLE_WRITE_DURATION = registry.histogram(
+    "prism_dynamodb_write_duration_seconds", "Time to write one table during a sync", ["table"]
+)
+ITEMS_WRITTEN = registry.counter(
+    "prism_dynamodb_items_written_total", "Items sent to DynamoDB in BatchWriteItem requests", ["table"]
+)
+BYTES_WRITTEN = registry.counter(
+    "prism_dynamodb_bytes_written_total", "Request body bytes sent to DynamoDB in BatchWriteItem requests", ["table"]
+)
+UNPROCESSED_ITEMS = registry.counter(
+    "prism_dynamodb_unprocessed_items_total", "Items DynamoDB returned as unprocessed and had to be resent", ["table"]
+)
+RETRIES = registry.counter(
+    "prism_dynamodb_retries_total", "Request retries performed by the AWS SDK", ["operation"]
+)
+THROTTLES = registry.counter(
+    "prism_dynamodb_throttles_total", "Throttling errors returned by DynamoDB", ["operation"]
+)
+SERIALIZATION_DURATION = registry.histogram(
+    "prism_serialization_seconds", "Time spent converting items for DynamoDB", ["table", "stage"]
+)
+REPORT_RENDER_DURATION = registry.histogram(
+    "prism_report_render_seconds", "Report rendering time by stage (metrics, charts, layout)", ["report_type", "stage"]
+)
+EXPORT_DURATION = registry.histogram(
+    "prism_parquet_export_seconds", "Time spent writing one collection's Parquet export file", ["table"]
+)
+EXPORT_ROWS = registry.counter(
+    "prism_parquet_export_rows_total", "Rows written to Parquet export files, by full or changes file", ["table", "kind"]
+)
+REQUEST_DURATION = registry.histogram(
+    "prism_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route templates keep cardinality bounded; unmatched paths share one series
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status[0])
+            )
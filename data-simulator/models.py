@@ -1,8 +1,12 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
-class Client(BaseModel):
+class EntityModel(BaseModel):
+    """Base for simulated entities; frozen so published snapshots stay immutable"""
+    model_config = ConfigDict(frozen=True)
+
+class Client(EntityModel):
     id: str
     name: str
     industry: str
@@ -16,7 +20,7 @@ class Client(BaseModel):
     churnRisk: str
     lastUpdated: str
 
-class License(BaseModel):
+class License(EntityModel):
     id: str
     vendor: str
     product: str
@@ -31,7 +35,7 @@ class License(BaseModel):
     utilizationRate: float
     lastUpdated: str
 
-class Lead(BaseModel):
+class Lead(EntityModel):
     id: str
     companyName: str
     contactName: str
@@ -47,7 +51,7 @@ class Lead(BaseModel):
     lastContact: str
     lastUpdated: str
 
-class Technician(BaseModel):
+class Technician(EntityModel):
     id: str
     name: str
     role: str
@@ -60,7 +64,7 @@ class Technician(BaseModel):
     status: str
     lastUpdated: str
 
-class Department(BaseModel):
+class Department(EntityModel):
     id: str
     name: str
     budget: float
@@ -71,7 +75,7 @@ class Department(BaseModel):
     topExpenseCategory: str
     lastUpdated: str
 
-class Vendor(BaseModel):
+class Vendor(EntityModel):
     id: str
     name: str
     category: str
@@ -84,7 +88,7 @@ class Vendor(BaseModel):
     performanceScore: int
     lastUpdated: str
 
-class Contract(BaseModel):
+class Contract(EntityModel):
     id: str
     vendorId: str
     vendorName: str
@@ -96,3 +100,14 @@ class Contract(BaseModel):
     noticePeriod: int
     status: str
     lastUpdated: str
+
+# Store collection name -> entity model
+COLLECTION_MODELS = {
+    "clients": Client,
+    "licenses": License,
+    "leads": Lead,
+    "technicians": Technician,
+    "departments": Department,
+    "vendors": Vendor,
+    "contracts": Contract
+}
@@ -0,0 +1,199 @@
+"""
+Partitioned Parquet export of store snapshots.
+
+Writes every collection to Parquet files under a directory partitioned by
+the snapshot's date and hour, for bulk loading into a warehouse without
+scanning DynamoDB:
+
+    exports/licenses/date=2026-10-19/hour=11/licenses-v00000042-full.parquet
+    exports/licenses/date=2026-10-19/hour=12/licenses-v00000057-changes.parquet
+    exports/_manifests/v00000057.json
+    exports/manifest.json
+
+A collection's first export (and every ``full_every``-th one) is a full
+file. The others hold only the rows that changed since the previous export.
+The store is copy-on-write, so unchanged entities are the same objects in
+both snapshots and changed rows are found by identity, without comparing
+values. A collection that did not change at all gets no new file. Replaying
+a collection's ``changes`` over its ``base`` by ``id``, later files winning,
+gives the collection as of the export.
+
+Data is converted through ``arrow_interop`` and compressed with zstd (by
+default). String columns with few distinct values are written as
+dictionary-encoded categoricals; which columns those are is settled by a
+collection's full export and kept for its change files, so all of them
+share one schema.
+
+Files are written under a temporary name and renamed into place. The
+manifest, which lists the files making up the export, is written last the
+same way, so a reader following ``manifest.json`` never sees a partial
+export.
+
+Requires the optional ``pyarrow`` package. ``export`` blocks; callers run it
+on a worker thread.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import arrow_interop
+from columnar import ColumnarTable
+from metrics import EXPORT_DURATION, EXPORT_ROWS
+from models import COLLECTION_MODELS
+from store import Snapshot
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+MANIFESTS_DIR = "_manifests"
+
+
+def write_atomic(path: str, write) -> int:
+    """Write a file through ``write(tmp_path)`` and rename it into place; returns its size"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(path)
+
+
+class ParquetExporter:
+    """Exports snapshots to partitioned Parquet files, incrementally between full exports"""
+
+    def __init__(
+        self,
+        output_dir: str,
+        compression: str = "zstd",
+        compression_level: Optional[int] = None,
+        full_every: int = 12,
+        dictionary_max_ratio: float = 0.5
+    ):
+        self.output_dir = output_dir
+        self.compression = compression
+        self.compression_level = compression_level
+        self.full_every = max(1, full_every)
+        self.dictionary_max_ratio = dictionary_max_ratio
+        self.last_version: Optional[int] = None
+        # Per collection: the items last exported, files since the last full export, categorical columns
+        self._exported: Dict[str, Tuple] = {}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._categoricals: Dict[str, List[str]] = {}
+        self._exports = 0
+
+    def _categorical_columns(self, batch: pa.RecordBatch) -> List[str]:
+        """String columns with at most ``dictionary_max_ratio`` distinct values per row"""
+        columns = []
+        for field, column in zip(batch.schema, batch.columns):
+            if pa.types.is_string(field.type) and len(column):
+                distinct = len(column.dictionary_encode().dictionary)
+                if distinct <= len(column) * self.dictionary_max_ratio:
+                    columns.append(field.name)
+        return columns
+
+    def _to_arrow(self, name: str, batch: pa.RecordBatch, metadata: Dict[str, str]) -> pa.Table:
+        categoricals = set(self._categoricals[name])
+        arrays = [
+            column.dictionary_encode() if field.name in categoricals else column
+            for field, column in zip(batch.schema, batch.columns)
+        ]
+        fields = [pa.field(field.name, array.type, nullable=False) for field, array in zip(batch.schema, arrays)]
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=metadata))
+
+    def _changed_rows(self, name: str, items: Tuple) -> Optional[List[int]]:
+        """Indices of rows not in the previous export, or None if a full export is needed"""
+        previous = self._exported.get(name)
+        if previous is None:
+            return None
+        # The previous tuple is still referenced here, so ids cannot have been reused
+        previous_objects = {id(item) for item in previous}
+        changed = [i for i, item in enumerate(items) if id(item) not in previous_objects]
+        if len(changed) > len(items) // 2:
+            return None
+        # Entities that disappeared cannot be expressed as changed rows
+        if {item.id for item in previous} - {item.id for item in items}:
+            return None
+        return changed
+
+    def _write(self, name: str, snapshot: Snapshot, rows: Optional[List[int]], kind: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if rows is None:
+            table = snapshot.table(name)
+        else:
+            # Only the changed models are converted, not the whole collection
+            items = snapshot[name]
+            table = ColumnarTable.from_models(name, COLLECTION_MODELS[name], [items[i] for i in rows])
+        batch = arrow_interop.to_record_batch(table)
+        if kind == "full":
+            self._categoricals[name] = self._categorical_columns(batch)
+        arrow_table = self._to_arrow(name, batch, {
+            "prism.collection": name,
+            "prism.snapshot_version": str(snapshot.version),
+            "prism.created_at": snapshot.created_at,
+            "prism.kind": kind,
+        })
+
+        created = datetime.fromisoformat(snapshot.created_at)
+        relative = os.path.join(
+            name, f"date={created:%Y-%m-%d}", f"hour={created:%H}", f"{name}-v{snapshot.version:08d}-{kind}.parquet"
+        )
+        size = write_atomic(os.path.join(self.output_dir, relative), lambda path: pq.write_table(
+            arrow_table,
+            path,
+            compression=self.compression,
+            compression_level=self.compression_level,
+            use_dictionary=self._categoricals[name]
+        ))
+        EXPORT_DURATION.observe(time.perf_counter() - start, table=name)
+        EXPORT_ROWS.inc(len(table), table=name, kind=kind)
+        return {"path": relative, "version": snapshot.version, "rows": len(table), "bytes": size}
+
+    def export(self, snapshot: Snapshot) -> Dict[str, Any]:
+        """Export a snapshot and return its manifest"""
+        start = time.perf_counter()
+        full = self._exports % self.full_every == 0
+        for name in snapshot.keys():
+            items = snapshot[name]
+            if not full and items is self._exported.get(name):
+                continue
+            rows = None if full else self._changed_rows(name, items)
+            if rows is None:
+                self._files[name] = {"base": self._write(name, snapshot, None, "full"), "changes": []}
+            elif rows:
+                self._files[name]["changes"].append(self._write(name, snapshot, rows, "changes"))
+            self._exported[name] = items
+        self._exports += 1
+        self.last_version = snapshot.version
+
+        manifest = {
+            "version": snapshot.version,
+            "createdAt": snapshot.created_at,
+            "exportedAt": datetime.now().isoformat(),
+            "seconds": round(time.perf_counter() - start, 3),
+            "format": {"compression": self.compression, "partitioning": ["date", "hour"]},
+            "collections": {
+                name: {"rows": len(self._exported[name]), "categoricals": self._categoricals[name], **files}
+                for name, files in self._files.items()
+            }
+        }
+        encoded = json.dumps(manifest, indent=2).encode()
+
+        def write_manifest(path: str):
+            with open(path, "wb") as f:
+                f.write(encoded)
+
+        write_atomic(os.path.join(self.output_dir, MANIFESTS_DIR, f"v{snapshot.version:08d}.json"), write_manifest)
+        write_atomic(os.path.join(self.output_dir, MANIFEST), write_manifest)
+        logger.info(f"Exported snapshot {snapshot.version} to Parquet in {manifest['seconds'] * 1000:.0f} ms")
+        return manifest
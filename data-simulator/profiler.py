@@ -0,0 +1,164 @@
+"""
+On-demand sampling profiler.
+
+A background thread snapshots every thread's Python stack with
+``sys._current_frames`` at a fixed interval for a given window, so the
+tick loop, request handlers and worker threads of a running server can be
+profiled in place without restarting it under a profiler.
+
+Two modes:
+
+- ``wall``: every sample of every thread counts for the time that passed,
+  so blocking I/O and lock waits show up.
+- ``cpu``: each thread's stack is weighted by the CPU time that thread used
+  since the previous sample (per-thread CPU clocks), so idle threads drop
+  out.
+
+Results are rendered as collapsed stacks (``flamegraph.pl``, speedscope
+and most flamegraph tools accept them) or as speedscope JSON.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILE_MODES = ("wall", "cpu")
+PROFILE_FORMATS = ("collapsed", "speedscope")
+
+Frame = Tuple[str, str, int]
+
+
+def _cpu_clock(thread_id: int) -> Optional[int]:
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+def cpu_mode_supported() -> bool:
+    return _cpu_clock(threading.get_ident()) is not None
+
+
+class SamplingProfiler:
+    """Samples all thread stacks of this process for a window of time"""
+
+    def __init__(self, mode: str = "wall", interval: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if mode == "cpu" and not cpu_mode_supported():
+            raise ValueError("CPU profiling needs per-thread CPU clocks, which this platform lacks")
+        self.mode = mode
+        self.interval = interval
+        # (thread name, stack root first) -> weight in seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._frame_cache: Dict[Any, Frame] = {}
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """Sample for ``seconds`` on the calling thread, which is excluded from the profile"""
+        own_id = threading.get_ident()
+        cpu_clocks: Dict[int, Optional[int]] = {}
+        last_cpu: Dict[int, int] = {}
+        started = last = time.perf_counter()
+        deadline = started + seconds
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            elapsed = now - last
+            last = now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.mode == "cpu":
+                    if thread_id not in cpu_clocks:
+                        cpu_clocks[thread_id] = _cpu_clock(thread_id)
+                    clock = cpu_clocks[thread_id]
+                    if clock is None:
+                        continue
+                    try:
+                        used = time.clock_gettime_ns(clock)
+                    except OSError:
+                        # Thread exited between listing and reading its clock
+                        continue
+                    weight = (used - last_cpu.get(thread_id, used)) / 1e9
+                    last_cpu[thread_id] = used
+                else:
+                    weight = elapsed
+                if weight > 0:
+                    self.stacks[(names.get(thread_id, f"thread-{thread_id}"), self._stack(frame))] += weight
+            self.samples += 1
+            time.sleep(self.interval)
+
+        self.duration = time.perf_counter() - started
+        return self
+
+    def _stack(self, frame) -> Tuple[Frame, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            entry = self._frame_cache.get(code)
+            if entry is None:
+                # Keyed by function, not line, so samples anywhere in a function add up
+                entry = self._frame_cache[code] = (code.co_name, code.co_filename, code.co_firstlineno)
+            stack.append(entry)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    @staticmethod
+    def _label(frame: Frame) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> str:
+        """One ``thread;root;...;leaf weight`` line per distinct stack, weights in microseconds"""
+        lines = []
+        for (thread, stack), weight in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            path = ";".join([thread] + [self._label(frame).replace(";", ":") for frame in stack])
+            lines.append(f"{path} {max(1, round(weight * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "prism-simulator") -> Dict[str, Any]:
+        """Speedscope file with one sampled profile per thread"""
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Frame, int] = {}
+        by_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+        for (thread, stack), weight in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            indices = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(index)
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(weight)
+
+        profiles = [
+            {
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }
+            for thread, (samples, weights) in sorted(by_thread.items())
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{name} ({self.mode}, {self.duration:.1f}s, {self.samples} samples)",
+            "exporter": "prism-simulator",
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }
@@ -0,0 +1,75 @@
+"""
+Startup progress for the readiness probe.
+
+The server accepts connections as soon as the app is created; initial data
+generation, the first DynamoDB sync and the warm-up of lazily loaded
+subsystems run in the background. ``Readiness`` tracks those steps.
+``/ready`` reports them and answers 200 once every *required* step is done.
+The optional ones, like the first full-table sync, show up as progress but
+never hold back traffic.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Sequence
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Readiness:
+    """Ordered startup steps, each pending, running, done or failed"""
+
+    def __init__(self, required: Sequence[str] = (), optional: Sequence[str] = ()):
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self.required = tuple(required)
+        self.steps: Dict[str, Dict[str, Any]] = {
+            name: {"status": PENDING, "required": name in self.required}
+            for name in (*self.required, *optional)
+        }
+        self._ready_at = None
+
+    def start(self, name: str):
+        self.steps[name].update(status=RUNNING, startedAt=datetime.now().isoformat(), _start=time.perf_counter())
+
+    def finish(self, name: str, **detail: Any):
+        step = self.steps[name]
+        step.update(status=DONE, seconds=round(time.perf_counter() - step.pop("_start", self._start), 3), **detail)
+        if self._ready_at is None and self.ready:
+            self._ready_at = time.perf_counter() - self._start
+
+    def fail(self, name: str, error: str):
+        step = self.steps[name]
+        step.update(status=FAILED, error=error, seconds=round(time.perf_counter() - step.pop("_start", self._start), 3))
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Run the ``with`` block as a step: failed if it raises (the error propagates), done otherwise"""
+        self.start(name)
+        try:
+            yield
+        except Exception as e:
+            self.fail(name, str(e))
+            raise
+        if self.steps[name]["status"] == RUNNING:
+            self.finish(name)
+
+    @property
+    def ready(self) -> bool:
+        return all(self.steps[name]["status"] == DONE for name in self.required)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startedAt": self.started_at,
+            "uptimeSeconds": round(time.perf_counter() - self._start, 3),
+            "readyAfterSeconds": round(self._ready_at, 3) if self._ready_at is not None else None,
+            "steps": {
+                name: {key: value for key, value in step.items() if not key.startswith("_")}
+                for name, step in self.steps.items()
+            }
+        }
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache of rendered PDF reports.
+
+A report is fully determined by its page type, the version of the
+collection it reports on, its trend figures and the caller-supplied
+``summary``, ``insights`` and ``includeAppendix``, so those form the cache
+key. Ticks of other collections leave cached reports valid. Reports are kept in
+memory, or in a directory when one is configured (so several workers can
+share them), bounded by an entry count and a byte budget with
+least-recently-used eviction. Builds
+that are still running are tracked per key so identical requests can wait
+on the same job instead of rendering again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Caller-supplied fields that change the rendered report
+PAYLOAD_FIELDS = ("summary", "insights", "includeAppendix")
+
+# Cache keys are hex digests; file stems left by older versions are also word characters
+KEY_PATTERN = re.compile(r"^[\w-]+$")
+
+
+class ReportCache:
+    """LRU, size-bounded cache of rendered reports, in memory or on disk"""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 50, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory or None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> size in bytes (disk) or the PDF itself (memory)
+        self._entries: "OrderedDict[str, Union[int, bytes]]" = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_index()
+
+    @staticmethod
+    def make_key(
+        report_type: str,
+        version: int,
+        created_at: str,
+        report_data: Dict[str, Any],
+        trends: Optional[Dict[str, float]] = None
+    ) -> str:
+        """Cache key for a report built from a collection version, its trends and a request payload
+
+        ``version`` and ``created_at`` are those of the snapshot that last
+        changed the report's collection (``Snapshot.changed``).
+        """
+        payload = {field: report_data.get(field) for field in PAYLOAD_FIELDS}
+        payload["trends"] = trends or {}
+        payload_hash = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        # created_at tells apart equal version numbers from different store lifetimes
+        identity = f"{report_type}|{version}|{created_at}|{payload_hash}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid report key: {key}")
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        """The cached report (a file path on disk, the PDF bytes in memory) or None
+
+        Marks the entry as recently used.
+        """
+        with self._lock:
+            if not self.directory:
+                content = self._entries.get(key)
+                if content is None:
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+
+            path = self.path_for(key)
+            if key in self._entries:
+                if os.path.exists(path):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return path
+                # Evicted by another worker sharing the directory
+                self._forget(key)
+            elif os.path.exists(path):
+                # Rendered by another worker sharing the directory
+                self._add(key, os.path.getsize(path))
+                self.hits += 1
+                return path
+            self.misses += 1
+            return None
+
+    def put(self, key: str, content: bytes) -> str:
+        """Store a freshly rendered report and evict as needed; returns the key"""
+        if self.directory:
+            path = self.path_for(key)
+            tmp_path = os.path.join(self.directory, f".{key}.{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            self._add(key, len(content) if self.directory else content)
+            self._evict()
+        return key
+
+    def inflight(self, key: str) -> Optional[str]:
+        """Job id of a running build for this key"""
+        return self._inflight.get(key)
+
+    def track(self, key: str, job_id: str):
+        self._inflight[key] = job_id
+
+    def untrack(self, key: str):
+        self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "storage": self.directory or "memory",
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+    def _add(self, key: str, entry: Union[int, bytes]):
+        self._entries[key] = entry
+        self._total_bytes += entry if isinstance(entry, int) else len(entry)
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry if isinstance(entry, int) else len(entry)
+
+    def _discard(self, key: str):
+        self._forget(key)
+        if self.directory:
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            self._discard(next(iter(self._entries)))
+
+    def _load_index(self):
+        """Index reports left by earlier runs, oldest first, and enforce the limits"""
+        files = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if filename.endswith(".tmp"):
+                # Interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif filename.endswith(".pdf") and KEY_PATTERN.match(filename[:-len(".pdf")]):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, filename[:-len(".pdf")], stat.st_size))
+
+        with self._lock:
+            for _, key, size in sorted(files):
+                self._add(key, size)
+            self._evict()
@@ -8,20 +8,287 @@ from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, Image, KeepTogether
+    SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle,
+    PageBreak, Image, KeepTogether, Flowable, FrameBreak
 )
+from reportlab.platypus.doctemplate import LayoutError
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from collections import OrderedDict, deque
+import functools
+import hashlib
 import io
 import json
-from typing import Dict, List, Any
+import logging
+import threading
+import time
+from typing import BinaryIO, Dict, Iterable, List, Any, Optional, Sequence, Tuple, Union
 import numpy as np
 
+from config import settings
+
+try:
+    from svglib.svglib import svg2rlg
+except ImportError:  # Optional: vector charts fall back to PNG without it
+    svg2rlg = None
+
+logger = logging.getLogger(__name__)
+
+CHART_WIDTH = 6.5*inch
+CHART_HEIGHT = 3.7*inch
+
+DISCLAIMER_TEXT = (
+    "<b>CONFIDENTIAL INFORMATION</b><br/><br/>"
+    "This report contains confidential and proprietary information generated by "
+    "Prism Insights AI-powered analytics platform. The insights and recommendations "
+    "provided are based on real-time data analysis using AWS Bedrock AI technology. "
+    "This document is intended solely for internal business use and should not be "
+    "distributed without proper authorization."
+)
+
+
+class ChartRenderer:
+    """Renders report charts through the object-oriented Agg API and memoizes them
+
+    Rendered images are cached by chart type, title, data and output format,
+    bounded by total bytes, so charts repeated across reports built from the
+    same data are only drawn once. No pyplot global state is touched, so
+    charts can be rendered from several threads at once.
+    """
+    
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, dpi: int = 150, chart_format: str = 'png'):
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.chart_format = chart_format
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if chart_format == 'svg' and svg2rlg is None:
+            logger.warning("svglib is not installed; rendering charts as PNG")
+            self.chart_format = 'png'
+    
+    def flowable(self, chart_data: Dict[str, Any], title: str):
+        """Chart as a ReportLab flowable: an SVG drawing or a PNG image"""
+        image_bytes = self.render(chart_data, title, self.chart_format)
+        
+        if self.chart_format == 'svg':
+            drawing = svg2rlg(io.BytesIO(image_bytes))
+            scale = min(CHART_WIDTH / drawing.width, CHART_HEIGHT / drawing.height)
+            drawing.width, drawing.height = drawing.width * scale, drawing.height * scale
+            drawing.scale(scale, scale)
+            return drawing
+        
+        return Image(io.BytesIO(image_bytes), width=CHART_WIDTH, height=CHART_HEIGHT)
+    
+    def render(self, chart_data: Dict[str, Any], title: str, chart_format: str = 'png') -> bytes:
+        """Rendered chart bytes, from the cache when the same chart was drawn before"""
+        key = self._key(chart_data, title, chart_format)
+        with self._lock:
+            image_bytes = self._cache.get(key)
+            if image_bytes is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return image_bytes
+            self.misses += 1
+        
+        image_bytes = self._draw(chart_data, title, chart_format)
+        
+        with self._lock:
+            if key not in self._cache and len(image_bytes) <= self.max_bytes:
+                self._cache[key] = image_bytes
+                self._cache_bytes += len(image_bytes)
+                while self._cache_bytes > self.max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        return image_bytes
+    
+    def _key(self, chart_data: Dict[str, Any], title: str, chart_format: str) -> str:
+        data_hash = hashlib.sha256(
+            json.dumps(chart_data.get('data', []), sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        return f"{chart_data.get('type', 'bar')}|{title}|{chart_format}|{self.dpi}|{data_hash}"
+    
+    def _draw(self, chart_data: Dict[str, Any], title: str, chart_format: str) -> bytes:
+        fig = Figure(figsize=(7, 4))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        
+        chart_type = chart_data.get('type', 'bar')
+        data = chart_data.get('data', [])
+        
+        if chart_type == 'bar':
+            labels = [item.get('name', f'Item {i}') for i, item in enumerate(data[:10])]
+            values = [item.get('value', 0) for item in data[:10]]
+            
+            bars = ax.bar(labels, values, color='#3B82F6', alpha=0.8)
+            ax.set_ylabel('Value', fontsize=10, fontweight='bold')
+            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
+            
+            # Add value labels on bars
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height,
+                       f'{int(height):,}',
+                       ha='center', va='bottom', fontsize=8)
+            
+            for label in ax.get_xticklabels():
+                label.set_rotation(45)
+                label.set_horizontalalignment('right')
+                label.set_fontsize(8)
+            
+        elif chart_type == 'line':
+            for series in data:
+                ax.plot(series.get('x', []), series.get('y', []), 
+                       marker='o', linewidth=2, label=series.get('name', 'Series'))
+            
+            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
+            ax.legend(fontsize=8)
+            ax.grid(True, alpha=0.3)
+            
+        elif chart_type == 'pie':
+            labels = [item.get('name', f'Item {i}') for i, item in enumerate(data[:6])]
+            values = [item.get('value', 0) for item in data[:6]]
+            
+            colors_list = ['#3B82F6', '#9333EA', '#10B981', '#F59E0B', '#EF4444', '#6366F1']
+            
+            wedges, texts, autotexts = ax.pie(values, labels=labels, autopct='%1.1f%%',
+                                               colors=colors_list, startangle=90)
+            
+            for text in texts:
+                text.set_fontsize(8)
+            for autotext in autotexts:
+                autotext.set_color('white')
+                autotext.set_fontsize(8)
+                autotext.set_fontweight('bold')
+            
+            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
+        
+        # tight_layout already fits the labels, so skip the extra bbox_inches='tight' draw pass
+        fig.tight_layout()
+        
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=chart_format, dpi=self.dpi)
+        return buffer.getvalue()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._cache),
+            "bytes": self._cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+chart_renderer = ChartRenderer(
+    max_bytes=settings.chart_cache_max_bytes,
+    dpi=settings.chart_dpi,
+    chart_format=settings.chart_format
+)
+
+class StreamingTable(Flowable):
+    """Table fed by a row iterator and laid out one page at a time
+
+    Each time the document asks for a split, just enough rows are pulled
+    from the iterator to fill the space left in the frame; they are emitted
+    as a ``LongTable`` with the header repeated and the rest of the rows stay
+    in the iterator. Only about one page of rows is held at once, and every
+    row is measured a bounded number of times, so memory stays flat and
+    layout time grows linearly with the row count. A row too tall for an
+    empty frame raises ``LayoutError`` instead of adding blank pages.
+    """
+    
+    def __init__(self, header: Sequence[str], rows: Iterable[Sequence[Any]], col_widths: Sequence[float],
+                 style: TableStyle, initial_rows: int = 48):
+        super().__init__()
+        self.header = list(header)
+        self.col_widths = list(col_widths)
+        self.style = style
+        self._rows = iter(rows)
+        self._buffer = deque()
+        self._exhausted = False
+        # Rows to try per page; tracks the last page so each split measures about one page
+        self._page_rows = initial_rows
+        # Set after moving on to a fresh frame because no row fitted
+        self._deferred = False
+    
+    def _fill(self, count: int):
+        while len(self._buffer) < count and not self._exhausted:
+            try:
+                self._buffer.append(next(self._rows))
+            except StopIteration:
+                self._exhausted = True
+    
+    def _table(self, rows: List[Sequence[Any]]) -> LongTable:
+        table = LongTable([self.header] + rows, colWidths=self.col_widths, repeatRows=1)
+        table.setStyle(self.style)
+        return table
+    
+    def wrap(self, availWidth, availHeight):
+        # Never drawn directly: claiming more than the available height makes the frame call split()
+        return availWidth, availHeight + 1
+    
+    def split(self, availWidth, availHeight):
+        count = self._page_rows
+        while True:
+            self._fill(count)
+            rows = [self._buffer[i] for i in range(min(count, len(self._buffer)))]
+            table = self._table(rows)
+            _, height = table.wrap(availWidth, availHeight)
+            if height <= availHeight:
+                if self._exhausted and len(rows) == len(self._buffer):
+                    # Last page of the table
+                    self._buffer.clear()
+                    return [table]
+                # Everything fits with room to spare: measure a bigger page
+                count *= 2
+                continue
+            
+            page_rows = self._fitting_rows(rows, availWidth, availHeight)
+            if not page_rows:
+                if self._deferred:
+                    raise LayoutError(
+                        f"Table row does not fit below the header in an empty frame of {availHeight:.0f} pt"
+                    )
+                # Not even one row fits below the header here: continue in the next frame
+                self._deferred = True
+                return [FrameBreak(), self]
+            self._deferred = False
+            for _ in range(page_rows):
+                self._buffer.popleft()
+            self._page_rows = page_rows + 1
+            return [self._table(rows[:page_rows]), FrameBreak(), self]
+    
+    def _fitting_rows(self, rows: List[Sequence[Any]], availWidth, availHeight) -> int:
+        """Most leading ``rows`` that fit below the header (the whole list does not)
+        
+        Pages usually hold as many rows as the previous one, so that count is
+        tried first; bisection only runs when it is off.
+        """
+        def fits(count: int) -> bool:
+            return count == 0 or self._table(rows[:count]).wrap(availWidth, availHeight)[1] <= availHeight
+        
+        low, high = 0, len(rows) - 1
+        guess = min(self._page_rows - 1, high)
+        if fits(guess):
+            if guess == high or not fits(guess + 1):
+                return guess
+            low = guess + 1
+        else:
+            high = guess - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(middle):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+
 class PrismReportGenerator:
     """Enterprise-grade PDF report generator"""
     
@@ -34,10 +301,11 @@ class PrismReportGenerator:
     GRAY_DARK = colors.HexColor('#1F2937')
     GRAY_LIGHT = colors.HexColor('#F3F4F6')
     
-    def __init__(self, output_filename: str):
-        self.output_filename = output_filename
+    def __init__(self, output: Union[str, BinaryIO]):
+        """``output`` is a file path or any writable binary stream (e.g. BytesIO)"""
+        self.output = output
         self.doc = SimpleDocTemplate(
-            output_filename,
+            output,
             pagesize=letter,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
@@ -45,9 +313,13 @@ class PrismReportGenerator:
             bottomMargin=0.75*inch
         )
         self.story = []
+        # Styles and static flowables are built once per process and shared by every report
         self.styles = self._create_styles()
+        self.table_styles = self._create_table_styles()
         
-    def _create_styles(self):
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _create_styles(cls):
         """Create custom paragraph styles"""
         styles = getSampleStyleSheet()
         
@@ -60,7 +332,7 @@ class PrismReportGenerator:
                 name='CustomTitle',
                 parent=styles['Heading1'],
                 fontSize=28,
-                textColor=self.PRIMARY_COLOR,
+                textColor=cls.PRIMARY_COLOR,
                 spaceAfter=6,
                 alignment=TA_LEFT,
                 fontName='Helvetica-Bold'
@@ -72,7 +344,7 @@ class PrismReportGenerator:
                 name='CustomSubtitle',
                 parent=styles['Normal'],
                 fontSize=12,
-                textColor=self.GRAY_DARK,
+                textColor=cls.GRAY_DARK,
                 spaceAfter=20,
                 alignment=TA_LEFT
             ))
@@ -83,12 +355,12 @@ class PrismReportGenerator:
                 name='SectionHeading',
                 parent=styles['Heading2'],
                 fontSize=16,
-                textColor=self.GRAY_DARK,
+                textColor=cls.GRAY_DARK,
                 spaceBefore=20,
                 spaceAfter=12,
                 fontName='Helvetica-Bold',
                 borderWidth=0,
-                borderColor=self.PRIMARY_COLOR,
+                borderColor=cls.PRIMARY_COLOR,
                 borderPadding=0,
                 leftIndent=0
             ))
@@ -99,7 +371,7 @@ class PrismReportGenerator:
                 name='BodyText',
                 parent=styles['Normal'],
                 fontSize=10,
-                textColor=self.GRAY_DARK,
+                textColor=cls.GRAY_DARK,
                 spaceAfter=12,
                 alignment=TA_JUSTIFY,
                 leading=14
@@ -111,7 +383,7 @@ class PrismReportGenerator:
                 name='BulletPoint',
                 parent=styles['Normal'],
                 fontSize=10,
-                textColor=self.GRAY_DARK,
+                textColor=cls.GRAY_DARK,
                 spaceAfter=8,
                 leftIndent=20,
                 bulletIndent=10,
@@ -124,7 +396,7 @@ class PrismReportGenerator:
                 name='RiskHigh',
                 parent=styles['Normal'],
                 fontSize=10,
-                textColor=self.DANGER_COLOR,
+                textColor=cls.DANGER_COLOR,
                 spaceAfter=8,
                 leftIndent=20,
                 fontName='Helvetica-Bold'
@@ -132,6 +404,100 @@ class PrismReportGenerator:
         
         return styles
     
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _create_table_styles(cls) -> Dict[str, TableStyle]:
+        """Create the table styles used by every report"""
+        table_styles = {
+            'metadata': TableStyle([
+                ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 10),
+                ('FONT', (1, 0), (1, -1), 'Helvetica', 10),
+                ('TEXTCOLOR', (0, 0), (-1, -1), cls.GRAY_DARK),
+                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ]),
+            'disclaimer': TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), cls.GRAY_LIGHT),
+                ('BOX', (0, 0), (-1, -1), 2, cls.PRIMARY_COLOR),
+                ('TOPPADDING', (0, 0), (-1, -1), 15),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+                ('LEFTPADDING', (0, 0), (-1, -1), 15),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+            ]),
+            'metrics': TableStyle([
+                # Header row
+                ('BACKGROUND', (0, 0), (-1, 0), cls.PRIMARY_COLOR),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                
+                # Data rows
+                ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+                ('TEXTCOLOR', (0, 1), (-1, -1), cls.GRAY_DARK),
+                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+                ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+                
+                # Styling
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, cls.GRAY_LIGHT]),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('TOPPADDING', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ]),
+            'actions': TableStyle([
+                # Header
+                ('BACKGROUND', (0, 0), (-1, 0), cls.PRIMARY_COLOR),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                
+                # Data
+                ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
+                ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+                ('ALIGN', (2, 1), (2, -1), 'CENTER'),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, cls.GRAY_LIGHT]),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ]),
+        }
+        
+        # Dense style for appendix listings that may run to thousands of rows
+        table_styles['appendix'] = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), cls.PRIMARY_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+            ('FONT', (0, 1), (-1, -1), 'Helvetica', 7.5),
+            ('TEXTCOLOR', (0, 1), (-1, -1), cls.GRAY_DARK),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, cls.GRAY_LIGHT]),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ])
+        
+        # One risk box style per level; unknown levels use the neutral color
+        for level, level_color in (('HIGH', cls.DANGER_COLOR), ('MEDIUM', cls.WARNING_COLOR),
+                                   ('LOW', cls.SUCCESS_COLOR), ('', cls.GRAY_DARK)):
+            table_styles[f'risk:{level}'] = TableStyle([
+                ('BACKGROUND', (0, 0), (0, 0), level_color),
+                ('TEXTCOLOR', (0, 0), (0, 0), colors.white),
+                ('BACKGROUND', (1, 0), (1, 0), cls.GRAY_LIGHT),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('TOPPADDING', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+                ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+                ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+            ])
+        
+        return table_styles
+    
+    def _disclaimer_paragraph(self) -> Paragraph:
+        """Cover-page disclaimer; a new Paragraph per report, as layout state lives on it"""
+        return Paragraph(DISCLAIMER_TEXT, self.styles['BodyText'])
+    
     def _add_header_footer(self, canvas_obj, doc):
         """Add header and footer to each page"""
         canvas_obj.saveState()
@@ -183,40 +549,16 @@ class PrismReportGenerator:
             metadata.append(['Period:', date_range])
         
         metadata_table = Table(metadata, colWidths=[2*inch, 4*inch])
-        metadata_table.setStyle(TableStyle([
-            ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 10),
-            ('FONT', (1, 0), (1, -1), 'Helvetica', 10),
-            ('TEXTCOLOR', (0, 0), (-1, -1), self.GRAY_DARK),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        metadata_table.setStyle(self.table_styles['metadata'])
         
         self.story.append(metadata_table)
         self.story.append(Spacer(1, 1*inch))
         
         # Disclaimer box
-        disclaimer_data = [[Paragraph(
-            "<b>CONFIDENTIAL INFORMATION</b><br/><br/>"
-            "This report contains confidential and proprietary information generated by "
-            "Prism Insights AI-powered analytics platform. The insights and recommendations "
-            "provided are based on real-time data analysis using AWS Bedrock AI technology. "
-            "This document is intended solely for internal business use and should not be "
-            "distributed without proper authorization.",
-            self.styles['BodyText']
-        )]]
+        disclaimer_data = [[self._disclaimer_paragraph()]]
         
         disclaimer_table = Table(disclaimer_data, colWidths=[6*inch])
-        disclaimer_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), self.GRAY_LIGHT),
-            ('BOX', (0, 0), (-1, -1), 2, self.PRIMARY_COLOR),
-            ('TOPPADDING', (0, 0), (-1, -1), 15),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-            ('LEFTPADDING', (0, 0), (-1, -1), 15),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-        ]))
+        disclaimer_table.setStyle(self.table_styles['disclaimer'])
         
         self.story.append(disclaimer_table)
         self.story.append(PageBreak())
@@ -247,25 +589,7 @@ class PrismReportGenerator:
                 ])
             
             metrics_table = Table(metrics_data, colWidths=[3*inch, 2*inch, 1.5*inch])
-            metrics_table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), self.PRIMARY_COLOR),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 10),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                
-                # Data rows
-                ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-                ('TEXTCOLOR', (0, 1), (-1, -1), self.GRAY_DARK),
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-                
-                # Styling
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.GRAY_LIGHT]),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('TOPPADDING', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ]))
+            metrics_table.setStyle(self.table_styles['metrics'])
             
             self.story.append(metrics_table)
         
@@ -273,66 +597,7 @@ class PrismReportGenerator:
     
     def add_chart(self, chart_data: Dict[str, Any], title: str):
         """Add a professional chart to the report"""
-        fig, ax = plt.subplots(figsize=(7, 4))
-        
-        chart_type = chart_data.get('type', 'bar')
-        data = chart_data.get('data', [])
-        
-        if chart_type == 'bar':
-            labels = [item.get('name', f'Item {i}') for i, item in enumerate(data[:10])]
-            values = [item.get('value', 0) for item in data[:10]]
-            
-            bars = ax.bar(labels, values, color='#3B82F6', alpha=0.8)
-            ax.set_ylabel('Value', fontsize=10, fontweight='bold')
-            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
-            
-            # Add value labels on bars
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{int(height):,}',
-                       ha='center', va='bottom', fontsize=8)
-            
-            plt.xticks(rotation=45, ha='right', fontsize=8)
-            
-        elif chart_type == 'line':
-            for series in data:
-                ax.plot(series.get('x', []), series.get('y', []), 
-                       marker='o', linewidth=2, label=series.get('name', 'Series'))
-            
-            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
-            ax.legend(fontsize=8)
-            ax.grid(True, alpha=0.3)
-            
-        elif chart_type == 'pie':
-            labels = [item.get('name', f'Item {i}') for i, item in enumerate(data[:6])]
-            values = [item.get('value', 0) for item in data[:6]]
-            
-            colors_list = ['#3B82F6', '#9333EA', '#10B981', '#F59E0B', '#EF4444', '#6366F1']
-            
-            wedges, texts, autotexts = ax.pie(values, labels=labels, autopct='%1.1f%%',
-                                               colors=colors_list, startangle=90)
-            
-            for text in texts:
-                text.set_fontsize(8)
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontsize(8)
-                autotext.set_fontweight('bold')
-            
-            ax.set_title(title, fontsize=12, fontweight='bold', pad=15)
-        
-        plt.tight_layout()
-        
-        # Save chart to bytes
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        # Add to story
-        img = Image(img_buffer, width=6.5*inch, height=3.7*inch)
-        self.story.append(img)
+        self.story.append(chart_renderer.flowable(chart_data, title))
         self.story.append(Spacer(1, 0.2*inch))
     
     def add_ai_insights(self, insights: Dict[str, Any]):
@@ -359,11 +624,7 @@ class PrismReportGenerator:
             
             for risk in insights['risks']:
                 level = risk.get('level', 'medium').upper()
-                level_color = {
-                    'HIGH': self.DANGER_COLOR,
-                    'MEDIUM': self.WARNING_COLOR,
-                    'LOW': self.SUCCESS_COLOR
-                }.get(level, self.GRAY_DARK)
+                risk_style = self.table_styles.get(f'risk:{level}', self.table_styles['risk:'])
                 
                 risk_data = [[
                     Paragraph(f"<b>{level} RISK</b>", self.styles['BodyText']),
@@ -373,17 +634,7 @@ class PrismReportGenerator:
                 ]]
                 
                 risk_table = Table(risk_data, colWidths=[1*inch, 5.5*inch])
-                risk_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (0, 0), level_color),
-                    ('TEXTCOLOR', (0, 0), (0, 0), colors.white),
-                    ('BACKGROUND', (1, 0), (1, 0), self.GRAY_LIGHT),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('TOPPADDING', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                    ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-                ]))
+                risk_table.setStyle(risk_style)
                 
                 self.story.append(risk_table)
                 self.story.append(Spacer(1, 0.15*inch))
@@ -416,135 +667,165 @@ class PrismReportGenerator:
             action_data.append([priority, action, timeline])
         
         action_table = Table(action_data, colWidths=[1*inch, 4.5*inch, 1*inch])
-        action_table.setStyle(TableStyle([
-            # Header
-            ('BACKGROUND', (0, 0), (-1, 0), self.PRIMARY_COLOR),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            
-            # Data
-            ('FONT', (0, 1), (-1, -1), 'Helvetica', 9),
-            ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-            ('ALIGN', (2, 1), (2, -1), 'CENTER'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.GRAY_LIGHT]),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        action_table.setStyle(self.table_styles['actions'])
         
         self.story.append(action_table)
     
+    def add_appendix(self, title: str, header: Sequence[str], rows: Iterable[Sequence[Any]],
+                     col_widths: Sequence[float]):
+        """Add a full listing that streams its rows from an iterator, page by page"""
+        self.story.append(PageBreak())
+        self.story.append(Paragraph(title, self.styles['SectionHeading']))
+        self.story.append(Spacer(1, 0.1*inch))
+        self.story.append(StreamingTable(header, rows, col_widths, self.table_styles['appendix']))
+    
     def generate(self):
         """Generate the final PDF"""
         self.doc.build(self.story, onFirstPage=self._add_header_footer, 
                       onLaterPages=self._add_header_footer)
-        print(f"Report generated successfully: {self.output_filename}")
+        target = self.output if isinstance(self.output, str) else type(self.output).__name__
+        print(f"Report generated successfully: {target}")
 
 
-def generate_client_profitability_report(data: Dict[str, Any], output_file: str):
-    """Generate Client Profitability Intelligence Report"""
-    report = PrismReportGenerator(output_file)
-    
-    # Cover page
-    report.add_cover_page(
-        "Client Profitability Intelligence Report",
-        "Financial Analysis & Optimization",
-        data.get('dateRange', 'Current Period')
-    )
+class ReportTemplate:
+    """Declarative description of one report type: its titles and section order"""
     
-    # Executive summary
-    report.add_executive_summary(
-        data.get('summary', 'Comprehensive analysis of client profitability metrics...'),
-        data.get('metrics', [])
-    )
+    def __init__(self, title: str, subtitle: str, default_summary: str, sections: Tuple[str, ...] = None):
+        self.title = title
+        self.subtitle = subtitle
+        self.default_summary = default_summary
+        self.sections = sections or DEFAULT_SECTIONS
+        unknown = [name for name in self.sections if name not in SECTION_BUILDERS]
+        if unknown:
+            raise ValueError(f"Unknown report sections: {unknown}")
     
-    # Charts
+    def build(self, data: Dict[str, Any], output: Union[str, BinaryIO], timings: Optional[Dict[str, float]] = None):
+        """Lay out every section of the template into ``output``
+
+        When ``timings`` is given, the seconds spent in each section and in the
+        final page layout ('layout') are added to it.
+        """
+        timings = {} if timings is None else timings
+        report = PrismReportGenerator(output)
+        for name in self.sections:
+            start = time.perf_counter()
+            SECTION_BUILDERS[name](report, self, data)
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        start = time.perf_counter()
+        report.generate()
+        timings['layout'] = timings.get('layout', 0.0) + time.perf_counter() - start
+        return output
+
+
+def _cover_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
+    report.add_cover_page(data.get('title', template.title), template.subtitle, data.get('dateRange', 'Current Period'))
+
+def _summary_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
+    report.add_executive_summary(data.get('summary', template.default_summary), data.get('metrics', []))
+
+def _charts_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
     for chart in data.get('charts', []):
         report.add_chart(chart, chart.get('title', 'Chart'))
-    
-    # AI insights
+
+def _insights_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
     report.add_ai_insights(data.get('insights', {}))
-    
-    # Recommendations
-    report.add_recommendations(
-        data.get('insights', {}).get('recommendations', []),
-        data.get('insights', {}).get('nextActions', [])
+
+def _recommendations_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
+    insights = data.get('insights', {})
+    report.add_recommendations(insights.get('recommendations', []), insights.get('nextActions', []))
+
+
+# Appendix cell formats; text is clipped to the column width
+APPENDIX_FORMATS = {
+    'text': str,
+    'int': lambda value: f"{value:,}",
+    'money': lambda value: f"${value:,.2f}",
+    'percent': lambda value: f"{value:.1f}%",
+}
+
+def _appendix_rows(rows: Iterable[Dict[str, Any]], columns: Sequence[Dict[str, Any]]):
+    formats = [APPENDIX_FORMATS[column.get('format', 'text')] for column in columns]
+    # About 4 points per character at the appendix font size
+    limits = [max(4, int(column['width'] * inch / 4)) for column in columns]
+    fields = [column['field'] for column in columns]
+    for row in rows:
+        cells = []
+        for field, fmt, limit in zip(fields, formats, limits):
+            text = fmt(row.get(field, ''))
+            cells.append(text if len(text) <= limit else text[:limit - 1] + '…')
+        yield cells
+
+def _appendix_section(report: PrismReportGenerator, template: ReportTemplate, data: Dict[str, Any]):
+    appendix = data.get('appendix')
+    if not appendix:
+        return
+    columns = appendix['columns']
+    rows = appendix['rows']
+    if hasattr(rows, 'iter_rows'):
+        # A columnar table: decode it a chunk at a time
+        rows = rows.iter_rows()
+    report.add_appendix(
+        appendix.get('title', 'Appendix'),
+        [column['label'] for column in columns],
+        _appendix_rows(rows, columns),
+        [column['width'] * inch for column in columns]
     )
-    
-    # Generate
-    report.generate()
-    return output_file
 
 
-def generate_software_license_report(data: Dict[str, Any], output_file: str):
-    """Generate Software License Intelligence Report"""
-    report = PrismReportGenerator(output_file)
-    
-    # Cover page
-    report.add_cover_page(
+# Section name -> builder(report, template, data)
+SECTION_BUILDERS = {
+    'cover': _cover_section,
+    'summary': _summary_section,
+    'charts': _charts_section,
+    'insights': _insights_section,
+    'recommendations': _recommendations_section,
+    'appendix': _appendix_section,
+}
+
+DEFAULT_SECTIONS = ('cover', 'summary', 'charts', 'insights', 'recommendations', 'appendix')
+
+# Report page type -> template
+REPORT_TEMPLATES = {
+    'client-profitability': ReportTemplate(
+        "Client Profitability Intelligence Report",
+        "Financial Analysis & Optimization",
+        'Comprehensive analysis of client profitability metrics...'
+    ),
+    'software-license': ReportTemplate(
         "Software License Intelligence Report",
         "License Optimization & Cost Management",
-        data.get('dateRange', 'Current Period')
-    )
-    
-    # Executive summary
-    report.add_executive_summary(
-        data.get('summary', 'Comprehensive analysis of software license utilization and optimization opportunities...'),
-        data.get('metrics', [])
-    )
-    
-    # Charts
-    for chart in data.get('charts', []):
-        report.add_chart(chart, chart.get('title', 'Chart'))
-    
-    # AI insights
-    report.add_ai_insights(data.get('insights', {}))
-    
-    # Recommendations
-    report.add_recommendations(
-        data.get('insights', {}).get('recommendations', []),
-        data.get('insights', {}).get('nextActions', [])
-    )
-    
-    # Generate
-    report.generate()
-    return output_file
+        'Comprehensive analysis of software license utilization and optimization opportunities...'
+    ),
+    'sales-pipeline': ReportTemplate(
+        "Sales Pipeline Optimization Report",
+        "Revenue Forecasting & Conversion Analysis",
+        'Comprehensive analysis of sales pipeline performance and conversion opportunities...'
+    ),
+}
+
+
+def build_report(report_type: str, data: Dict[str, Any], output: Union[str, BinaryIO],
+                 timings: Optional[Dict[str, float]] = None):
+    """Generate the report for a page type from its template"""
+    template = REPORT_TEMPLATES.get(report_type)
+    if template is None:
+        raise ValueError(f"Unknown report type: {report_type}")
+    return template.build(data, output, timings)
+
+
+def generate_client_profitability_report(data: Dict[str, Any], output: Union[str, BinaryIO]):
+    """Generate Client Profitability Intelligence Report"""
+    return build_report('client-profitability', data, output)
+
+
+def generate_software_license_report(data: Dict[str, Any], output: Union[str, BinaryIO]):
+    """Generate Software License Intelligence Report"""
+    return build_report('software-license', data, output)
 
 
-def generate_sales_pipeline_report(data: Dict[str, Any], output_file: str):
+def generate_sales_pipeline_report(data: Dict[str, Any], output: Union[str, BinaryIO]):
     """Generate Sales Pipeline Optimization Report"""
-    report = PrismReportGenerator(output_file)
-    
-    # Cover page
-    report.add_cover_page(
-        "Sales Pipeline Optimization Report",
-        "Revenue Forecasting & Conversion Analysis",
-        data.get('dateRange', 'Current Period')
-    )
-    
-    # Executive summary
-    report.add_executive_summary(
-        data.get('summary', 'Comprehensive analysis of sales pipeline performance and conversion opportunities...'),
-        data.get('metrics', [])
-    )
-    
-    # Charts
-    for chart in data.get('charts', []):
-        report.add_chart(chart, chart.get('title', 'Chart'))
-    
-    # AI insights
-    report.add_ai_insights(data.get('insights', {}))
-    
-    # Recommendations
-    report.add_recommendations(
-        data.get('insights', {}).get('recommendations', []),
-        data.get('insights', {}).get('nextActions', [])
-    )
-    
-    # Generate
-    report.generate()
-    return output_file
+    return build_report('sales-pipeline', data, output)
 
 
 if __name__ == "__main__":
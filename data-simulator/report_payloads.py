@@ -0,0 +1,411 @@
+"""
+Report payload assembly and rendering.
+
+Turns one collection from a store snapshot, in its columnar form, into the
+payload consumed by ``report_generator`` and renders it. Figures come from
+``analytics``. Kept free of application state so it can run in a worker
+process.
+"""
+
+import io
+import time
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from analytics import client_metrics, lead_metrics, license_metrics, numeric
+from columnar import ColumnarTable
+from report_generator import (
+    build_report,
+    generate_client_profitability_report,
+    generate_software_license_report,
+    generate_sales_pipeline_report
+)
+
+def _trend_lookup(trends: Optional[Dict[str, float]]):
+    """Percent change of a figure over the report's trend window; 0 without history"""
+    trends = trends or {}
+    return lambda name: trends.get(name, 0.0)
+
+def _software_license_payload(licenses: ColumnarTable, report_data: dict, trends: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Build the software license report payload"""
+    metrics = license_metrics(licenses)
+    trend = _trend_lookup(trends)
+    total_licenses = metrics['count']
+    total_cost = metrics['totalCost']
+    avg_utilization = metrics['avgUtilization']
+    underutilized = metrics['underutilized']
+    unused_seats = metrics['unusedSeats']
+    potential_savings = metrics['potentialSavings']
+    top_licenses = metrics['topByCost']
+    
+    return {
+        'dateRange': datetime.now().strftime('%B %Y'),
+        'appendix': _appendix_payload('licenses', licenses, report_data),
+        'summary': report_data.get('summary',
+            f"Analysis of {total_licenses} software licenses reveals significant optimization opportunities. "
+            f"Current average utilization rate of {avg_utilization:.1f}% with {underutilized} underutilized licenses "
+            f"and {unused_seats:,} unassigned seats indicates potential monthly savings of ${potential_savings:,.0f}. Strategic license management and right-sizing "
+            f"initiatives can substantially reduce software spend while maintaining operational efficiency."),
+        'metrics': [
+            {'label': 'Total Software Licenses', 'value': str(total_licenses), 'trend': trend('count')},
+            {'label': 'Total Monthly Cost', 'value': f'${total_cost:,.0f}', 'trend': trend('totalCost')},
+            {'label': 'Average Utilization Rate', 'value': f'{avg_utilization:.1f}%', 'trend': trend('avgUtilization')},
+            {'label': 'Underutilized Licenses', 'value': str(underutilized), 'trend': trend('underutilized')},
+            {'label': 'Potential Monthly Savings', 'value': f'${potential_savings:,.0f}', 'trend': trend('potentialSavings')},
+            {'label': 'Compliance Score', 'value': '94%', 'trend': 0},
+        ],
+        'charts': [
+            {
+                'type': 'bar',
+                'title': 'Top 10 Licenses by Monthly Cost',
+                'data': [{'name': l['name'][:20], 'value': l['value']} for l in top_licenses]
+            },
+            {
+                'type': 'bar',
+                'title': 'License Utilization Rates',
+                'data': [{'name': l['name'][:20], 'value': l['utilization']} for l in top_licenses]
+            },
+            {
+                'type': 'pie',
+                'title': 'License Distribution by Vendor',
+                'data': metrics['byVendor'][:6]
+            }
+        ],
+        'insights': report_data.get('insights', {
+            'keyFindings': [
+                f"Portfolio consists of {total_licenses} software licenses across {metrics['vendorCount']} vendors",
+                f"Average utilization rate of {avg_utilization:.1f}% indicates room for optimization",
+                f"{underutilized} licenses identified as underutilized (< 50% usage)",
+                f"Potential monthly savings of ${potential_savings:,.0f} by reclaiming {unused_seats:,} unassigned seats",
+                "Significant cost variation across vendors presents negotiation opportunities"
+            ],
+            'risks': [
+                {
+                    'level': 'high',
+                    'description': f'{unused_seats:,} unassigned seats wasting ${potential_savings:,.0f} monthly in unnecessary costs',
+                    'recommendation': 'Immediately audit license usage and reclaim unused seats. Implement automated usage monitoring to prevent future waste.'
+                },
+                {
+                    'level': 'medium',
+                    'description': 'License renewals approaching without utilization review',
+                    'recommendation': 'Establish 90-day pre-renewal review process. Analyze usage trends and right-size license counts before renewal.'
+                },
+                {
+                    'level': 'low',
+                    'description': 'Potential compliance risks from untracked license deployments',
+                    'recommendation': 'Implement centralized license management system. Conduct quarterly compliance audits to ensure proper licensing.'
+                }
+            ],
+            'recommendations': [
+                'Implement automated license usage monitoring and alerting system',
+                'Reclaim unused licenses quarterly to optimize costs',
+                'Negotiate volume discounts with top 3 vendors representing 60% of spend',
+                'Consolidate similar tools to reduce vendor count and complexity',
+                'Establish license approval workflow to prevent unnecessary purchases',
+                'Create license optimization playbook with clear reclamation procedures',
+                'Implement chargeback model to increase departmental accountability',
+                'Evaluate alternative vendors for underperforming or overpriced licenses'
+            ],
+            'nextActions': [
+                'Audit all licenses with utilization below 50% within next 7 days',
+                'Contact vendors to reclaim unused seats and adjust license counts',
+                'Schedule vendor negotiation meetings for top 3 software providers',
+                'Implement automated usage tracking for all critical applications',
+                'Create license optimization dashboard for ongoing monitoring',
+                'Develop license request and approval workflow',
+                'Conduct user training on license compliance and best practices',
+                'Establish quarterly license review meetings with department heads'
+            ]
+        })
+    }
+
+def _sales_pipeline_payload(leads: ColumnarTable, report_data: dict, trends: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Build the sales pipeline report payload"""
+    metrics = lead_metrics(leads)
+    trend = _trend_lookup(trends)
+    total_leads = metrics['count']
+    total_value = metrics['totalValue']
+    avg_deal_size = metrics['avgDealSize']
+    closed_won = metrics['closedWon']
+    conversion_rate = metrics['conversionRate']
+    
+    return {
+        'dateRange': datetime.now().strftime('%B %Y'),
+        'appendix': _appendix_payload('leads', leads, report_data),
+        'summary': report_data.get('summary',
+            f"Analysis of {total_leads} leads in the sales pipeline reveals a total potential value of ${total_value:,.0f}. "
+            f"Current conversion rate of {conversion_rate:.1f}% with average deal size of ${avg_deal_size:,.0f} indicates "
+            f"strong pipeline health. Strategic focus on qualification and proposal stages can accelerate deal velocity "
+            f"and improve overall conversion rates."),
+        'metrics': [
+            {'label': 'Total Pipeline Value', 'value': f'${total_value:,.0f}', 'trend': trend('totalValue')},
+            {'label': 'Total Active Leads', 'value': str(total_leads), 'trend': trend('count')},
+            {'label': 'Average Deal Size', 'value': f'${avg_deal_size:,.0f}', 'trend': trend('avgDealSize')},
+            {'label': 'Conversion Rate', 'value': f'{conversion_rate:.1f}%', 'trend': trend('conversionRate')},
+            {'label': 'Closed Won', 'value': str(closed_won), 'trend': trend('closedWon')},
+            {'label': 'Win Rate', 'value': f'{conversion_rate:.1f}%', 'trend': trend('conversionRate')},
+        ],
+        'charts': [
+            {
+                'type': 'bar',
+                'title': 'Pipeline Distribution by Stage',
+                'data': metrics['byStage']
+            },
+            {
+                'type': 'bar',
+                'title': 'Top 10 Opportunities by Value',
+                'data': [{'name': l['name'][:20], 'value': l['value']} for l in metrics['topByValue']]
+            },
+            {
+                'type': 'pie',
+                'title': 'Lead Distribution by Source',
+                'data': metrics['bySource'][:6]
+            }
+        ],
+        'insights': report_data.get('insights', {
+            'keyFindings': [
+                f"Pipeline contains {total_leads} active opportunities worth ${total_value:,.0f}",
+                f"Current conversion rate of {conversion_rate:.1f}% aligns with industry benchmarks",
+                f"Average deal size of ${avg_deal_size:,.0f} indicates healthy opportunity quality",
+                f"{closed_won} deals closed won this period, representing strong sales execution",
+                "Lead source analysis reveals opportunities for channel optimization"
+            ],
+            'risks': [
+                {
+                    'level': 'medium',
+                    'description': 'Leads stalling in qualification and proposal stages',
+                    'recommendation': 'Implement lead scoring system and automated nurture campaigns. Provide sales team with objection handling training.'
+                },
+                {
+                    'level': 'medium',
+                    'description': 'Extended sales cycles impacting revenue predictability',
+                    'recommendation': 'Analyze deal velocity by stage. Identify and remove bottlenecks in sales process. Consider sales enablement tools.'
+                },
+                {
+                    'level': 'low',
+                    'description': 'Seasonal pipeline fluctuations affecting forecasting accuracy',
+                    'recommendation': 'Develop seasonal pipeline models. Adjust resource allocation and marketing spend based on historical patterns.'
+                }
+            ],
+            'recommendations': [
+                'Implement AI-powered lead scoring to prioritize high-probability opportunities',
+                'Develop stage-specific sales playbooks to accelerate deal progression',
+                'Establish automated follow-up sequences for each pipeline stage',
+                'Create competitive battle cards to improve win rates',
+                'Implement sales enablement platform for content management',
+                'Develop ROI calculator tools to strengthen value propositions',
+                'Establish weekly pipeline review cadence with sales leadership',
+                'Invest in sales training focused on consultative selling techniques'
+            ],
+            'nextActions': [
+                'Review all opportunities stalled over 30 days in qualification stage',
+                'Schedule proposal review sessions for deals in negotiation',
+                'Implement lead scoring system within next 14 days',
+                'Create sales playbook for top 3 use cases',
+                'Develop automated email sequences for each pipeline stage',
+                'Conduct win/loss analysis on last 20 closed opportunities',
+                'Schedule sales training on objection handling techniques',
+                'Establish monthly pipeline health review with executive team'
+            ]
+        })
+    }
+
+def _client_profitability_payload(clients: ColumnarTable, report_data: dict, trends: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Build the client profitability report payload"""
+    metrics = client_metrics(clients)
+    trend = _trend_lookup(trends)
+    client_count = metrics['count']
+    total_revenue = metrics['totalRevenue']
+    total_costs = metrics['totalCosts']
+    avg_margin = metrics['avgMargin']
+    at_risk = metrics['atRisk']
+    top_clients = metrics['topByRevenue']
+    
+    return {
+        'dateRange': datetime.now().strftime('%B %Y'),
+        'appendix': _appendix_payload('clients', clients, report_data),
+        'summary': report_data.get('summary', 
+            f"Comprehensive analysis of {client_count} active clients reveals strong overall performance "
+            f"with an average profit margin of {avg_margin:.1f}%. Strategic opportunities identified for "
+            f"margin optimization and risk mitigation across the client portfolio."),
+        'metrics': [
+            {'label': 'Total Monthly Recurring Revenue', 'value': f'${total_revenue:,.0f}', 'trend': trend('totalRevenue')},
+            {'label': 'Average Profit Margin', 'value': f'{avg_margin:.1f}%', 'trend': trend('avgMargin')},
+            {'label': 'Active Clients', 'value': str(client_count), 'trend': trend('count')},
+            {'label': 'At-Risk Clients', 'value': str(at_risk), 'trend': trend('atRisk')},
+            {'label': 'Total Monthly Costs', 'value': f'${total_costs:,.0f}', 'trend': trend('totalCosts')},
+            {'label': 'Net Monthly Profit', 'value': f'${(total_revenue - total_costs):,.0f}', 'trend': trend('netProfit')},
+        ],
+        'charts': [
+            {
+                'type': 'bar',
+                'title': 'Top 10 Clients by Monthly Recurring Revenue',
+                'data': [{'name': c['name'], 'value': c['value']} for c in top_clients]
+            },
+            {
+                'type': 'pie',
+                'title': 'Client Distribution by Industry',
+                'data': metrics['byIndustry']
+            },
+            {
+                'type': 'bar',
+                'title': 'Client Profitability Analysis',
+                'data': [{'name': c['name'][:15], 'value': c['monthlyProfit']} for c in top_clients]
+            }
+        ],
+        'insights': report_data.get('insights', {
+            'keyFindings': [
+                f"Portfolio consists of {client_count} active clients across {metrics['industryCount']} industries",
+                f"Top 20% of clients generate approximately {metrics['top20RevenueShare']:.1f}% of total revenue",
+                f"Average profit margin of {avg_margin:.1f}% indicates healthy business performance",
+                f"{at_risk} clients identified as at-risk, requiring immediate attention and intervention",
+                "Significant variation in profitability across client segments presents optimization opportunities"
+            ],
+            'risks': [
+                {
+                    'level': 'high',
+                    'description': f'{at_risk} clients showing declining margins or at-risk status requiring immediate intervention',
+                    'recommendation': 'Conduct comprehensive profitability reviews with at-risk clients within 7 days. Analyze service delivery costs, adjust pricing structures, and implement performance improvement plans.'
+                },
+                {
+                    'level': 'medium',
+                    'description': 'Contract renewal dates approaching for key accounts within next 90 days',
+                    'recommendation': 'Initiate proactive renewal discussions 90 days in advance. Prepare value demonstration materials and competitive analysis to support pricing negotiations.'
+                },
+                {
+                    'level': 'low',
+                    'description': 'Market conditions and competitive pressures may impact client retention rates',
+                    'recommendation': 'Implement quarterly business reviews with top 20% clients. Strengthen relationships through strategic account management and value-added services.'
+                }
+            ],
+            'recommendations': [
+                'Implement tiered service delivery model to optimize resource allocation and improve margins across all client segments',
+                'Develop targeted upsell and cross-sell strategies for high-margin accounts with expansion potential',
+                'Establish automated profitability monitoring dashboard with real-time alerts for margin degradation',
+                'Create standardized service packages with clear pricing tiers to improve predictability and scalability',
+                'Invest in client success programs to reduce churn risk and increase lifetime value',
+                'Conduct comprehensive cost analysis to identify efficiency opportunities in service delivery',
+                'Implement value-based pricing strategies for premium services and specialized expertise',
+                'Develop client segmentation framework to prioritize resources on highest-value relationships'
+            ],
+            'nextActions': [
+                'Schedule profitability review meetings with all at-risk clients within next 7 days',
+                'Analyze service delivery costs and resource allocation for bottom 20% of clients by profitability',
+                'Prepare pricing adjustment proposals for clients with margins below 20% threshold',
+                'Develop client retention playbook with specific interventions for different risk levels',
+                'Create executive dashboard for real-time profitability monitoring and trend analysis',
+                'Initiate contract renewal discussions for clients with agreements expiring within 90 days',
+                'Conduct competitive analysis to ensure pricing remains market-competitive while maintaining margins',
+                'Implement quarterly business reviews with top 10 clients to strengthen strategic partnerships'
+            ]
+        })
+    }
+
+# Collection -> (appendix title, sort field, columns); widths in inches, 7 in total
+APPENDIX_COLUMNS: Dict[str, tuple] = {
+    'licenses': ('Appendix: All Software Licenses', 'totalCost', [
+        {'label': 'Vendor', 'field': 'vendor', 'width': 1.2},
+        {'label': 'Product', 'field': 'product', 'width': 1.5},
+        {'label': 'Type', 'field': 'licenseType', 'width': 0.8},
+        {'label': 'Seats', 'field': 'totalLicenses', 'format': 'int', 'width': 0.6},
+        {'label': 'Used', 'field': 'usedLicenses', 'format': 'int', 'width': 0.6},
+        {'label': 'Utilization', 'field': 'utilizationRate', 'format': 'percent', 'width': 0.7},
+        {'label': 'Total Cost', 'field': 'totalCost', 'format': 'money', 'width': 1.0},
+        {'label': 'Renewal', 'field': 'renewalDate', 'width': 0.6},
+    ]),
+    'leads': ('Appendix: All Pipeline Leads', 'value', [
+        {'label': 'Company', 'field': 'companyName', 'width': 1.7},
+        {'label': 'Contact', 'field': 'contactName', 'width': 1.2},
+        {'label': 'Stage', 'field': 'stage', 'width': 1.0},
+        {'label': 'Value', 'field': 'value', 'format': 'money', 'width': 1.0},
+        {'label': 'Prob. %', 'field': 'probability', 'format': 'int', 'width': 0.5},
+        {'label': 'Source', 'field': 'source', 'width': 0.9},
+        {'label': 'Close Date', 'field': 'expectedCloseDate', 'width': 0.7},
+    ]),
+    'clients': ('Appendix: All Clients', 'monthlyRecurring', [
+        {'label': 'Client', 'field': 'name', 'width': 1.9},
+        {'label': 'Industry', 'field': 'industry', 'width': 1.0},
+        {'label': 'Status', 'field': 'status', 'width': 0.8},
+        {'label': 'Contract', 'field': 'contractType', 'width': 0.5},
+        {'label': 'MRR', 'field': 'monthlyRecurring', 'format': 'money', 'width': 1.0},
+        {'label': 'Annual Revenue', 'field': 'annualRevenue', 'format': 'money', 'width': 1.2},
+        {'label': 'Churn Risk', 'field': 'churnRisk', 'width': 0.6},
+    ]),
+}
+
+def _appendix_payload(collection: str, table: ColumnarTable, report_data: dict) -> Optional[Dict[str, Any]]:
+    """Full listing of the collection, only when the request asks for it with ``includeAppendix``"""
+    if not report_data.get('includeAppendix'):
+        return None
+    title, sort_field, columns = APPENDIX_COLUMNS[collection]
+    return {
+        'title': title,
+        'columns': columns,
+        # Rows are decoded lazily, a page at a time, by the report's streaming table
+        'rows': table.take(np.argsort(-numeric(table, sort_field), kind='stable'))
+    }
+
+# Report type -> (source collection, payload builder, renderer)
+REPORT_TYPES: Dict[str, tuple] = {
+    'client-profitability': ('clients', _client_profitability_payload, generate_client_profitability_report),
+    'software-license': ('licenses', _software_license_payload, generate_software_license_report),
+    'sales-pipeline': ('leads', _sales_pipeline_payload, generate_sales_pipeline_report),
+}
+
+def report_collection(report_type: str) -> str:
+    """Name of the store collection a report type is built from"""
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Unknown report type: {report_type}")
+    return REPORT_TYPES[report_type][0]
+
+def build_report_payload(
+    report_type: str, table: ColumnarTable, report_data: dict, trends: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Build the report payload from the columnar table of the report's collection
+
+    ``trends`` maps the collection's aggregate figures (see ``timeseries``)
+    to their percent change over the trend window.
+    """
+    report_collection(report_type)
+    _, build_payload, _ = REPORT_TYPES[report_type]
+    return build_payload(table, report_data, trends)
+
+def render_report(
+    report_type: str,
+    table: ColumnarTable,
+    report_data: dict,
+    output: Union[str, BinaryIO],
+    trends: Optional[Dict[str, float]] = None
+):
+    """Build the payload and render the PDF to a path or binary stream"""
+    payload = build_report_payload(report_type, table, report_data, trends)
+    _, _, render = REPORT_TYPES[report_type]
+    return render(payload, output)
+
+def render_payload_bytes(report_type: str, payload: Dict[str, Any]) -> bytes:
+    """Render an already built payload in memory; safe to run in a worker process"""
+    return render_payload_timed(report_type, payload)[0]
+
+def render_payload_timed(report_type: str, payload: Dict[str, Any]) -> Tuple[bytes, Dict[str, float]]:
+    """Render a payload in memory and report seconds spent on charts and on layout"""
+    sections: Dict[str, float] = {}
+    buffer = io.BytesIO()
+    build_report(report_type, payload, buffer, sections)
+    charts = sections.get('charts', 0.0)
+    return buffer.getvalue(), {'charts': charts, 'layout': sum(sections.values()) - charts}
+
+def render_report_timed(
+    report_type: str, table: ColumnarTable, report_data: dict, trends: Optional[Dict[str, float]] = None
+) -> Tuple[bytes, Dict[str, float]]:
+    """Build and render a report, timing each stage (metrics, charts, layout)
+
+    Runs in pool workers, whose metrics are not scraped, so the timings
+    travel back with the PDF for the serving process to record.
+    """
+    start = time.perf_counter()
+    payload = build_report_payload(report_type, table, report_data, trends)
+    metrics_seconds = time.perf_counter() - start
+    content, timings = render_payload_timed(report_type, payload)
+    return content, {'metrics': metrics_seconds, **timings}
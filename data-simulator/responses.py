@@ -0,0 +1,306 @@
+"""
+Fast responses for store collections: JSON, msgpack and Arrow IPC.
+
+Collections in the store are immutable and were validated when they were
+built, so the ``response_model`` round trip FastAPI does for every request
+(validate each item again, convert it to plain data, then encode it) is pure
+overhead. ``CollectionEncoder`` writes a collection straight to JSON bytes:
+
+- collections held as frozen models go through pydantic-core's serializer
+  (``TypeAdapter.dump_json``), which emits bytes without validating;
+- collections mapped from the owner's shared state (reader workers) are
+  decoded from their columns and encoded with orjson, so no model objects
+  are built at all.
+
+Encoded bodies, and their gzip or brotli variants, are cached per
+collection. Unchanged collections keep the same tuple (or table) across
+store versions, so a collection is only encoded and compressed again after
+a tick actually changed it.
+
+Clients pick the format with ``Accept`` or ``?format=``. ``ndjson`` is
+streamed one chunk of rows at a time from the snapshot taken when the
+request arrived, compressed on the fly, so neither memory nor the time to
+the first byte grows with the collection. msgpack (optional ``msgpack``
+package) is cached like JSON. Arrow IPC (optional ``pyarrow``) is streamed
+record batch by record batch straight from the columnar buffers, see
+``arrow_interop``, and is not cached: it is cheap to produce and would
+double the memory held for large collections.
+"""
+
+import asyncio
+import gzip
+import importlib.util
+import threading
+import zlib
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+
+from lazy_imports import LazyModule
+from models import COLLECTION_MODELS
+from store import Snapshot
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional; no msgpack responses without it
+    msgpack = None
+
+# pyarrow takes a while to import; loaded on the first Arrow request
+arrow = LazyModule("arrow_interop", "Arrow")
+
+
+GZIP = "gzip"
+BROTLI = "br"
+IDENTITY = "identity"
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/x-msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Collections longer than this are encoded on a worker thread, off the event loop
+OFFLOAD_ROWS = 5000
+
+# Preferred first when a client accepts several with the same quality
+SUPPORTED_ENCODINGS = (BROTLI, GZIP) if brotli is not None else (GZIP,)
+MEDIA_TYPES = tuple(
+    media_type for media_type, available in (
+        (JSON, True),
+        (NDJSON, True),
+        (ARROW_STREAM, importlib.util.find_spec("pyarrow") is not None),
+        (MSGPACK, msgpack is not None),
+    ) if available
+)
+# ?format= values; they take precedence over Accept
+FORMATS = {"json": JSON, "ndjson": NDJSON, "arrow": ARROW_STREAM, "msgpack": MSGPACK}
+
+# OpenAPI description of the alternative formats, for the collection routes
+ALTERNATE_FORMATS = {
+    200: {"content": {
+        NDJSON: {"schema": {"type": "string"}},
+        ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+    }}
+}
+
+
+def _qualities(header: str) -> Dict[str, float]:
+    """Values of a comma separated header with their ``q`` weights"""
+    qualities: Dict[str, float] = {}
+    for part in header.split(","):
+        value, _, params = part.strip().partition(";")
+        value = value.strip().lower()
+        if not value:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, weight = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(weight)
+                except ValueError:
+                    quality = 0.0
+        qualities[value] = quality
+    return qualities
+
+
+def _best(offered: Sequence[str], quality_of) -> Optional[str]:
+    best, best_quality = None, 0.0
+    for value in offered:
+        quality = quality_of(value)
+        if quality > best_quality:
+            best, best_quality = value, quality
+    return best
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick the best supported content coding for an ``Accept-Encoding`` header"""
+    if not accept_encoding:
+        return IDENTITY
+    qualities = _qualities(accept_encoding)
+    best = _best(SUPPORTED_ENCODINGS, lambda coding: qualities.get(coding, qualities.get("*", 0.0)))
+    return best or IDENTITY
+
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """Pick the best available format for an ``Accept`` header; None if none is acceptable"""
+    if not accept:
+        return JSON
+    qualities = _qualities(accept)
+
+    def quality_of(media_type: str) -> float:
+        family = media_type.split("/")[0] + "/*"
+        return qualities.get(media_type, qualities.get(family, qualities.get("*/*", 0.0)))
+
+    return _best(MEDIA_TYPES, quality_of)
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == GZIP:
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=brotli_quality)
+    return body
+
+
+def stream_compressor(encoding: str, gzip_level: int = 6, brotli_quality: int = 5):
+    """Incremental compressor as a (compress chunk, finish) pair; chunks are flushed so each can be sent at once"""
+    if encoding == GZIP:
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        return (
+            lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush
+        )
+    compressor = brotli.Compressor(quality=brotli_quality)
+    return (lambda chunk: compressor.process(chunk) + compressor.flush(), compressor.finish)
+
+
+def encode_rows(table) -> bytes:
+    """JSON array of a columnar table's rows, encoded with orjson"""
+    return orjson.dumps(list(table.iter_rows()))
+
+
+def encode_msgpack(source) -> bytes:
+    """msgpack array of maps, from a tuple of models or a columnar table"""
+    if isinstance(source, tuple):
+        return msgpack.packb([item.model_dump() for item in source])
+    return msgpack.packb(list(source.iter_rows()))
+
+
+class CollectionEncoder:
+    """Encodes snapshot collections to (optionally compressed) JSON, cached per collection"""
+
+    def __init__(
+        self,
+        min_compress_bytes: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        arrow_batch_rows: int = 65536,
+        ndjson_chunk_rows: int = 1000
+    ):
+        self.min_compress_bytes = min_compress_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.arrow_batch_rows = arrow_batch_rows
+        self.ndjson_chunk_rows = ndjson_chunk_rows
+        self._adapters = {name: TypeAdapter(Tuple[model, ...]) for name, model in COLLECTION_MODELS.items()}
+        self._item_adapters = {name: TypeAdapter(model) for name, model in COLLECTION_MODELS.items()}
+        # name -> (source the bodies were encoded from, {(media type, encoding): body})
+        self._cache: Dict[str, Tuple[Any, Dict[Tuple[str, str], bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def _source(self, snapshot: Snapshot, name: str) -> Any:
+        # The cache entry holds a reference to its source, so an identity match
+        # cannot come from a reused id
+        if snapshot.has_models(name):
+            return snapshot[name]
+        return snapshot.table(name)
+
+    def encode(
+        self, snapshot: Snapshot, name: str, encoding: str = IDENTITY, media_type: str = JSON
+    ) -> Tuple[bytes, str]:
+        """JSON (or msgpack) body of a collection and the content coding actually applied"""
+        source = self._source(snapshot, name)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is None or cached[0] is not source:
+                cached = (source, {})
+                self._cache[name] = cached
+            bodies = cached[1]
+
+        body = bodies.get((media_type, IDENTITY))
+        if body is None:
+            if media_type == MSGPACK:
+                body = encode_msgpack(source)
+            elif isinstance(source, tuple):
+                body = self._adapters[name].dump_json(source)
+            else:
+                body = encode_rows(source)
+            bodies[(media_type, IDENTITY)] = body
+        if encoding == IDENTITY or len(body) < self.min_compress_bytes:
+            return body, IDENTITY
+        compressed = bodies.get((media_type, encoding))
+        if compressed is None:
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            bodies[(media_type, encoding)] = compressed
+        return compressed, encoding
+
+    def ndjson(self, snapshot: Snapshot, name: str, encoding: str = IDENTITY) -> Iterator[bytes]:
+        """A collection as newline delimited JSON, ``ndjson_chunk_rows`` rows per chunk"""
+        source = self._source(snapshot, name)
+        if isinstance(source, tuple):
+            dump = self._item_adapters[name].dump_json
+            chunks = (
+                b"".join(dump(item) + b"\n" for item in source[start:start + self.ndjson_chunk_rows])
+                for start in range(0, len(source), self.ndjson_chunk_rows)
+            )
+        else:
+            rows = source.iter_rows(self.ndjson_chunk_rows)
+            chunks = (
+                b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in islice(rows, self.ndjson_chunk_rows))
+                for _ in range(0, len(source), self.ndjson_chunk_rows)
+            )
+        if encoding == IDENTITY:
+            yield from chunks
+            return
+        compress_chunk, finish = stream_compressor(encoding, self.gzip_level, self.brotli_quality)
+        for chunk in chunks:
+            yield compress_chunk(chunk)
+        yield finish()
+
+    async def response(
+        self,
+        snapshot: Snapshot,
+        name: str,
+        accept: Optional[str] = None,
+        accept_encoding: Optional[str] = None,
+        format: Optional[str] = None
+    ) -> Response:
+        if format is not None:
+            media_type = FORMATS.get(format)
+            if media_type is None:
+                raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+            if media_type not in MEDIA_TYPES:
+                raise HTTPException(status_code=406, detail=f"{format} responses need an optional package that is not installed")
+        else:
+            media_type = negotiate_media_type(accept)
+            if media_type is None:
+                raise HTTPException(status_code=406, detail=f"Available formats: {', '.join(MEDIA_TYPES)}")
+        headers = {"Vary": "Accept, Accept-Encoding"}
+
+        if media_type == NDJSON:
+            # Streamed from this snapshot, so the export is consistent even across ticks
+            encoding = negotiate_encoding(accept_encoding)
+            if encoding != IDENTITY:
+                headers["Content-Encoding"] = encoding
+            return StreamingResponse(self.ndjson(snapshot, name, encoding), media_type=NDJSON, headers=headers)
+
+        if media_type == ARROW_STREAM:
+            # Sent as is: Arrow buffers are mostly numbers and offsets, which
+            # compress poorly, and the client wants to read them without decoding
+            arrow_interop = await arrow.aload()
+            if snapshot.counts()[name] > OFFLOAD_ROWS:
+                table = await asyncio.to_thread(snapshot.table, name)
+            else:
+                table = snapshot.table(name)
+            stream = arrow_interop.ipc_stream(table, self.arrow_batch_rows)
+            return StreamingResponse(stream, media_type=ARROW_STREAM, headers=headers)
+
+        encoding = negotiate_encoding(accept_encoding)
+        if snapshot.counts()[name] > OFFLOAD_ROWS:
+            body, encoding = await asyncio.to_thread(self.encode, snapshot, name, encoding, media_type)
+        else:
+            body, encoding = self.encode(snapshot, name, encoding, media_type)
+        if encoding != IDENTITY:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=media_type, headers=headers)
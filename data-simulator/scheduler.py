@@ -0,0 +1,125 @@
+"""
+Drift-free tick scheduler with per-entity cadences.
+
+Deadlines live on the event loop's monotonic clock and advance by exactly
+one interval per tick, so the period does not stretch by the time the
+tick itself takes. Entity types that fall due together are ticked in one
+call. When a tick overruns (the next deadline has already passed), the
+overrun policy decides what happens to the missed slots:
+
+- ``skip``: drop them and resume at the next future slot of the grid.
+- ``catch_up``: run them back to back, at most ``max_catch_up`` in a row,
+  then skip the rest.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ("skip", "catch_up")
+
+
+class EntitySchedule:
+    """Cadence and overrun accounting for one entity type"""
+
+    def __init__(self, name: str, interval: float):
+        if interval <= 0:
+            raise ValueError(f"Tick interval for {name} must be positive, got {interval}")
+        self.name = name
+        self.interval = interval
+        self.next_due = 0.0
+        self.backlog = 0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "lastLateness": round(self.last_lateness, 6),
+            "maxLateness": round(self.max_lateness, 6)
+        }
+
+
+class TickScheduler:
+    """Runs ``tick(entity_types)`` for each entity type at its own cadence"""
+
+    def __init__(
+        self,
+        intervals: Dict[str, float],
+        tick: Callable[[List[str]], Awaitable[None]],
+        overrun_policy: str = "skip",
+        max_catch_up: int = 3
+    ):
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        self.schedules = {name: EntitySchedule(name, interval) for name, interval in intervals.items()}
+        self.tick = tick
+        self.overrun_policy = overrun_policy
+        self.max_catch_up = max_catch_up
+
+    async def run(self):
+        """Tick forever; cancel the task to stop"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for schedule in self.schedules.values():
+            schedule.next_due = start
+
+        while True:
+            now = loop.time()
+            due = [s for s in self.schedules.values() if s.next_due <= now]
+            if not due:
+                next_due = min(s.next_due for s in self.schedules.values())
+                await asyncio.sleep(next_due - now)
+                continue
+
+            for schedule in due:
+                lateness = now - schedule.next_due
+                schedule.last_lateness = lateness
+                schedule.max_lateness = max(schedule.max_lateness, lateness)
+
+            try:
+                await self.tick([s.name for s in due])
+            except Exception as e:
+                logger.error(f"Tick failed for {[s.name for s in due]}: {e}")
+
+            finished = loop.time()
+            for schedule in due:
+                schedule.ticks += 1
+                self._advance(schedule, finished)
+
+    def _advance(self, schedule: EntitySchedule, finished: float):
+        schedule.next_due += schedule.interval
+        if schedule.next_due > finished:
+            schedule.backlog = 0
+            return
+
+        # The tick ended after the next deadline: overrun
+        schedule.overruns += 1
+        missed = math.floor((finished - schedule.next_due) / schedule.interval) + 1
+        if self.overrun_policy == "catch_up" and schedule.backlog < self.max_catch_up:
+            # Run the next slot immediately; drop anything beyond the catch-up budget
+            schedule.backlog += 1
+            dropped = max(0, missed - (self.max_catch_up - schedule.backlog + 1))
+        else:
+            schedule.backlog = 0
+            dropped = missed
+
+        if dropped:
+            schedule.next_due += dropped * schedule.interval
+            schedule.skipped += dropped
+            logger.warning(
+                f"{schedule.name} tick overran its {schedule.interval}s interval; "
+                f"skipped {dropped} slot(s)"
+            )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: schedule.stats() for name, schedule in self.schedules.items()}
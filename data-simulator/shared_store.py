@@ -0,0 +1,254 @@
+"""
+Shared-memory publication of the data store.
+
+One simulation owner process writes every published snapshot as a columnar
+state file (on ``/dev/shm`` by default) and atomically renames it into
+place. Any number of read-only API workers map the current file and serve
+from it; numeric columns and string buffers are NumPy views straight into
+the mapping, so nothing is copied until a response needs Python objects.
+
+File layout (little endian)::
+
+    magic b"PRSM" | format u32 | version u64 | toc length u32
+    table of contents (JSON) | padding to 8 bytes | column buffers
+
+Mutating requests received by a reader (regenerate, sync) are forwarded to
+the owner as small command files and executed there.
+
+Writing a file is too slow for the tick path, so the owner hands snapshots
+to a writer thread that always writes the newest one; versions published
+while a write is running are superseded rather than queued.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from columnar import BUFFER_DTYPES, Column, ColumnarTable
+from models import COLLECTION_MODELS
+from store import Snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, owner election is unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PRSM"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIQI")
+ALIGNMENT = 8
+
+def default_state_path() -> str:
+    """State file location: shared memory when available, temp dir otherwise"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "prism-simulator.state")
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SharedStorePublisher:
+    """Writes snapshots to the shared state file (owner side)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.commands_dir = f"{path}.commands"
+        os.makedirs(self.commands_dir, exist_ok=True)
+        self.written = 0
+        self.superseded = 0
+        self._pending: Optional[Snapshot] = None
+        self._closed = False
+        self._wakeup = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="shared-store-writer", daemon=True)
+        self._thread.start()
+
+    def publish(self, snapshot: Snapshot):
+        """Hand the snapshot to the writer thread; returns immediately"""
+        with self._wakeup:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = snapshot
+            self._wakeup.notify()
+
+    def close(self, timeout: float = 10.0):
+        """Write the last pending snapshot and stop the writer thread"""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "superseded": self.superseded}
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while self._pending is None and not self._closed:
+                    self._wakeup.wait()
+                snapshot, self._pending = self._pending, None
+            if snapshot is None:
+                return
+            try:
+                self.write(snapshot)
+                self.written += 1
+            except Exception as e:
+                logger.error(f"Writing shared state version {snapshot.version} failed: {e}")
+
+    def write(self, snapshot: Snapshot):
+        """Write the snapshot to a temp file and atomically swap it in"""
+        toc: Dict[str, Any] = {"created_at": snapshot.created_at, "changed": snapshot.changed, "collections": {}}
+        placed: List[tuple] = []
+        offset = 0
+
+        for name in snapshot.keys():
+            table = snapshot.table(name)
+            columns = {}
+            for field, column in table.columns.items():
+                layout = []
+                for buffer in column.buffers:
+                    layout.append([offset, buffer.dtype.str, len(buffer)])
+                    placed.append((offset, buffer))
+                    offset = _align(offset + buffer.nbytes)
+                columns[field] = {"kind": column.kind, "buffers": layout}
+            toc["collections"][name] = {"length": table.length, "columns": columns}
+
+        toc_bytes = json.dumps(toc, separators=(",", ":")).encode("utf-8")
+        data_start = _align(HEADER.size + len(toc_bytes))
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, snapshot.version, len(toc_bytes)))
+            f.write(toc_bytes)
+            position = HEADER.size + len(toc_bytes)
+            for buffer_offset, buffer in placed:
+                target = data_start + buffer_offset
+                f.write(b"\0" * (target - position))
+                f.write(buffer.tobytes())
+                position = target + buffer.nbytes
+        os.replace(tmp_path, self.path)
+
+    def drain_commands(self) -> List[Dict[str, Any]]:
+        """Read and remove commands forwarded by reader workers, oldest first"""
+        commands = []
+        for filename in sorted(os.listdir(self.commands_dir)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.commands_dir, filename)
+            try:
+                with open(path, "r") as f:
+                    commands.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Discarding unreadable command {filename}: {e}")
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return commands
+
+
+class SharedStoreReader:
+    """Serves snapshots mapped from the shared state file (worker side)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.commands_dir = f"{path}.commands"
+        self._file_id = None
+        self._current = Snapshot(0, {name: () for name in COLLECTION_MODELS})
+
+    def snapshot(self) -> Snapshot:
+        """Return the most recently mapped snapshot (wait-free)"""
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def refresh(self) -> bool:
+        """Map the state file again if the owner has replaced it"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return False
+
+        snapshot = self._load()
+        self._file_id = file_id
+        if snapshot.version != self._current.version:
+            self._current = snapshot
+            return True
+        return False
+
+    def _load(self) -> Snapshot:
+        with open(self.path, "rb") as f:
+            # The mapping stays alive as long as any column references it, even
+            # after the owner renames a newer file over this path.
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, version, toc_length = HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported state file format in {self.path}")
+
+        toc = json.loads(bytes(mapping[HEADER.size:HEADER.size + toc_length]))
+        data_start = _align(HEADER.size + toc_length)
+
+        tables = {}
+        for name, collection in toc["collections"].items():
+            columns = {}
+            for field, spec in collection["columns"].items():
+                if len(spec["buffers"]) != len(BUFFER_DTYPES[spec["kind"]]):
+                    raise ValueError(f"Corrupt column {name}.{field} in {self.path}")
+                buffers = tuple(
+                    np.frombuffer(mapping, dtype=np.dtype(dtype), count=count, offset=data_start + offset)
+                    for offset, dtype, count in spec["buffers"]
+                )
+                columns[field] = Column(field, spec["kind"], buffers)
+            tables[name] = ColumnarTable(name, COLLECTION_MODELS[name], collection["length"], columns)
+
+        return Snapshot(version, created_at=toc["created_at"], tables=tables, changed=toc.get("changed"))
+
+    def send_command(self, command: str, **params) -> Dict[str, Any]:
+        """Forward a mutating command to the simulation owner"""
+        payload = {"command": command, "submittedAt": time.time(), **params}
+        os.makedirs(self.commands_dir, exist_ok=True)
+        filename = f"{time.time_ns()}-{uuid.uuid4().hex}.json"
+        tmp_path = os.path.join(self.commands_dir, f".{filename}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, os.path.join(self.commands_dir, filename))
+        return payload
+
+
+def elect_role(path: str, requested: str):
+    """Resolve the process role; ``auto`` makes the first process to lock the state file the owner
+
+    Returns ``(role, lock_file)``; the lock file must stay open for as long as
+    the process owns the simulation.
+    """
+    if requested != "auto":
+        return requested, None
+    if fcntl is None:
+        logger.warning("File locking unavailable; running as standalone simulator")
+        return "standalone", None
+
+    lock_file = open(f"{path}.lock", "a+")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return "reader", None
+    return "owner", lock_file
@@ -0,0 +1,163 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from columnar import ColumnarTable
+from models import COLLECTION_MODELS
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = (
+    "clients",
+    "licenses",
+    "leads",
+    "technicians",
+    "departments",
+    "vendors",
+    "contracts"
+)
+
+class Snapshot:
+    """Immutable, versioned view of every collection in the store.
+
+    Collections are tuples of frozen models, so a snapshot can be read and
+    serialized from any thread without locking while newer versions are
+    being published. A snapshot can also be built from columnar tables (as
+    mapped from shared memory); each representation is derived lazily from
+    the other on first use and cached, which is safe because neither changes.
+
+    ``changed`` records, per collection, the ``(version, created_at)`` of the
+    snapshot that last changed it, so consumers can tell whether a collection
+    changed between two snapshots without comparing its contents.
+    """
+
+    __slots__ = ("version", "created_at", "changed", "_names", "_collections", "_tables")
+
+    def __init__(
+        self,
+        version: int,
+        collections: Optional[Mapping[str, Tuple]] = None,
+        created_at: Optional[str] = None,
+        tables: Optional[Mapping[str, ColumnarTable]] = None,
+        changed: Optional[Mapping[str, Tuple[int, str]]] = None
+    ):
+        self.version = version
+        self.created_at = created_at or datetime.now().isoformat()
+        self._collections = dict(collections or {})
+        self._tables = dict(tables or {})
+        self._names = tuple(self._collections) or tuple(self._tables)
+        # Collections not carried over changed in this version
+        changed = changed or {}
+        self.changed = {name: tuple(changed.get(name, (version, self.created_at))) for name in self._names}
+
+    def __getitem__(self, data_type: str) -> Tuple:
+        items = self._collections.get(data_type)
+        if items is None:
+            items = tuple(self._tables[data_type].to_models())
+            self._collections[data_type] = items
+        return items
+
+    def has_models(self, data_type: str) -> bool:
+        """Whether the collection is already held as models (rather than only as a table)"""
+        return data_type in self._collections
+
+    def table(self, data_type: str) -> ColumnarTable:
+        """Columnar view of a collection"""
+        table = self._tables.get(data_type)
+        if table is None:
+            table = ColumnarTable.from_models(data_type, COLLECTION_MODELS[data_type], self._collections[data_type])
+            self._tables[data_type] = table
+        return table
+
+    def keys(self):
+        return self._names
+
+    def items(self):
+        return [(name, self[name]) for name in self._names]
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            name: len(self._collections[name]) if name in self._collections else len(self._tables[name])
+            for name in self._names
+        }
+
+
+class DataStore:
+    """Copy-on-write store publishing immutable snapshots.
+
+    Readers call ``snapshot()`` and get the current version with a single
+    attribute read, so they never wait. Writers build the next version of
+    the collections that changed and publish it atomically; unchanged
+    collections (and unchanged entities inside changed ones) are shared
+    with the previous version.
+    """
+
+    def __init__(self, collections: Iterable[str] = COLLECTIONS):
+        self._write_lock = threading.Lock()
+        self._current = Snapshot(0, {name: () for name in collections})
+        self._subscribers: List[Callable[[Snapshot], None]] = []
+
+    def snapshot(self) -> Snapshot:
+        """Return the current snapshot (wait-free)"""
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    def subscribe(self, callback: Callable[[Snapshot], None]):
+        """Call ``callback`` with every newly published snapshot, in version order"""
+        self._subscribers.append(callback)
+
+    def publish(self, updates: Mapping[str, Iterable]) -> Snapshot:
+        """Publish a new version replacing the given collections"""
+        with self._write_lock:
+            current = self._current
+            collections = {name: current[name] for name in current.keys()}
+            for data_type, items in updates.items():
+                if data_type not in collections:
+                    raise KeyError(f"Unknown data type: {data_type}")
+                collections[data_type] = tuple(items)
+
+            return self._swap(current, collections)
+
+    def update(self, updaters: Mapping[str, Callable[[Tuple], Iterable]]) -> Snapshot:
+        """Derive and publish new versions of collections from the current ones
+
+        Each updater receives the current tuple and returns the new items.
+        Writers are serialized, so an update never overwrites a concurrent
+        publish; readers are never blocked.
+        """
+        with self._write_lock:
+            current = self._current
+            collections = {name: current[name] for name in current.keys()}
+            for data_type, updater in updaters.items():
+                collections[data_type] = tuple(updater(collections[data_type]))
+
+            return self._swap(current, collections)
+
+    def _swap(self, current: Snapshot, collections: Dict[str, Tuple]) -> Snapshot:
+        # Unchanged collections keep their columnar tables instead of being encoded again
+        tables = {
+            name: current._tables[name]
+            for name, items in collections.items()
+            if name in current._tables and current._collections.get(name) is items
+        }
+        unchanged = {
+            name: current.changed[name]
+            for name, items in collections.items()
+            if current._collections.get(name) is items
+        }
+        snapshot = Snapshot(current.version + 1, collections, tables=tables, changed=unchanged)
+        # Single reference assignment: readers see either the old or the new version
+        self._current = snapshot
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Snapshot subscriber failed: {e}")
+        return snapshot
+
+
+store = DataStore()
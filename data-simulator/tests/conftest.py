@@ -0,0 +1,28 @@
+"""Fixtures shared by the tests; the simulator's modules live in the parent directory."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def dumps(items):
+    """Models as plain dicts, for comparing collections"""
+    return [item.model_dump() for item in items]
+
+
+@pytest.fixture(scope="session")
+def generated():
+    from data_generator import generate_all_data
+    return generate_all_data()
+
+
+@pytest.fixture
+def data_store(generated):
+    """Store holding a freshly generated data set as version 1"""
+    from store import DataStore
+    store = DataStore()
+    store.publish(generated)
+    return store
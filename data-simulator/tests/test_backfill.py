@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import backfill
+from backfill import WALK_FIELDS, aggregates_from_sums, finish, plan, simulate_shard
+from timeseries import aggregate_metrics
+
+RETENTION = (120, {"1m": 60, "1h": 48, "1d": 30})
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # A few entities per block and a few steps per chunk, so the generated data spans several of each
+    monkeypatch.setattr(backfill, "BLOCK_ENTITIES", 5)
+    monkeypatch.setattr(backfill, "CHUNK_CELLS", 200)
+
+
+def walk(snapshot, shards, **kwargs):
+    tasks = plan(snapshot, 3, 3600, 7, shards, RETENTION, **kwargs)
+    return tasks, [simulate_shard(task) for task in tasks]
+
+
+def combined(results, collection):
+    shards = sorted((result for result in results if result.collection == collection), key=lambda result: result.shard)
+    sums = {name: sum(shard.sums[name] for shard in shards) for name in shards[0].sums}
+    history = {field: np.hstack([shard.history[field]["raw"]["value"] for shard in shards]) for field in shards[0].history}
+    return sums, history
+
+
+def test_walk_ends_at_the_snapshot(data_store, small_blocks):
+    snapshot = data_store.snapshot()
+    tasks, results = walk(snapshot, 1)
+    for collection in {task.collection for task in tasks}:
+        sums, _ = combined(results, collection)
+        table = snapshot.table(collection)
+        last = aggregates_from_sums(collection, {name: values[-1:] for name, values in sums.items()}, table.length)
+        current = aggregate_metrics(collection, table)
+        for name, values in last.items():
+            assert values[0] == pytest.approx(current[name]), (collection, name)
+        # ... and walks somewhere before it
+        first = aggregates_from_sums(collection, {name: values[:1] for name, values in sums.items()}, table.length)
+        assert any(first[name][0] != pytest.approx(current[name]) for name in first), collection
+
+
+def test_sharded_walk_matches_unsharded(data_store, small_blocks):
+    snapshot = data_store.snapshot()
+    tasks, whole = walk(snapshot, 1)
+    sharded_tasks, sharded = walk(snapshot, 3)
+    assert len(sharded_tasks) > len(tasks)
+    for collection in {task.collection for task in tasks}:
+        sums, history = combined(whole, collection)
+        sharded_sums, sharded_history = combined(sharded, collection)
+        assert sums.keys() == sharded_sums.keys()
+        for name in sums:
+            np.testing.assert_allclose(sharded_sums[name], sums[name], err_msg=f"{collection}.{name}")
+        for field in history:
+            np.testing.assert_array_equal(sharded_history[field], history[field], err_msg=f"{collection}.{field}")
+
+
+def test_parquet_replays_to_the_snapshot(data_store, small_blocks, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    snapshot = data_store.snapshot()
+    tasks, results = walk(snapshot, 2, parquet_dir=str(tmp_path))
+    summary = finish(snapshot, tasks, results, parquet_dir=str(tmp_path), seed=7)
+    with open(os.path.join(tmp_path, backfill.MANIFEST)) as f:
+        manifest = json.load(f)
+
+    for collection, files in manifest["collections"].items():
+        rows = {}
+        for file in files["base"] + files["changes"]:
+            for row in pq.read_table(os.path.join(tmp_path, file["path"])).to_pylist():
+                rows[row["id"]] = row
+        assert summary["collections"][collection]["changedRows"] == sum(file["rows"] for file in files["changes"])
+        assert len(rows) == files["rows"] == snapshot.counts()[collection]
+        for item in snapshot[collection]:
+            for field in WALK_FIELDS[collection]:
+                expected, replayed = getattr(item, field), rows[item.id][field]
+                if isinstance(expected, str):
+                    assert replayed == expected, (collection, item.id, field)
+                else:
+                    assert replayed == pytest.approx(expected, abs=0.011), (collection, item.id, field)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from columnar import ColumnarTable
+from conftest import dumps
+from models import COLLECTION_MODELS
+from store import COLLECTIONS, Snapshot
+
+
+@pytest.mark.parametrize("name", COLLECTIONS)
+def test_round_trip(generated, name):
+    items = generated[name]
+    table = ColumnarTable.from_models(name, COLLECTION_MODELS[name], items)
+    assert table.length == len(items)
+    assert dumps(table.to_models()) == dumps(items)
+
+
+def test_take_keeps_order(generated):
+    items = generated["clients"]
+    table = ColumnarTable.from_models("clients", COLLECTION_MODELS["clients"], items)
+    assert dumps(table.take(np.array([3, 0, 3])).to_models()) == dumps([items[3], items[0], items[3]])
+
+
+def test_empty_collection():
+    table = ColumnarTable.from_models("vendors", COLLECTION_MODELS["vendors"], [])
+    assert table.length == 0
+    assert table.to_models() == []
+
+
+def test_non_ascii_strings(generated):
+    client = generated["clients"][0].model_copy(update={"name": "Zürich – 東京 ✓", "industry": ""})
+    table = ColumnarTable.from_models("clients", COLLECTION_MODELS["clients"], [client])
+    assert dumps(table.to_models()) == dumps([client])
+
+
+def test_snapshot_from_tables(data_store):
+    snapshot = data_store.snapshot()
+    from_tables = Snapshot(snapshot.version, tables={name: snapshot.table(name) for name in snapshot.keys()})
+    assert from_tables.counts() == snapshot.counts()
+    for name in snapshot.keys():
+        assert not from_tables.has_models(name)
+        assert dumps(from_tables[name]) == dumps(snapshot[name])
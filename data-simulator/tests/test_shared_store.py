@@ -0,0 +1,54 @@
+from conftest import dumps
+from data_generator import generator
+from shared_store import SharedStorePublisher, SharedStoreReader
+
+
+def test_reader_maps_what_the_owner_published(tmp_path, data_store):
+    path = str(tmp_path / "simulator.state")
+    publisher = SharedStorePublisher(path)
+    publisher.write(data_store.snapshot())
+
+    reader = SharedStoreReader(path)
+    assert reader.refresh()
+    snapshot, published = reader.snapshot(), data_store.snapshot()
+    assert snapshot.version == published.version
+    assert snapshot.created_at == published.created_at
+    assert snapshot.counts() == published.counts()
+    assert snapshot.changed == published.changed
+    for name in published.keys():
+        assert dumps(snapshot[name]) == dumps(published[name])
+    assert not reader.refresh()
+    publisher.close()
+
+
+def test_publish_hands_off_newest_version(tmp_path, data_store):
+    path = str(tmp_path / "simulator.state")
+    publisher = SharedStorePublisher(path)
+    data_store.subscribe(publisher.publish)
+    for _ in range(3):
+        data_store.update({"licenses": lambda items: generator.update_data_realtime("licenses", items)})
+    publisher.close()
+
+    reader = SharedStoreReader(path)
+    assert reader.refresh()
+    latest = data_store.snapshot()
+    assert reader.version == latest.version
+    assert dumps(reader.snapshot()["licenses"]) == dumps(latest["licenses"])
+    # Only licenses ticked: the other collections still date from the initial data
+    assert reader.snapshot().changed["clients"][0] == 1
+    assert reader.snapshot().changed["licenses"][0] == latest.version
+    assert publisher.stats()["written"] >= 1
+
+
+def test_commands_reach_the_owner_once(tmp_path):
+    path = str(tmp_path / "simulator.state")
+    publisher = SharedStorePublisher(path)
+    reader = SharedStoreReader(path)
+    reader.send_command("regenerate", jobId="job-1")
+    reader.send_command("sync")
+
+    commands = publisher.drain_commands()
+    assert [command["command"] for command in commands] == ["regenerate", "sync"]
+    assert commands[0]["jobId"] == "job-1"
+    assert publisher.drain_commands() == []
+    publisher.close()
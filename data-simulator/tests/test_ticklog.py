@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+from conftest import dumps
+from data_generator import generate_all_data, generator
+from store import DataStore
+from ticklog import TickRecorder, TickReplayer, apply_frame, read_frames, summarize
+
+
+def tick(store, names=("licenses", "leads", "technicians")):
+    return store.update({name: lambda items, name=name: generator.update_data_realtime(name, items) for name in names})
+
+
+def record_session(path, store, ticks=5):
+    recorder = TickRecorder(path)
+    store.subscribe(recorder.record)
+    store.publish(generate_all_data())
+    for _ in range(ticks):
+        tick(store)
+    recorder.close()
+    assert recorder.stats()["failed"] == 0
+    return recorder
+
+
+def assert_same(replayed, recorded):
+    assert replayed.counts() == recorded.counts()
+    for name in recorded.keys():
+        assert dumps(replayed[name]) == dumps(recorded[name]), name
+
+
+def test_replay_reaches_the_recorded_snapshot(tmp_path):
+    path = str(tmp_path / "ticks.log")
+    store = DataStore()
+    recorder = TickRecorder(path)
+    store.subscribe(recorder.record)
+    store.publish(generate_all_data())
+    for _ in range(5):
+        tick(store)
+    # A regenerate replaces whole collections mid-log
+    store.publish(generate_all_data())
+    tick(store, ("departments",))
+    recorder.close()
+
+    frames = list(read_frames(path))
+    assert recorder.stats()["frames"] == len(frames) == store.snapshot().version
+    assert frames[0].base and not any(frame.base for frame in frames[1:])
+    assert set(frames[6].data_types) == set(store.snapshot().keys())
+
+    replay = DataStore()
+    for frame in frames:
+        apply_frame(replay, frame)
+    assert replay.snapshot().version == store.snapshot().version
+    assert_same(replay.snapshot(), store.snapshot())
+
+
+def test_replayer_applies_every_frame(tmp_path):
+    path = str(tmp_path / "ticks.log")
+    store = DataStore()
+    record_session(path, store)
+
+    replay = DataStore()
+
+    async def apply(frame):
+        apply_frame(replay, frame)
+
+    replayer = TickReplayer(path, apply, speed=0)
+    asyncio.run(replayer.run())
+    assert replayer.stats()["frames"] == 6
+    assert replayer.stats()["failed"] == 0
+    assert_same(replay.snapshot(), store.snapshot())
+
+
+def test_new_session_after_torn_tail(tmp_path):
+    path = str(tmp_path / "ticks.log")
+    record_session(path, DataStore())
+    # A crash while writing the last frame
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 10)
+    assert len(list(read_frames(path))) == 5
+
+    store = DataStore()
+    record_session(path, store, ticks=3)
+    summary = summarize(path)
+    assert summary["sessions"] == 2
+    assert summary["frames"] == 5 + 4
+
+    replay = DataStore()
+    for frame in read_frames(path):
+        apply_frame(replay, frame)
+    assert_same(replay.snapshot(), store.snapshot())
@@ -0,0 +1,320 @@
+"""
+Append-only log of simulation ticks, and its replay.
+
+``TickRecorder`` subscribes to the store and appends one frame per
+published snapshot: the entity fields that changed since the previous one
+(a tick), or whole collections whose membership changed (the initial data,
+a regenerate). The first frame of every recording session holds every
+collection, so a log replays on its own. The subscriber only queues the
+snapshot; diffing, encoding and writing happen in order on a writer thread.
+
+File layout: a magic string, then frames of
+
+    <uint32 body length> <uint32 CRC-32 of body> <float64 wall time> <body>
+
+where the body is zlib-compressed JSON:
+
+    {"version": 12, "base": false,
+     "changes": {"licenses": [[3, {"usedLicenses": 41, "availableLicenses": 9, ...}], ...]},
+     "replace": {}}
+
+Changed entities are addressed by their position in the collection, which
+ticks never reorder. A frame cut short (by a crash while writing) ends the
+log; everything before it still replays, and the recorder cuts it off
+before appending a new session.
+
+``TickReplayer`` reads a log back and hands each frame to a callback at the
+recorded pace times ``speed`` (1 is real time, 100 is a hundred times
+faster, 0 is as fast as the callback goes). ``apply_frame`` publishes a
+frame on the store, so store subscribers see the same stream of snapshots
+as during the recording, run after run.
+
+    python ticklog.py ticks.log
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+
+from models import COLLECTION_MODELS
+from store import DataStore, Snapshot
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PRISMTICKS1\n"
+HEADER = struct.Struct("<IId")
+
+
+class Frame(NamedTuple):
+    timestamp: float
+    version: int
+    # First frame of a recording session: holds every collection
+    base: bool
+    # Collection -> [[position, {field: value}], ...]
+    changes: Dict[str, List[List[Any]]]
+    # Collection -> every entity, as dicts
+    replace: Dict[str, List[Dict[str, Any]]]
+
+    @property
+    def data_types(self) -> List[str]:
+        return [*self.replace, *(name for name in self.changes if name not in self.replace)]
+
+
+def _diff(previous: Optional[Snapshot], snapshot: Snapshot) -> Optional[Dict[str, Any]]:
+    """Frame payload turning ``previous`` into ``snapshot``; None if nothing changed"""
+    changes: Dict[str, List[List[Any]]] = {}
+    replace: Dict[str, List[Dict[str, Any]]] = {}
+    for name in snapshot.keys():
+        items = snapshot[name]
+        old = previous[name] if previous is not None else None
+        if old is items:
+            continue
+        # Copy-on-write: unchanged entities are the same objects, changed ones keep their id and position
+        if old is None or len(old) != len(items) or any(a.id != b.id for a, b in zip(old, items) if a is not b):
+            replace[name] = [item.model_dump() for item in items]
+            continue
+        diffs = []
+        for position, (a, b) in enumerate(zip(old, items)):
+            if a is b:
+                continue
+            fields = {field: getattr(b, field) for field in type(b).model_fields if getattr(a, field) != getattr(b, field)}
+            if fields:
+                diffs.append([position, fields])
+        if diffs:
+            changes[name] = diffs
+    if not changes and not replace:
+        return None
+    return {"version": snapshot.version, "base": previous is None, "changes": changes, "replace": replace}
+
+
+class TickRecorder:
+    """Store subscriber appending the changes of every published snapshot to a tick log"""
+
+    def __init__(self, path: str, compression_level: int = 6):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.compression_level = compression_level
+        if os.path.exists(path) and os.path.getsize(path):
+            _truncate_torn_tail(path)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self.frames = 0
+        self.failed = 0
+        self.bytes = self._file.tell()
+        self._previous: Optional[Snapshot] = None
+        # Every snapshot is diffed against the one before, so none are skipped
+        self._queue: "queue.Queue[Optional[Tuple[Snapshot, float]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="tick-log-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, snapshot: Snapshot):
+        """Queue the snapshot for the writer thread, stamped with the current time; returns immediately"""
+        self._queue.put((snapshot, time.time()))
+
+    def close(self, timeout: float = 10.0):
+        """Write the frames still queued, then close the log"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._file.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            snapshot, timestamp = item
+            try:
+                self._write(snapshot, timestamp)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Recording snapshot {snapshot.version} to {self.path} failed: {e}")
+
+    def _write(self, snapshot: Snapshot, timestamp: float):
+        payload = _diff(self._previous, snapshot)
+        self._previous = snapshot
+        if payload is None:
+            return
+        body = zlib.compress(orjson.dumps(payload), self.compression_level)
+        self._file.write(HEADER.pack(len(body), zlib.crc32(body), timestamp) + body)
+        # Flushed per frame, so a reader (or a crash) sees whole frames only up to the last one
+        self._file.flush()
+        self.frames += 1
+        self.bytes += HEADER.size + len(body)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "queued": self._queue.qsize(),
+            "failed": self.failed
+        }
+
+
+def _valid_frames(f: BinaryIO, path: str) -> Iterator[Tuple[float, bytes]]:
+    """``(timestamp, body)`` of each intact frame; leaves ``f`` at the end of the last one"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a tick log")
+    while True:
+        start = f.tell()
+        header = f.read(HEADER.size)
+        if not header:
+            return
+        if len(header) == HEADER.size:
+            length, crc, timestamp = HEADER.unpack(header)
+            body = f.read(length)
+            if len(body) == length and zlib.crc32(body) == crc:
+                yield timestamp, body
+                continue
+        logger.warning(f"Tick log {path} ends with a partial or corrupt frame at byte {start}")
+        f.seek(start)
+        return
+
+def _truncate_torn_tail(path: str):
+    """Cut a log back to its last intact frame, so frames appended after it stay readable"""
+    with open(path, "r+b") as f:
+        for _ in _valid_frames(f, path):
+            pass
+        end = f.tell()
+        if end < os.path.getsize(path):
+            f.truncate(end)
+            logger.warning(f"Truncated tick log {path} to its last intact frame ({end} bytes)")
+
+def read_frames(path: str) -> Iterator[Frame]:
+    """Frames of a tick log in order, stopping at a partial or corrupt frame"""
+    with open(path, "rb") as f:
+        for timestamp, body in _valid_frames(f, path):
+            payload = orjson.loads(zlib.decompress(body))
+            yield Frame(timestamp, payload["version"], payload["base"], payload["changes"], payload["replace"])
+
+
+def _patched(items: Sequence, diffs: List[List[Any]]) -> List:
+    patched = list(items)
+    for position, fields in diffs:
+        patched[position] = patched[position].model_copy(update=fields)
+    return patched
+
+def apply_frame(store: DataStore, frame: Frame) -> Snapshot:
+    """Publish a frame's changes as the store's next version"""
+    updaters = {}
+    for name, items in frame.replace.items():
+        model = COLLECTION_MODELS[name]
+        # Entities were validated when they were recorded
+        updaters[name] = lambda current, model=model, items=items: [model.model_construct(**item) for item in items]
+    for name, diffs in frame.changes.items():
+        if name not in updaters:
+            updaters[name] = lambda current, diffs=diffs: _patched(current, diffs)
+    return store.update(updaters)
+
+
+class TickReplayer:
+    """Feeds the frames of a tick log to ``apply`` at a multiple of the recorded pace"""
+
+    def __init__(self, path: str, apply: Callable[[Frame], Awaitable[None]], speed: float = 1.0, loop: bool = False):
+        if speed < 0:
+            raise ValueError(f"Replay speed must be 0 (as fast as possible) or positive, got {speed}")
+        self.path = path
+        self.apply = apply
+        self.speed = speed
+        self.loop = loop
+        self.frames = 0
+        self.passes = 0
+        self.failed = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.position: Optional[float] = None
+
+    async def run(self):
+        """Replay the log (over and over with ``loop``); cancel the task to stop"""
+        event_loop = asyncio.get_running_loop()
+        while True:
+            origin = None
+            for frame in read_frames(self.path):
+                # A new recording session starts the clock over instead of replaying the gap before it
+                if origin is None or frame.base:
+                    origin = (event_loop.time(), frame.timestamp)
+                if self.speed:
+                    due = origin[0] + (frame.timestamp - origin[1]) / self.speed
+                    now = event_loop.time()
+                    if due > now:
+                        await asyncio.sleep(due - now)
+                    else:
+                        self.last_lateness = now - due
+                        self.max_lateness = max(self.max_lateness, self.last_lateness)
+                else:
+                    # Still let requests in between frames
+                    await asyncio.sleep(0)
+
+                try:
+                    await self.apply(frame)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Replaying frame of version {frame.version} failed: {e}")
+                self.frames += 1
+                self.position = frame.timestamp
+            self.passes += 1
+            if not self.loop:
+                logger.info(f"Tick log {self.path} replayed: {self.frames} frames")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "speed": self.speed,
+            "loop": self.loop,
+            "frames": self.frames,
+            "passes": self.passes,
+            "failed": self.failed,
+            "position": self.position,
+            "lastLateness": round(self.last_lateness, 6),
+            "maxLateness": round(self.max_lateness, 6)
+        }
+
+
+def summarize(path: str) -> Dict[str, Any]:
+    """Frames, time span and changed entities per collection of a tick log"""
+    frames = sessions = 0
+    first = last = None
+    changed: Dict[str, int] = {}
+    replaced: Dict[str, int] = {}
+    for frame in read_frames(path):
+        frames += 1
+        sessions += frame.base
+        first = frame.timestamp if first is None else first
+        last = frame.timestamp
+        for name, diffs in frame.changes.items():
+            changed[name] = changed.get(name, 0) + len(diffs)
+        for name in frame.replace:
+            replaced[name] = replaced.get(name, 0) + 1
+    return {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "frames": frames,
+        "sessions": sessions,
+        "seconds": round(last - first, 3) if frames else 0.0,
+        "changedEntities": changed,
+        "replacedCollections": replaced
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Summarize a tick log")
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+    print(json.dumps(summarize(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
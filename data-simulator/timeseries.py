@@ -0,0 +1,593 @@
+"""
+In-process history of entity and aggregate metrics.
+
+Ticks overwrite entity fields in place, so the store only knows current
+values. ``TimeSeriesStore`` records every published snapshot:
+
+- per-entity series for the fields the simulation changes (``ENTITY_METRICS``,
+  e.g. ``clients.annualRevenue`` of ``client-7``);
+- aggregate series for each collection (``clients.totalRevenue``,
+  ``licenses.avgUtilization``, ...), the figures the reports show.
+
+Each metric keeps its recent points at raw resolution in a ring buffer, and
+1 minute, 1 hour and 1 day rollups (count, mean, min, max, first, last) that are
+updated as points arrive, so memory stays bounded however long the
+simulator runs. Series of one metric share their timestamps and live in one
+NumPy block, with one column per entity; entities that appear later get a
+column of their own. Entity blocks are many, so they hold float32 values
+(rollup sums stay float64) and per-entity history is opt-in.
+
+``submit`` hands snapshots to a recording thread, so the aggregate and
+per-entity work stays off the caller (the store's publish, on the event loop).
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analytics import client_metrics, lead_metrics, license_metrics, numeric
+from columnar import ColumnarTable
+from store import Snapshot
+
+logger = logging.getLogger(__name__)
+
+RAW = "raw"
+# Rollup name -> bucket width in seconds
+ROLLUPS = {"1m": 60, "1h": 3600, "1d": 86400}
+RESOLUTIONS = (RAW, *ROLLUPS)
+
+# Numeric fields the simulation changes, per collection
+ENTITY_METRICS = {
+    "clients": ("annualRevenue", "annualCosts", "monthlyRecurring"),
+    "licenses": ("usedLicenses", "utilizationRate"),
+    "leads": ("value", "probability"),
+    "technicians": ("billableHours", "utilization"),
+    "departments": ("spent", "remaining"),
+}
+
+# Collection -> report figures computed by ``analytics``
+REPORT_ANALYTICS: Dict[str, Callable[[ColumnarTable], Dict[str, Any]]] = {
+    "clients": client_metrics,
+    "licenses": license_metrics,
+    "leads": lead_metrics,
+}
+
+
+def bucket_stats(times: np.ndarray, values: np.ndarray, width_seconds: int) -> Dict[str, np.ndarray]:
+    """Rollup buckets of complete rows of points in time order
+
+    Returns the bucket starts (``t``) and, per bucket and column, the same
+    count, sum, min, max, first and last a rollup ring accumulates point by
+    point.
+    """
+    starts = np.floor(times / width_seconds) * width_seconds
+    edges = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+    lengths = np.diff(np.append(edges, len(times)))
+    return {
+        "t": starts[edges],
+        "count": np.repeat(lengths[:, None], values.shape[1], axis=1).astype(np.int32),
+        "sum": np.add.reduceat(values, edges, axis=0),
+        "min": np.minimum.reduceat(values, edges, axis=0),
+        "max": np.maximum.reduceat(values, edges, axis=0),
+        "first": values[edges],
+        "last": values[np.append(edges[1:], len(times)) - 1]
+    }
+
+
+def aggregate_metrics(collection: str, table: ColumnarTable) -> Dict[str, float]:
+    """Scalar figures of a collection: the report metrics, or count, totals and averages of its entity metrics"""
+    analyze = REPORT_ANALYTICS.get(collection)
+    if analyze is not None:
+        return {
+            name: float(value) for name, value in analyze(table).items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+    aggregates = {"count": float(table.length)}
+    for field in ENTITY_METRICS.get(collection, ()):
+        values = numeric(table, field)
+        suffix = field[0].upper() + field[1:]
+        aggregates[f"total{suffix}"] = float(values.sum())
+        aggregates[f"avg{suffix}"] = float(values.mean()) if table.length else 0.0
+    return aggregates
+
+
+class _RawRing:
+    """The last ``capacity`` points of a block of series"""
+
+    def __init__(self, capacity: int, width: int, dtype=np.float64):
+        self.dtype = dtype
+        self.times = np.zeros(capacity)
+        self.values = np.full((capacity, width), np.nan, dtype=dtype)
+        self.size = 0
+        self.next = 0
+
+    def widen(self, width: int):
+        extra = np.full((len(self.times), width - self.values.shape[1]), np.nan, dtype=self.dtype)
+        self.values = np.hstack([self.values, extra])
+
+    def append(self, timestamp: float, row: np.ndarray):
+        self.times[self.next] = timestamp
+        self.values[self.next] = row
+        self.next = (self.next + 1) % len(self.times)
+        self.size = min(self.size + 1, len(self.times))
+
+    def load(self, times: np.ndarray, values: np.ndarray):
+        """Hold the newest of the given points (oldest first) instead of the current ones"""
+        times, values = times[-len(self.times):], values[-len(self.times):]
+        self.times[:] = 0.0
+        self.values = np.full((len(self.times), values.shape[1]), np.nan, dtype=self.dtype)
+        self.times[:len(times)] = times
+        self.values[:len(times)] = values
+        self.size = len(times)
+        self.next = self.size % len(self.times)
+
+    def order(self) -> np.ndarray:
+        """Row indices from oldest to newest"""
+        if self.size < len(self.times):
+            return np.arange(self.size)
+        return np.roll(np.arange(len(self.times)), -self.next)
+
+    def rows(self) -> Dict[str, np.ndarray]:
+        order = self.order()
+        return {"t": self.times[order], "value": self.values[order]}
+
+
+class _RollupRing:
+    """Fixed-width time buckets of a block of series, oldest overwritten first"""
+
+    def __init__(self, width_seconds: int, capacity: int, width: int, dtype=np.float64):
+        self.width_seconds = width_seconds
+        self.dtype = dtype
+        self.starts = np.zeros(capacity)
+        self._allocate(capacity, width)
+        self.size = 0
+        self.current = -1
+
+    def widen(self, width: int):
+        current = {name: getattr(self, name) for name in ("count", "sum", "min", "max", "first", "last")}
+        self._allocate(len(self.starts), width)
+        for name, array in current.items():
+            getattr(self, name)[:, :array.shape[1]] = array
+
+    def _allocate(self, capacity: int, width: int):
+        self.count = np.zeros((capacity, width), dtype=np.int32)
+        # Sums accumulate many points, so they keep full precision
+        self.sum = np.zeros((capacity, width))
+        self.min = np.full((capacity, width), np.inf, dtype=self.dtype)
+        self.max = np.full((capacity, width), -np.inf, dtype=self.dtype)
+        self.first = np.full((capacity, width), np.nan, dtype=self.dtype)
+        self.last = np.full((capacity, width), np.nan, dtype=self.dtype)
+
+    def add(self, timestamp: float, row: np.ndarray):
+        start = math.floor(timestamp / self.width_seconds) * self.width_seconds
+        # A point older than the current bucket (clock stepped back) is folded into it
+        if self.current < 0 or start > self.starts[self.current]:
+            self.current = (self.current + 1) % len(self.starts)
+            self.size = min(self.size + 1, len(self.starts))
+            i = self.current
+            self.starts[i] = start
+            self.count[i] = 0
+            self.sum[i] = 0.0
+            self.min[i] = np.inf
+            self.max[i] = -np.inf
+            self.first[i] = np.nan
+            self.last[i] = np.nan
+        i = self.current
+        present = ~np.isnan(row)
+        self.first[i] = np.where(present & (self.count[i] == 0), row, self.first[i])
+        self.count[i] += present
+        self.sum[i] += np.where(present, row, 0.0)
+        np.fmin(self.min[i], row, out=self.min[i])
+        np.fmax(self.max[i], row, out=self.max[i])
+        self.last[i] = np.where(present, row, self.last[i])
+
+    def load(self, buckets: Dict[str, np.ndarray]):
+        """Hold the newest of the given buckets (oldest first, as from ``bucket_stats``) instead of the current ones"""
+        capacity = len(self.starts)
+        kept = {name: array[-capacity:] for name, array in buckets.items()}
+        size, width = kept["count"].shape
+        self.starts = np.zeros(capacity)
+        self._allocate(capacity, width)
+        self.starts[:size] = kept["t"]
+        for name in ("count", "sum", "min", "max", "first", "last"):
+            getattr(self, name)[:size] = kept[name]
+        self.size = size
+        self.current = size - 1
+
+    def rows(self) -> Dict[str, np.ndarray]:
+        if self.size < len(self.starts):
+            order = np.arange(self.size)
+        else:
+            order = np.roll(np.arange(len(self.starts)), -(self.current + 1))
+        count = self.count[order]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum[order] / count
+        return {
+            "t": self.starts[order], "count": count, "mean": mean,
+            "min": self.min[order], "max": self.max[order], "first": self.first[order], "last": self.last[order]
+        }
+
+
+class SeriesBlock:
+    """Series of one metric sharing timestamps, one column per key (entity id or aggregate)"""
+
+    def __init__(self, raw_points: int, rollup_points: Dict[str, int], dtype=np.float64):
+        self.index: Dict[str, int] = {}
+        self.raw = _RawRing(raw_points, 0, dtype)
+        self.rollups = {name: _RollupRing(ROLLUPS[name], points, 0, dtype) for name, points in rollup_points.items()}
+        self._positions: Optional[Tuple[Sequence[str], np.ndarray]] = None
+        # Time of the first point ever appended
+        self.started: Optional[float] = None
+
+    def _columns(self, keys: Sequence[str]) -> np.ndarray:
+        # Keys usually come in the same order tick after tick; reuse the mapping then
+        if self._positions is not None and self._positions[0] == keys:
+            return self._positions[1]
+        new = [key for key in dict.fromkeys(keys) if key not in self.index]
+        if new:
+            for key in new:
+                self.index[key] = len(self.index)
+            self.raw.widen(len(self.index))
+            for rollup in self.rollups.values():
+                rollup.widen(len(self.index))
+        positions = np.fromiter((self.index[key] for key in keys), dtype=np.int64, count=len(keys))
+        self._positions = (list(keys), positions)
+        return positions
+
+    def append(self, timestamp: float, keys: Sequence[str], values: np.ndarray):
+        positions = self._columns(keys)
+        row = np.full(len(self.index), np.nan)
+        row[positions] = values
+        if self.started is None:
+            self.started = timestamp
+        self.raw.append(timestamp, row)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, row)
+
+    def load(
+        self,
+        keys: Sequence[str],
+        started: float,
+        raw: Dict[str, np.ndarray],
+        rollups: Dict[str, Dict[str, np.ndarray]]
+    ):
+        """Replace the history with precomputed points and buckets, oldest first (e.g. from a backfill)"""
+        self.index = {key: i for i, key in enumerate(keys)}
+        self._positions = None
+        self.started = started
+        self.raw.load(raw["t"], raw["value"])
+        for name, rollup in self.rollups.items():
+            rollup.load(rollups[name])
+
+    def raw_after(self, timestamp: float) -> Iterator[Tuple[float, List[str], np.ndarray]]:
+        """Raw points recorded at or after ``timestamp``, as ``append`` arguments"""
+        rows = self.raw.rows()
+        keys = list(self.index)
+        for t, row in zip(rows["t"], rows["value"]):
+            if t >= timestamp:
+                yield float(t), keys, row
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.raw.times, self.raw.values]
+        for rollup in self.rollups.values():
+            arrays += [rollup.starts, rollup.count, rollup.sum, rollup.min, rollup.max, rollup.first, rollup.last]
+        return sum(array.nbytes for array in arrays)
+
+    def oldest(self, resolution: str) -> Optional[float]:
+        ring = self.raw if resolution == RAW else self.rollups[resolution]
+        if not ring.size:
+            return None
+        return float(ring.rows()["t"][0])
+
+    def points(self, key: str, resolution: str, start: float, end: float) -> List[Dict[str, Any]]:
+        column = self.index[key]
+        if resolution == RAW:
+            rows = self.raw.rows()
+            selected = (rows["t"] >= start) & (rows["t"] <= end) & ~np.isnan(rows["value"][:, column])
+            return [
+                {"t": _iso(t), "value": float(value)}
+                for t, value in zip(rows["t"][selected], rows["value"][selected, column])
+            ]
+        rows = self.rollups[resolution].rows()
+        width = ROLLUPS[resolution]
+        selected = (rows["t"] + width > start) & (rows["t"] <= end) & (rows["count"][:, column] > 0)
+        return [
+            {
+                "t": _iso(t), "count": int(count), "mean": float(mean), "min": float(low),
+                "max": float(high), "first": float(first), "last": float(last)
+            }
+            for t, count, mean, low, high, first, last in zip(
+                rows["t"][selected], rows["count"][selected, column], rows["mean"][selected, column],
+                rows["min"][selected, column], rows["max"][selected, column],
+                rows["first"][selected, column], rows["last"][selected, column]
+            )
+        ]
+
+    def value_at(self, key: str, timestamp: float) -> Optional[float]:
+        """Last value recorded at or before ``timestamp``, from the finest resolution reaching back that far"""
+        column = self.index[key]
+        for resolution in RESOLUTIONS:
+            if resolution == RAW:
+                rows = self.raw.rows()
+                values, ends = rows["value"][:, column], rows["t"]
+            else:
+                rows = self.rollups[resolution].rows()
+                # A bucket's last value is only known to precede the timestamp if the whole bucket does
+                values, ends = rows["last"][:, column], rows["t"] + ROLLUPS[resolution]
+            before = ~np.isnan(values) & (ends <= timestamp)
+            if before.any():
+                return float(values[before][-1])
+        return None
+
+    def first(self, key: str) -> Optional[float]:
+        """Oldest value still held, at any resolution"""
+        column = self.index[key]
+        oldest: Optional[Tuple[float, float]] = None
+        for resolution in RESOLUTIONS:
+            if resolution == RAW:
+                rows = self.raw.rows()
+                values = rows["value"][:, column]
+            else:
+                rows = self.rollups[resolution].rows()
+                values = rows["first"][:, column]
+            known = np.flatnonzero(~np.isnan(values))
+            if len(known) and (oldest is None or rows["t"][known[0]] < oldest[0]):
+                oldest = (float(rows["t"][known[0]]), float(values[known[0]]))
+        return oldest[1] if oldest else None
+
+    def latest(self, key: str) -> Optional[float]:
+        column = self.index[key]
+        values = self.raw.rows()["value"][:, column]
+        known = values[~np.isnan(values)]
+        return float(known[-1]) if len(known) else None
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class TimeSeriesStore:
+    """Records snapshots as metric history and answers range and trend queries"""
+
+    def __init__(
+        self,
+        raw_points: int = 720,
+        rollup_points: Optional[Dict[str, int]] = None,
+        entity_raw_points: int = 120,
+        entity_rollup_points: Optional[Dict[str, int]] = None,
+        entity_history: bool = False,
+        max_points: int = 1000,
+        pending_limit: int = 0
+    ):
+        # Aggregates are few and kept long; entity series are many, so they keep less
+        self.raw_points = raw_points
+        self.rollup_points = dict(rollup_points or {"1m": 1440, "1h": 720, "1d": 365})
+        self.entity_raw_points = entity_raw_points
+        self.entity_rollup_points = dict(entity_rollup_points or {"1m": 60, "1h": 48, "1d": 30})
+        self.entity_history = entity_history
+        self.max_points = max_points
+        # Collection -> metric block of its aggregates; "collection.field" -> per-entity block
+        self.aggregates: Dict[str, SeriesBlock] = {}
+        self.entities: Dict[str, SeriesBlock] = {}
+        # Aggregate points waiting to be written to the metrics table, oldest dropped first
+        self.pending: Deque[Dict[str, Any]] = deque(maxlen=pending_limit or None)
+        self.record_pending = pending_limit > 0
+        self._recorded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[Snapshot, float]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _aggregate_block(self, collection: str) -> SeriesBlock:
+        block = self.aggregates.get(collection)
+        if block is None:
+            block = self.aggregates[collection] = SeriesBlock(self.raw_points, self.rollup_points)
+        return block
+
+    def _entity_block(self, metric: str) -> SeriesBlock:
+        block = self.entities.get(metric)
+        if block is None:
+            block = self.entities[metric] = SeriesBlock(self.entity_raw_points, self.entity_rollup_points, np.float32)
+        return block
+
+    def submit(self, snapshot: Snapshot):
+        """Record the snapshot on the recording thread, stamped with the current time; returns immediately"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timeseries-recorder", daemon=True)
+                self._thread.start()
+        self._queue.put((snapshot, time.time()))
+
+    def close(self, timeout: float = 10.0):
+        """Record the snapshots still queued and stop the recording thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.record(*item)
+            except Exception as e:
+                logger.error(f"Recording snapshot {item[0].version} failed: {e}")
+
+    def record(self, snapshot: Snapshot, timestamp: Optional[float] = None):
+        """Append the collections that changed since the last recorded snapshot"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for collection in snapshot.keys():
+            # Unchanged collections are the same object in consecutive snapshots
+            source = snapshot[collection] if snapshot.has_models(collection) else snapshot.table(collection)
+            if self._recorded.get(collection) is source:
+                continue
+            table = snapshot.table(collection)
+            aggregates = aggregate_metrics(collection, table)
+            with self._lock:
+                self._recorded[collection] = source
+                names = list(aggregates)
+                self._aggregate_block(collection).append(
+                    timestamp, names, np.fromiter(aggregates.values(), dtype=np.float64, count=len(names))
+                )
+                if self.entity_history and table.length:
+                    ids = table["id"].to_pylist()
+                    for field in ENTITY_METRICS.get(collection, ()):
+                        self._entity_block(f"{collection}.{field}").append(
+                            timestamp, ids, numeric(table, field)
+                        )
+            if self.record_pending:
+                milliseconds = int(timestamp * 1000)
+                self.pending.extend(
+                    {"metricType": f"{collection}.{name}", "timestamp": milliseconds, "value": value}
+                    for name, value in aggregates.items() if math.isfinite(value)
+                )
+
+    def load_history(
+        self,
+        collection: str,
+        times: np.ndarray,
+        aggregates: Dict[str, np.ndarray],
+        entities: Dict[str, Dict[str, Any]],
+        end: float
+    ):
+        """Replace a collection's history before ``end`` with precomputed points (e.g. from a backfill)
+
+        ``aggregates`` maps metric names to one value per timestamp in
+        ``times``; ``entities`` maps entity fields to ``{"keys", "raw",
+        "rollups"}`` already cut to the entity retention. Points recorded
+        live at or after ``end`` are kept, so history loaded while the
+        simulation ticks joins up with it.
+        """
+        names = list(aggregates)
+        values = np.column_stack([aggregates[name] for name in names])
+        block = SeriesBlock(self.raw_points, self.rollup_points)
+        block.load(
+            names,
+            float(times[0]),
+            {"t": times, "value": values},
+            {name: bucket_stats(times, values, ROLLUPS[name]) for name in self.rollup_points}
+        )
+        with self._lock:
+            self.aggregates[collection] = self._joined(self.aggregates.get(collection), block, end)
+            if not self.entity_history:
+                return
+            for field, history in entities.items():
+                metric = f"{collection}.{field}"
+                block = SeriesBlock(self.entity_raw_points, self.entity_rollup_points, np.float32)
+                block.load(history["keys"], float(times[0]), history["raw"], history["rollups"])
+                self.entities[metric] = self._joined(self.entities.get(metric), block, end)
+
+    @staticmethod
+    def _joined(live: Optional[SeriesBlock], loaded: SeriesBlock, end: float) -> SeriesBlock:
+        if live is not None:
+            for timestamp, keys, row in live.raw_after(end):
+                loaded.append(timestamp, keys, row)
+        return loaded
+
+    def drain_pending(self) -> List[Dict[str, Any]]:
+        points = []
+        while self.pending:
+            points.append(self.pending.popleft())
+        return points
+
+    def _lookup(self, metric: str, entity: Optional[str]) -> Tuple[SeriesBlock, str]:
+        """Block and column of a metric; raises KeyError for unknown metrics or entities"""
+        collection, _, name = metric.partition(".")
+        if entity is None:
+            block = self.aggregates.get(collection)
+            if block is None or name not in block.index:
+                raise KeyError(f"Unknown aggregate metric: {metric}")
+            return block, name
+        block = self.entities.get(metric)
+        if block is None:
+            raise KeyError(f"Unknown entity metric: {metric}")
+        if entity not in block.index:
+            raise KeyError(f"No history for {entity} in {metric}")
+        return block, entity
+
+    def query(
+        self,
+        metric: str,
+        entity: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = "auto"
+    ) -> Dict[str, Any]:
+        """Points of one series in ``[start, end]``; ``auto`` picks the finest resolution covering the range"""
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        with self._lock:
+            block, key = self._lookup(metric, entity)
+            if resolution == "auto":
+                resolution = self._resolution(block, start, end)
+            points = block.points(key, resolution, start, end)
+        return {
+            "metric": metric,
+            "entity": entity,
+            "resolution": resolution,
+            "start": _iso(start),
+            "end": _iso(end),
+            "points": points
+        }
+
+    def _resolution(self, block: SeriesBlock, start: float, end: float) -> str:
+        """Finest resolution holding data back to ``start`` within ``max_points``; else the one reaching furthest back"""
+        furthest, furthest_oldest = RAW, math.inf
+        # A range starting before the history does is covered by a resolution that still holds all of it
+        start = max(start, block.started or start)
+        for resolution in RESOLUTIONS:
+            oldest = block.oldest(resolution)
+            if oldest is None:
+                continue
+            if resolution == RAW:
+                points = int(((block.raw.times >= start) & (block.raw.times <= end)).sum())
+            else:
+                points = int((end - max(start, oldest)) // ROLLUPS[resolution]) + 1
+            if oldest <= start and points <= self.max_points:
+                return resolution
+            if oldest < furthest_oldest:
+                furthest, furthest_oldest = resolution, oldest
+        return furthest
+
+    def trend(self, metric: str, window_seconds: float, entity: Optional[str] = None) -> float:
+        """Percent change of a series over the window (or over all history, if shorter); 0 without history"""
+        with self._lock:
+            try:
+                block, key = self._lookup(metric, entity)
+            except KeyError:
+                return 0.0
+            latest = block.latest(key)
+            baseline = block.value_at(key, time.time() - window_seconds)
+            if baseline is None:
+                baseline = block.first(key)
+        if latest is None or not baseline:
+            return 0.0
+        return round((latest - baseline) / abs(baseline) * 100, 1)
+
+    def trends(self, collection: str, window_seconds: float) -> Dict[str, float]:
+        """Trend of every aggregate metric of a collection"""
+        block = self.aggregates.get(collection)
+        names = list(block.index) if block is not None else []
+        return {name: self.trend(f"{collection}.{name}", window_seconds) for name in names}
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "retention": {
+                    "aggregates": {RAW: self.raw_points, **self.rollup_points},
+                    "entities": {RAW: self.entity_raw_points, **self.entity_rollup_points}
+                },
+                "aggregates": sorted(
+                    f"{collection}.{name}" for collection, block in self.aggregates.items() for name in block.index
+                ),
+                "entityMetrics": {metric: len(block.index) for metric, block in sorted(self.entities.items())},
+                "memoryBytes": sum(block.nbytes for block in (*self.aggregates.values(), *self.entities.values()))
+            }
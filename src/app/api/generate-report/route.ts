@@ -1,5 +1,28 @@
 import { NextRequest, NextResponse } from 'next/server';
 
+const JOB_POLL_INTERVAL_MS = 500;
+const JOB_TIMEOUT_MS = 120000;
+
+async function waitForJobResult(simulatorUrl: string, jobId: string): Promise<Response> {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const statusResponse = await fetch(`${simulatorUrl}/api/jobs/${jobId}`);
+    if (!statusResponse.ok) {
+      return statusResponse;
+    }
+
+    const job = await statusResponse.json();
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return fetch(`${simulatorUrl}/api/jobs/${jobId}/result`);
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+
+  return new Response('Report generation timed out', { status: 504 });
+}
+
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
@@ -15,7 +38,7 @@ export async function POST(request: NextRequest) {
     }
 
     // Forward request to EC2 server
-    const response = await fetch(`${simulatorUrl}/api/generate-report`, {
+    let response = await fetch(`${simulatorUrl}/api/generate-report`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -23,6 +46,12 @@ export async function POST(request: NextRequest) {
       body: JSON.stringify(body),
     });
 
+    // Reports are rendered as background jobs: poll until the PDF is ready
+    if (response.status === 202) {
+      const job = await response.json();
+      response = await waitForJobResult(simulatorUrl, job.jobId);
+    }
+
     if (!response.ok) {
       const errorText = await response.text();
       console.error('EC2 server error:', errorText);